@@ -1,12 +1,20 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import TweetCard from './components/TweetCard';
 import SearchBar from './components/SearchBar';
 import FilterBar from './components/FilterBar';
+import VirtualGrid from './components/VirtualGrid';
+import { loadTweets } from './dataLoader';
 import React from 'react';
 
+// 筛选条件变化后等待的毫秒数，连续输入只触发一次查询
+const QUERY_DEBOUNCE_MS = 150;
+// 搜索接口每次请求的结果数，按页取完全部命中，不截断
+const SEARCH_PAGE_SIZE = 1000;
+
 function App() {
   const [tweets, setTweets] = useState([]);
-  const [filteredTweets, setFilteredTweets] = useState([]);
+  const [pageTweets, setPageTweets] = useState([]);
+  const [totalCount, setTotalCount] = useState(0);
   const [avatarMap, setAvatarMap] = useState({});
   const [searchTerm, setSearchTerm] = useState('');
   const [sortBy, setSortBy] = useState('date');
@@ -19,114 +27,110 @@ function App() {
   const [topAuthors, setTopAuthors] = useState([]);
   const [currentPage, setCurrentPage] = useState(1);
   const [itemsPerPage, setItemsPerPage] = useState(50);
+  const [searchRank, setSearchRank] = useState(null);
+  const workerRef = useRef(null);
+  const queryIdRef = useRef(0);
+  const lastParamsRef = useRef(null);
 
   useEffect(() => {
-    // 读取 JSONL 文件
-    fetch('/data/x.jsonl')
-      .then(response => response.text())
-      .then(text => {
-        const tweets = text
-          .split('\n')
-          .filter(line => line.trim())
-          .map(line => JSON.parse(line))
-          .sort((a, b) => new Date(b.date) - new Date(a.date)); // 初始加载时就按日期排序
-        setTweets(tweets);
-        setFilteredTweets(tweets);
-      })
-      .catch(error => console.error('Error loading tweets:', error));
-  }, []);
-
-  useEffect(() => {
-    let filtered = [...tweets];
-
-    // 搜索过滤
-    if (searchTerm) {
-      filtered = filtered.filter(tweet => 
-        tweet.text.toLowerCase().includes(searchTerm.toLowerCase())
-      );
-    }
-
-    // 媒体类型过滤
-    if (mediaType !== 'all') {
-      filtered = filtered.filter(tweet => {
-        if (mediaType === 'text') return tweet.media_type === 'No media';
-        if (mediaType === 'image') return tweet.media_type === 'Image';
-        if (mediaType === 'video') return tweet.media_type === 'Video';
-        return true;
-      });
-    }
-
-    // 作者过滤
-    if (author !== 'all') {
-      filtered = filtered.filter(tweet => tweet.author_handle === author);
-    }
+    const worker = new Worker(new URL('./filterWorker.js', import.meta.url), { type: 'module' });
+    worker.onmessage = (event) => {
+      const { id, total, tweets } = event.data;
+      // 只接受最新一次查询的结果
+      if (id !== queryIdRef.current) return;
+      setPageTweets(tweets);
+      setTotalCount(total);
+    };
+    workerRef.current = worker;
 
-    // 最小点赞数过滤
-    if (minLikes) {
-      filtered = filtered.filter(tweet => tweet.num_like >= parseInt(minLikes));
-    }
+    // 读取数据：分片导出时先渲染首个分片，其余分片后台追加；worker 只接收新增的部分
+    let sent = 0;
+    loadTweets((tweets, avatarMap) => {
+      worker.postMessage({ type: sent ? 'append' : 'reset', rows: tweets.slice(sent) });
+      sent = tweets.length;
+      setTweets(tweets);
+      setAvatarMap(avatarMap);
+    }).catch(error => console.error('Error loading tweets:', error));
 
-    // 最小转发数过滤
-    if (minRetweets) {
-      filtered = filtered.filter(tweet => tweet.num_retweet >= parseInt(minRetweets));
-    }
+    return () => worker.terminate();
+  }, []);
 
-    // 日期范围过滤
-    if (dateRange.start && dateRange.end) {
-      filtered = filtered.filter(tweet => {
-        const tweetDate = new Date(tweet.date);
-        const startDate = new Date(dateRange.start);
-        const endDate = new Date(dateRange.end);
-        return tweetDate >= startDate && tweetDate <= endDate;
-      });
+  // 全文索引搜索（x_like_search.py 提供 /api/search），不可用时回退到本地 includes 匹配
+  useEffect(() => {
+    if (!searchTerm) {
+      setSearchRank(null);
+      return;
     }
-
-    // 排序
-    filtered.sort((a, b) => {
-      let comparison = 0;
-      if (sortBy === 'date') {
-        comparison = new Date(b.date) - new Date(a.date);
-      } else if (sortBy === 'likes') {
-        comparison = (b.num_like || 0) - (a.num_like || 0);
-      } else if (sortBy === 'retweets') {
-        comparison = (b.num_retweet || 0) - (a.num_retweet || 0);
-      } else if (sortBy === 'replies') {
-        comparison = (b.num_reply || 0) - (a.num_reply || 0);
-      } else if (sortBy === 'views') {
-        comparison = (b.num_views || 0) - (a.num_views || 0);
-      }
-      return sortOrder === 'asc' ? -comparison : comparison;
+    let cancelled = false;
+    const urls = [];
+    const fetchPage = (offset) =>
+      fetch(`/api/search?q=${encodeURIComponent(searchTerm)}&limit=${SEARCH_PAGE_SIZE}&offset=${offset}`)
+        .then(response => {
+          if (!response.ok) throw new Error(`status ${response.status}`);
+          return response.json();
+        })
+        .then(data => {
+          if (cancelled) return;
+          urls.push(...data.results.map(tweet => tweet.url));
+          // 先显示已取到的结果，不足一页说明已经取完
+          setSearchRank(urls.slice());
+          if (data.results.length === SEARCH_PAGE_SIZE) return fetchPage(offset + SEARCH_PAGE_SIZE);
+        });
+    // 中途失败时回退到本地匹配，而不是只显示部分结果
+    fetchPage(0).catch(() => {
+      if (!cancelled) setSearchRank(null);
     });
+    return () => {
+      cancelled = true;
+    };
+  }, [searchTerm]);
 
-    setFilteredTweets(filtered);
-  }, [searchTerm, tweets, sortBy, sortOrder, minLikes, minRetweets, dateRange, mediaType, author]);
-
-  // 读取头像数据
+  // 过滤、排序和分页都在 filterWorker.js 中完成，主线程只渲染当前页
   useEffect(() => {
-    const fetchAvatarData = async () => {
-      try {
-        const response = await fetch('/data/x.jsonl');
-        const text = await response.text();
-        const lines = text.split('\n').filter(line => line.trim());
-        const avatarData = {};
-        lines.forEach(line => {
-          try {
-            const data = JSON.parse(line);
-            avatarData[data.author_handle] = data.author_avatar;
-          } catch (e) {
-            console.error('解析头像数据失败:', e);
-          }
-        });
-        setAvatarMap(avatarData);
-      } catch (e) {
-        console.error('读取头像数据失败:', e);
-      }
+    if (!workerRef.current) return;
+    const params = {
+      searchTerm,
+      rankUrls: searchRank,
+      sortBy,
+      sortOrder,
+      minLikes,
+      minRetweets,
+      dateRange,
+      mediaType,
+      author,
     };
-    fetchAvatarData();
-  }, []);
+    const key = JSON.stringify(params);
+    // 只翻页时立即查询，筛选条件变化时防抖
+    const delay = key === lastParamsRef.current ? 0 : QUERY_DEBOUNCE_MS;
+    lastParamsRef.current = key;
+    const id = ++queryIdRef.current;
+    const timer = setTimeout(() => {
+      workerRef.current.postMessage({ type: 'query', id, params, page: currentPage, itemsPerPage });
+    }, delay);
+    return () => clearTimeout(timer);
+  }, [searchTerm, searchRank, tweets, sortBy, sortOrder, minLikes, minRetweets, dateRange, mediaType, author, currentPage, itemsPerPage]);
 
-  // 计算top20作者
+  // 计算top20作者，优先读取 x_like_analytics.py 生成的统计结果
   useEffect(() => {
+    if (!tweets.length) return;
+    let cancelled = false;
+    fetch('/data/stats.json')
+      .then(response => {
+        if (!response.ok) throw new Error(`status ${response.status}`);
+        return response.json();
+      })
+      .then(stats => {
+        if (!cancelled) setTopAuthors(stats.top_authors.slice(0, 20));
+      })
+      .catch(() => {
+        if (!cancelled) setTopAuthors(computeTopAuthors(tweets));
+      });
+    return () => {
+      cancelled = true;
+    };
+  }, [tweets]);
+
+  const computeTopAuthors = (tweets) => {
     const authorCounts = {};
     tweets.forEach(tweet => {
       if (tweet.author_handle) {
@@ -138,7 +142,7 @@ function App() {
       }
     });
 
-    const sortedAuthors = Object.entries(authorCounts)
+    return Object.entries(authorCounts)
       .sort(([, a], [, b]) => b.count - a.count)
       .slice(0, 20)
       .map(([handle, data]) => ({
@@ -146,9 +150,7 @@ function App() {
         name: data.name,
         count: data.count
       }));
-
-    setTopAuthors(sortedAuthors);
-  }, [tweets]);
+  };
 
   const handleSearch = (term) => {
     setSearchTerm(term);
@@ -186,10 +188,7 @@ function App() {
     }
   };
 
-  const totalPages = Math.ceil(filteredTweets.length / itemsPerPage);
-  const startIndex = (currentPage - 1) * itemsPerPage;
-  const endIndex = startIndex + itemsPerPage;
-  const currentTweets = filteredTweets.slice(startIndex, endIndex);
+  const totalPages = Math.ceil(totalCount / itemsPerPage);
 
   const handlePageChange = (page) => {
     setCurrentPage(page);
@@ -229,11 +228,11 @@ function App() {
           </div>
         </div>
 
-        <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 xl:grid-cols-5 gap-4">
-          {currentTweets.map((tweet) => (
-            <TweetCard key={tweet.url} tweet={tweet} avatarMap={avatarMap} />
-          ))}
-        </div>
+        <VirtualGrid
+          items={pageTweets}
+          getKey={tweet => tweet.url}
+          renderItem={tweet => <TweetCard tweet={tweet} avatarMap={avatarMap} />}
+        />
 
         {totalPages > 1 && (
           <div className="flex justify-center mt-8 space-x-2">
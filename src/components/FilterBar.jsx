@@ -16,6 +16,7 @@ const FilterBar = ({ onFilterChange, mediaType, itemsPerPage, author, topAuthors
             <option value="retweets">转发次数</option>
             <option value="replies">回复次数</option>
             <option value="views">查看次数</option>
+            <option value="relevance">相关度</option>
           </select>
           <select
             onChange={(e) => onFilterChange('sortOrder', e.target.value)}
@@ -1,9 +1,15 @@
-import { useState } from 'react';
+import { useState, useEffect } from 'react';
 import { FaSearch } from 'react-icons/fa';
 
 function SearchBar({ onSearch }) {
   const [input, setInput] = useState('');
 
+  // 输入时自动搜索，停止输入 300ms 后才触发
+  useEffect(() => {
+    const timer = setTimeout(() => onSearch(input), 300);
+    return () => clearTimeout(timer);
+  }, [input]);
+
   const handleSubmit = (e) => {
     e.preventDefault();
     onSearch(input);
@@ -1,3 +1,4 @@
+import { memo } from 'react';
 import { FaHeart, FaRetweet, FaComment, FaExternalLinkAlt } from 'react-icons/fa';
 
 function TweetCard({ tweet, avatarMap }) {
@@ -124,6 +125,10 @@ function TweetCard({ tweet, avatarMap }) {
             <img
               src={avatarUrl}
               alt={`${author_name}'s avatar`}
+              width={32}
+              height={32}
+              loading="lazy"
+              decoding="async"
               className="w-8 h-8 rounded-full"
             />
             <div>
@@ -152,6 +157,8 @@ function TweetCard({ tweet, avatarMap }) {
             <img
               src={images_urls[0]}
               alt="Tweet media"
+              loading="lazy"
+              decoding="async"
               className="w-full h-full object-cover object-top"
             />
           </div>
@@ -163,6 +170,8 @@ function TweetCard({ tweet, avatarMap }) {
             <img
               src={processImageUrl(images_urls[0])}
               alt="Video thumbnail"
+              loading="lazy"
+              decoding="async"
               className="w-full h-full object-cover object-top"
             />
             <div className="absolute inset-0 flex items-center justify-center bg-black bg-opacity-30 hover:bg-opacity-20 transition-all duration-300">
@@ -208,4 +217,5 @@ function TweetCard({ tweet, avatarMap }) {
   );
 }
 
-export default TweetCard; 
\ No newline at end of file
+// 翻页或父组件更新时，数据未变的卡片不重新渲染
+export default memo(TweetCard); 
\ No newline at end of file
@@ -0,0 +1,139 @@
+import { useState, useEffect, useLayoutEffect, useRef, useCallback } from 'react';
+
+// 与 tailwind 断点一致：grid-cols-1 md:grid-cols-2 lg:grid-cols-3 xl:grid-cols-5
+const getColumns = () => {
+  const width = window.innerWidth;
+  if (width >= 1280) return 5;
+  if (width >= 1024) return 3;
+  if (width >= 768) return 2;
+  return 1;
+};
+
+const GRID_CLASS = 'grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 xl:grid-cols-5 gap-4 pb-4';
+
+// 窗口化网格：只挂载视口附近的行，行高先按估计值占位，渲染后用 ResizeObserver 实测修正
+function VirtualGrid({ items, renderItem, getKey, estimatedRowHeight = 480, overscan = 800 }) {
+  const containerRef = useRef(null);
+  const heightsRef = useRef(new Map());
+  const observerRef = useRef(null);
+  const [columns, setColumns] = useState(getColumns);
+  const [viewport, setViewport] = useState({ top: 0, bottom: window.innerHeight });
+  const [, setMeasured] = useState(0);
+
+  // 实测高度按行的 key 保存（列数 + 行号 + 首条的 key），数据变化后只保留仍在使用的行
+  const rowCount = Math.ceil(items.length / columns);
+  const rowKey = (r) => `${columns}:${r}:${getKey(items[r * columns])}`;
+
+  useLayoutEffect(() => {
+    const heights = new Map();
+    for (let r = 0; r < rowCount; r++) {
+      const key = rowKey(r);
+      if (heightsRef.current.has(key)) heights.set(key, heightsRef.current.get(key));
+    }
+    heightsRef.current = heights;
+  }, [items, columns]);
+
+  useEffect(() => {
+    let frame = null;
+    const update = () => {
+      frame = null;
+      if (!containerRef.current) return;
+      const top = -containerRef.current.getBoundingClientRect().top;
+      setViewport({ top, bottom: top + window.innerHeight });
+      setColumns(getColumns());
+    };
+    const schedule = () => {
+      if (frame === null) frame = requestAnimationFrame(update);
+    };
+    update();
+    window.addEventListener('scroll', schedule, { passive: true });
+    window.addEventListener('resize', schedule);
+    return () => {
+      window.removeEventListener('scroll', schedule);
+      window.removeEventListener('resize', schedule);
+      if (frame !== null) cancelAnimationFrame(frame);
+    };
+  }, []);
+
+  const getObserver = () => {
+    if (!observerRef.current) {
+      observerRef.current = new ResizeObserver(entries => {
+        let changed = false;
+        entries.forEach(entry => {
+          // 滚出视口被卸载的行不再观察
+          if (!entry.target.isConnected) {
+            observerRef.current.unobserve(entry.target);
+            return;
+          }
+          const row = entry.target.dataset.row;
+          const height = entry.target.offsetHeight;
+          if (heightsRef.current.get(row) !== height) {
+            heightsRef.current.set(row, height);
+            changed = true;
+          }
+        });
+        if (changed) setMeasured(n => n + 1);
+      });
+    }
+    return observerRef.current;
+  };
+
+  // 行挂载时 ref 回调先于 effect 执行，所以观察器按需创建；effect 重新执行时补上已挂载的行
+  useEffect(() => {
+    const observer = getObserver();
+    containerRef.current.querySelectorAll('[data-row]').forEach(node => observer.observe(node));
+    return () => {
+      observer.disconnect();
+      observerRef.current = null;
+    };
+  }, []);
+
+  const observeRow = useCallback((node) => {
+    if (node) getObserver().observe(node);
+  }, []);
+
+  const offsets = new Array(rowCount + 1);
+  offsets[0] = 0;
+  for (let r = 0; r < rowCount; r++) {
+    offsets[r + 1] = offsets[r] + (heightsRef.current.get(rowKey(r)) || estimatedRowHeight);
+  }
+
+  // 二分查找视口上下边界所在的行
+  const findRow = (y) => {
+    let low = 0;
+    let high = rowCount;
+    while (low < high) {
+      const mid = (low + high) >> 1;
+      if (offsets[mid + 1] <= y) low = mid + 1;
+      else high = mid;
+    }
+    return low;
+  };
+  const firstRow = findRow(viewport.top - overscan);
+  const lastRow = Math.min(rowCount - 1, findRow(viewport.bottom + overscan));
+
+  const rows = [];
+  for (let r = firstRow; r <= lastRow; r++) {
+    rows.push(
+      <div
+        key={rowKey(r)}
+        ref={observeRow}
+        data-row={rowKey(r)}
+        className={GRID_CLASS}
+        style={{ position: 'absolute', top: offsets[r], left: 0, right: 0 }}
+      >
+        {items.slice(r * columns, (r + 1) * columns).map(item => (
+          <div key={getKey(item)}>{renderItem(item)}</div>
+        ))}
+      </div>
+    );
+  }
+
+  return (
+    <div ref={containerRef} style={{ position: 'relative', height: offsets[rowCount] }}>
+      {rows}
+    </div>
+  );
+}
+
+export default VirtualGrid;
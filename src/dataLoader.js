@@ -0,0 +1,73 @@
+// 数据加载：优先读取 x_like_export.py 生成的分片，不存在时回退到 data/x.jsonl
+
+const SHARD_DIR = '/data/shards';
+
+const fetchGzipJson = async (url) => {
+  const response = await fetch(url);
+  if (!response.ok) throw new Error(`Failed to fetch ${url}: ${response.status}`);
+  // 静态服务器不会设置 Content-Encoding，这里在浏览器端解压
+  const stream = response.body.pipeThrough(new DecompressionStream('gzip'));
+  return new Response(stream).json();
+};
+
+const loadManifest = async () => {
+  try {
+    const response = await fetch(`${SHARD_DIR}/manifest.json`);
+    if (!response.ok) return null;
+    return await response.json();
+  } catch (e) {
+    return null;
+  }
+};
+
+const loadLegacy = async (onTweets) => {
+  const response = await fetch('/data/x.jsonl');
+  const text = await response.text();
+  const tweets = text
+    .split('\n')
+    .filter(line => line.trim())
+    .map(line => JSON.parse(line))
+    .sort((a, b) => new Date(b.date) - new Date(a.date)); // 初始加载时就按日期排序
+
+  const avatarMap = {};
+  tweets.forEach(tweet => {
+    avatarMap[tweet.author_handle] = tweet.author_avatar;
+  });
+  onTweets(tweets, avatarMap, true);
+};
+
+// onTweets(tweets, avatarMap, done) 会被多次调用：首个分片加载完即回调，之后每个分片追加一次
+export const loadTweets = async (onTweets) => {
+  const manifest = await loadManifest();
+  if (!manifest || !manifest.shards) {
+    await loadLegacy(onTweets);
+    return;
+  }
+
+  const [authors, firstShard] = await Promise.all([
+    fetchGzipJson(`${SHARD_DIR}/${manifest.authors}`),
+    manifest.shards.length ? fetchGzipJson(`${SHARD_DIR}/${manifest.shards[0].file}`) : [],
+  ]);
+
+  const avatarMap = {};
+  Object.entries(authors).forEach(([handle, [, avatar]]) => {
+    avatarMap[handle] = avatar;
+  });
+
+  const hydrate = (rows) => rows.map(tweet => {
+    const author = authors[tweet.author_handle];
+    return author ? { ...tweet, author_name: author[0], author_avatar: author[1] } : tweet;
+  });
+
+  let tweets = hydrate(firstShard);
+  onTweets(tweets, avatarMap, manifest.shards.length <= 1);
+
+  // 其余分片按顺序懒加载，分片本身已按日期倒序排列
+  for (let i = 1; i < manifest.shards.length; i++) {
+    const rows = await fetchGzipJson(`${SHARD_DIR}/${manifest.shards[i].file}`);
+    tweets = tweets.concat(hydrate(rows));
+    const done = i === manifest.shards.length - 1;
+    // 合并几次分片再通知，避免每个分片都触发一次全量过滤
+    if (done || i % 4 === 0) onTweets(tweets, avatarMap, done);
+  }
+};
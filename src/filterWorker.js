@@ -0,0 +1,146 @@
+// 过滤与排序在 Web Worker 中执行：数据加载时建立一次索引，每次查询只把当前页发回主线程
+
+const MEDIA_TYPES = { text: 'No media', image: 'Image', video: 'Video' };
+const SORT_FIELDS = { likes: 'num_like', retweets: 'num_retweet', replies: 'num_reply', views: 'num_views' };
+
+let tweets = [];
+const index = {
+  text: [], // 小写文本与作者，搜索时直接 includes
+  dateKeys: new Int32Array(0), // YYYYMMDD 数字
+  counts: {}, // 字段名 -> Float64Array
+  byMedia: new Map(), // media_type -> 下标数组
+  byAuthor: new Map(), // author_handle -> 下标数组
+  byUrl: new Map(), // url -> 下标
+};
+
+// 上一次过滤排序的结果，只翻页时不再重新计算
+let cached = { key: null, rows: null };
+
+const dateKey = (date) => {
+  if (!date || date.length < 10) return 0;
+  return Number(date.slice(0, 4)) * 10000 + Number(date.slice(5, 7)) * 100 + Number(date.slice(8, 10)) || 0;
+};
+
+const grow = (array, size) => {
+  const next = new array.constructor(size);
+  next.set(array);
+  return next;
+};
+
+const addToList = (map, key, i) => {
+  const list = map.get(key);
+  if (list) list.push(i);
+  else map.set(key, [i]);
+};
+
+const appendRows = (rows) => {
+  const start = tweets.length;
+  const size = start + rows.length;
+  index.dateKeys = grow(index.dateKeys, size);
+  Object.values(SORT_FIELDS).forEach(field => {
+    index.counts[field] = grow(index.counts[field] || new Float64Array(0), size);
+  });
+
+  rows.forEach((tweet, offset) => {
+    const i = start + offset;
+    tweets.push(tweet);
+    index.text.push(`${tweet.text || ''}\n${tweet.author_name || ''} ${tweet.author_handle || ''}`.toLowerCase());
+    index.dateKeys[i] = dateKey(tweet.date);
+    Object.values(SORT_FIELDS).forEach(field => {
+      index.counts[field][i] = tweet[field] || 0;
+    });
+    addToList(index.byMedia, tweet.media_type || 'No media', i);
+    addToList(index.byAuthor, tweet.author_handle, i);
+    index.byUrl.set(tweet.url, i);
+  });
+  cached = { key: null, rows: null };
+};
+
+const reset = () => {
+  tweets = [];
+  index.text = [];
+  index.dateKeys = new Int32Array(0);
+  index.counts = {};
+  index.byMedia = new Map();
+  index.byAuthor = new Map();
+  index.byUrl = new Map();
+  cached = { key: null, rows: null };
+};
+
+// 先取最小的候选集（搜索结果、作者或媒体类型的倒排表），再逐条检查其余条件
+const candidates = ({ rankUrls, mediaType, author }) => {
+  const lists = [];
+  if (rankUrls) lists.push(rankUrls.map(url => index.byUrl.get(url)).filter(i => i !== undefined));
+  if (author !== 'all') lists.push(index.byAuthor.get(author) || []);
+  if (mediaType !== 'all' && MEDIA_TYPES[mediaType]) lists.push(index.byMedia.get(MEDIA_TYPES[mediaType]) || []);
+  if (!lists.length) return null;
+  return lists.reduce((a, b) => (a.length <= b.length ? a : b));
+};
+
+const filterAndSort = (params) => {
+  const { searchTerm, rankUrls, sortBy, sortOrder, minLikes, minRetweets, dateRange, mediaType, author } = params;
+  const term = searchTerm && !rankUrls ? searchTerm.toLowerCase() : '';
+  const likes = parseInt(minLikes, 10) || 0;
+  const retweets = parseInt(minRetweets, 10) || 0;
+  const start = dateRange.start && dateRange.end ? dateKey(dateRange.start) : 0;
+  const end = dateRange.start && dateRange.end ? dateKey(dateRange.end) : 0;
+  const media = mediaType !== 'all' ? MEDIA_TYPES[mediaType] : null;
+  const rank = rankUrls ? new Map(rankUrls.map((url, i) => [url, i])) : null;
+
+  const pool = candidates(params);
+  const rows = [];
+  const total = pool ? pool.length : tweets.length;
+  for (let k = 0; k < total; k++) {
+    const i = pool ? pool[k] : k;
+    const tweet = tweets[i];
+    if (rank && !rank.has(tweet.url)) continue;
+    if (media && (tweet.media_type || 'No media') !== media) continue;
+    if (author !== 'all' && tweet.author_handle !== author) continue;
+    if (likes && index.counts.num_like[i] < likes) continue;
+    if (retweets && index.counts.num_retweet[i] < retweets) continue;
+    if (start && (index.dateKeys[i] < start || index.dateKeys[i] > end)) continue;
+    if (term && !index.text[i].includes(term)) continue;
+    rows.push(i);
+  }
+
+  let keys = null;
+  if (sortBy === 'relevance' && rank) {
+    keys = (i) => -rank.get(tweets[i].url);
+  } else if (sortBy === 'date') {
+    keys = (i) => index.dateKeys[i];
+  } else if (SORT_FIELDS[sortBy]) {
+    const counts = index.counts[SORT_FIELDS[sortBy]];
+    keys = (i) => counts[i];
+  }
+  if (keys) {
+    const direction = sortOrder === 'asc' ? 1 : -1;
+    const values = new Float64Array(tweets.length);
+    rows.forEach(i => {
+      values[i] = keys(i);
+    });
+    rows.sort((a, b) => direction * (values[a] - values[b]) || a - b);
+  }
+  return rows;
+};
+
+const query = ({ id, params, page, itemsPerPage }) => {
+  const key = JSON.stringify(params);
+  if (cached.key !== key) {
+    cached = { key, rows: filterAndSort(params) };
+  }
+  const startIndex = (page - 1) * itemsPerPage;
+  const pageRows = cached.rows.slice(startIndex, startIndex + itemsPerPage).map(i => tweets[i]);
+  self.postMessage({ type: 'result', id, total: cached.rows.length, tweets: pageRows });
+};
+
+self.onmessage = (event) => {
+  const message = event.data;
+  if (message.type === 'reset') {
+    reset();
+    appendRows(message.rows);
+  } else if (message.type === 'append') {
+    appendRows(message.rows);
+  } else if (message.type === 'query') {
+    query(message);
+  }
+};
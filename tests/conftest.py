@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import sys
+
+import pytest
+from loguru import logger
+
+# The modules live flat in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def quiet_logs():
+    logger.remove()
+    yield
+
+
+def write_jsonl(path, rows):
+    os.makedirs(os.path.dirname(str(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    return str(path)
+
+
+def tweet(tweet_id, **fields):
+    return {"url": f"https://x.com/user/status/{tweet_id}", "text": f"tweet {tweet_id}", "date": "2024-04-10",
+            **fields}
@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from conftest import tweet, write_jsonl
+from x_like_analytics import ArchiveStats
+
+
+def test_render_dashboard(tmp_path):
+    pytest.importorskip("plotly_calplot")
+    archive = write_jsonl(tmp_path / "x.jsonl", [tweet(1, date="2024-04-10"), tweet(2, date="2024-04-12"),
+                                                 tweet(3, date="2024-04-12", author_handle="@a")])
+    stats = ArchiveStats(str(tmp_path / "state.json"), link_cache_file=None)
+    stats.update_from_jsonl(archive)
+    output = tmp_path / "dashboard.html"
+    stats.render_dashboard(str(output))
+    assert "Likes per day" in output.read_text(encoding="utf-8")
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+import x_like_daemon
+from x_like_daemon import Job, SyncDaemon
+from x_like_scrap import TwitterExtractor
+
+
+class FakeDriver:
+
+    def __init__(self):
+        self.cookies = {"auth_token": {"name": "auth_token", "value": "old", "httpOnly": True},
+                        "ct0": {"name": "ct0", "value": "csrf"}}
+
+    def delete_all_cookies(self):
+        self.cookies.clear()
+
+    def add_cookie(self, cookie):
+        self.cookies[cookie["name"]] = cookie
+
+
+def test_set_token_replaces_cookies():
+    extractor = TwitterExtractor.__new__(TwitterExtractor)
+    extractor.driver = FakeDriver()
+    extractor.set_token("new")
+    assert list(extractor.driver.cookies) == ["auth_token"]
+    assert extractor.driver.cookies["auth_token"]["value"] == "new"
+    assert extractor.auth_token == "new"
+
+
+def run_avatar_job(monkeypatch, tmp_path, result):
+    monkeypatch.setattr(x_like_daemon, "get_author_avatar", lambda *args, **kwargs: dict(result))
+    daemon = SyncDaemon([], avatar_file=str(tmp_path / "avatars.jsonl"))
+    monkeypatch.setattr(daemon, "_browser", lambda *args: None)
+    job = Job("refresh_avatars", params={"jsonl_file": str(tmp_path / "x.jsonl")})
+    daemon._run(job, None)
+    return daemon.status()["finished"][0]
+
+
+def test_avatar_job_fails_when_nothing_fetched(monkeypatch, tmp_path):
+    job = run_avatar_job(monkeypatch, tmp_path, {"fetched": 0, "failed": 1, "remaining": 30})
+    assert job["state"] == "failed"
+    assert job["result"]["failed"] == 1
+
+
+def test_avatar_job_reports_counts(monkeypatch, tmp_path):
+    job = run_avatar_job(monkeypatch, tmp_path, {"fetched": 12, "failed": 1, "remaining": 18})
+    assert job["state"] == "done"
+    assert job["result"] == {"fetched": 12, "failed": 1, "remaining": 18}
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from conftest import tweet, write_jsonl
+from x_like_dataset import TweetDataset
+from x_like_record import migrate
+
+pd = pytest.importorskip("pandas")
+
+ROWS = [
+    tweet(1, author_handle="@a", author_name="A", lang="en", num_like=5, media_type="Image"),
+    tweet(2, author_handle="@b", author_name="B", lang="ja", num_view=300, num_like=None),
+    tweet(1, author_handle="@a", author_name="A later", lang="en", num_like=7, text="edited"),
+    {"url": None, "text": "no id"},
+    tweet(3, author_handle="@a", date="", media_type="", num_like=float("nan"), num_views="12"),
+    tweet(4, author_handle="", date="2024-13-01", lang=None, num_reply=2.0),
+]
+
+
+def test_from_frame_matches_from_rows():
+    expected = list(TweetDataset.from_rows(migrate(row) for row in ROWS).iter_rows())
+    assert list(TweetDataset.from_frame(pd.DataFrame(ROWS)).iter_rows()) == expected
+    assert [row["url"][-1] for row in expected] == ["1", "2", "3", "4"]
+    assert expected[0]["num_like"] == 7 and expected[0]["author_name"] == "A"
+    assert expected[1]["num_views"] == 300
+
+
+def test_from_parquet(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = str(tmp_path / "x.parquet")
+    pd.DataFrame([migrate(row) for row in ROWS[:3]]).drop(columns=["mentioned_urls", "images_urls"]).to_parquet(path)
+    dataset = TweetDataset.from_parquet(path, load_text=False)
+    assert len(dataset) == 2 and dataset.texts is None
+    assert dataset.group_count("author") == [("@a", 1), ("@b", 1)]
+
+
+def test_group_and_filter():
+    dataset = TweetDataset.from_rows(migrate(row) for row in ROWS)
+    assert dataset.group_count("author")[0] == ("@a", 2)
+    assert len(dataset.filter(author="@a", num_like=6)) == 1
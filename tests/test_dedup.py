@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+import json
+
+from conftest import tweet, write_jsonl
+from x_like_dedup import DuplicateIndex, minhash, representatives, shingles
+
+TEXT = "Long context models make retrieval pipelines simpler but not free, here is what we measured"
+
+
+def test_minhash_estimates_jaccard():
+    a = shingles({"text": TEXT})
+    assert (minhash(a) == minhash(set(a))).all()
+    assert minhash(set()) is None
+    similar = (minhash(a) == minhash(shingles({"text": TEXT + " today"}))).mean()
+    different = (minhash(a) == minhash(shingles({"text": "透明背景图片生成工具"}))).mean()
+    assert similar > 0.7 and different < 0.2
+
+
+def test_shared_media_counts_as_shingles():
+    image = ["https://pbs.twimg.com/media/GabcDEF?format=jpg&name=small"]
+    features = shingles({"text": "hello", "images_urls": image})
+    assert sum(f.startswith("media:GabcDEF") for f in features) == 4
+
+
+def test_clusters(tmp_path):
+    archive = write_jsonl(tmp_path / "x.jsonl", [
+        tweet(1, text=TEXT),
+        tweet(2, text="Something else entirely about browser automation and scraping"),
+        tweet(3, text=TEXT + " today"),
+        tweet(4, text=""),
+    ])
+    index = DuplicateIndex(str(tmp_path / "dedup.db"))
+    assert index.update_from_jsonl(archive) == 1
+    assert index.cluster_map() == {1: 1, 2: 2, 3: 1}
+    # Nothing new on the second run, reclustering is incremental
+    assert index.update_from_jsonl(archive) == 0
+
+    with open(archive, "a", encoding="utf-8") as f:
+        f.write(json.dumps(tweet(5, text=TEXT + " again")) + "\n")
+    assert index.update_from_jsonl(archive) == 1
+    assert index.cluster_of("https://x.com/user/status/5") == 1
+
+    rows = [tweet(i) for i in (1, 2, 3, 4)]
+    assert [row["url"][-1] for row in representatives(rows, index.cluster_map())] == ["1", "2", "4"]
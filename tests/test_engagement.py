@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+from array import array
+
+import pytest
+
+from conftest import tweet, write_jsonl
+from x_like_engagement import EngagementStore, _read_varint, _unzigzag, _write_varint, _zigzag
+
+
+@pytest.mark.parametrize("n", [0, 1, -1, 63, -64, 127, 128, 300, -300, 2 ** 40, -(2 ** 40)])
+def test_zigzag_varint_round_trip(n):
+    out = array("B")
+    _write_varint(out, _zigzag(n))
+    value, pos = _read_varint(out, 0)
+    assert _unzigzag(value) == n and pos == len(out)
+
+
+def test_observations_survive_reopen(tmp_path):
+    path = str(tmp_path / "engagement.ts")
+    with EngagementStore(path) as store:
+        assert store.observe(1, {"num_like": 5, "num_views": 100}, observed_at=1000)
+        assert store.observe(1, {"num_like": 7, "num_views": 90}, observed_at=2000)
+        # Same time again, as when a snapshot is parsed twice
+        assert not store.observe(1, {"num_like": 8}, observed_at=2000)
+    with EngagementStore(path) as store:
+        series = store.series(1)
+    assert [(s["observed_at"], s["num_like"], s["num_views"]) for s in series] == [(1000, 5, 100), (2000, 7, 90)]
+
+
+def test_backfill_skips_side_files(tmp_path):
+    write_jsonl(tmp_path / "tweets_2024-04-10_15-30-45.jsonl", [tweet(1, num_like=5, num_views=100)])
+    write_jsonl(tmp_path / "tweets_2024-04-11_15-30-45.videos.jsonl",
+                [{"tweet_id": 1, "url": "https://x.com/user/status/1", "videos": []}])
+    with EngagementStore(str(tmp_path / "engagement.ts")) as store:
+        assert store.backfill((str(tmp_path / "tweets_*.jsonl"),)) == 1
+        # No false drop to zero from the side file
+        assert [s["num_like"] for s in store.series(1)] == [5]
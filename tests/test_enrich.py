@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+import requests
+
+from conftest import tweet, write_jsonl
+from x_like_fakex import FakeLLM
+
+
+def test_fake_llm_answers_numbered_tweets():
+    with FakeLLM(latency=0) as llm:
+        response = requests.post(f"{llm.url}/v1/chat/completions", json={
+            "model": "fake", "messages": [{"role": "user", "content": "[1] long context RAG\n\n[2] 透明背景"}],
+        })
+        items = json.loads(response.json()["choices"][0]["message"]["content"])["items"]
+        assert [item["id"] for item in items] == [1, 2]
+        assert llm.stats()["tweets"] == 2
+
+
+def test_enrich_against_fake_llm(tmp_path):
+    pytest.importorskip("openai")
+    from x_like_enrich import AdaptiveBackoff, LLMEnricher
+
+    archive = write_jsonl(tmp_path / "x.jsonl", [tweet(i, text=f"tweet number {i}") for i in range(40)]
+                          + [tweet(100, text="tweet number 1")])
+    output = tmp_path / "enrichment.jsonl"
+    with FakeLLM(latency=0.01, error_rate=0.3) as llm:
+        enricher = LLMEnricher(str(tmp_path / "cache.db"), model="fake", batch_size=4, concurrency=4,
+                               max_retries=20, api_key="test", base_url=f"{llm.url}/v1", link_cache_file=None)
+        enricher.backoff = AdaptiveBackoff(base_delay=0.01, max_delay=0.05)
+        enricher.enrich_file(str(archive), str(output))
+        stats = llm.stats()
+        enricher.close()
+
+    assert enricher.stats["enriched"] == 40
+    assert enricher.stats["requests"] == stats["requests"]
+    assert enricher.stats["failures"] == stats["statuses"].get(503, 0)
+    assert stats["tweets"] == 40
+    assert len(output.read_text(encoding="utf-8").splitlines()) == 41
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+import requests
+
+from conftest import write_jsonl
+from x_like_fakex import FakeXConfig, FakeXServer, fake_tweet, route_to
+from x_like_record import iter_rows
+from x_like_thread import ThreadCompleter
+
+
+def row_of(t):
+    """Timeline row of a fake tweet, thread starters only show the truncated preview"""
+    return {"url": f"https://x.com/{t['handle']}/status/{t['id']}", "text": t["text"], "date": t["date"]}
+
+
+def test_route_to_fake_server():
+    with FakeXServer(FakeXConfig(latency=0, jitter=0)) as server, route_to(server.url):
+        token = requests.post("https://api.twitter.com/1.1/guest/activate.json").json()["guest_token"]
+        assert token.isdigit()
+        assert server.stats()["requests"] == {"guest_activate": 1}
+
+
+def test_thread_completion_against_fake_server(tmp_path):
+    config = FakeXConfig(latency=0, jitter=0, num_tweets=50, thread_every=7, video_every=5)
+    starter = fake_tweet(7, config)
+    plain = fake_tweet(1, config)
+    archive = write_jsonl(tmp_path / "x.jsonl", [row_of(starter), row_of(plain)])
+
+    with FakeXServer(config) as server, route_to(server.url):
+        completer = ThreadCompleter(str(tmp_path / "thread_cache.db"), workers=2,
+                                    engagement_file=str(tmp_path / "engagement.ts"))
+        assert completer.complete_file(archive) == 1
+        requests_seen = server.stats()["requests"]
+        # Completed rows are skipped on the next run
+        assert completer.complete_file(archive) == 0
+        assert server.stats()["requests"] == requests_seen
+
+    # Only the thread starter was fetched
+    assert requests_seen.get("TweetDetail") == 1
+    completed, untouched = iter_rows(archive)
+    assert completed["text"] == starter["full_text"]
+    assert [t["text"] for t in completed["thread"]] == ["2/ follow-up 2", "3/ follow-up 3"]
+    assert "thread" not in untouched
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+from conftest import tweet, write_jsonl
+from x_like_io import is_side_file
+from x_like_merge import merge_runs
+from x_like_record import iter_rows
+
+
+def test_side_files_are_not_runs():
+    assert is_side_file("data/tweets_2024-04-10_15-30-45.videos.jsonl")
+    assert is_side_file("data/tweets_2024-04-10_15-30-45.snapshot.jsonl.gz")
+    assert not is_side_file("data/tweets_2024-04-10_15-30-45.jsonl.gz")
+    assert not is_side_file("data/x.jsonl")
+
+
+def test_merge_skips_side_files(tmp_path):
+    write_jsonl(tmp_path / "tweets_2024-04-10_15-30-45.jsonl", [tweet(1, num_like=5, num_views=100)])
+    # Sorts after the run, so it would count as the newer observation
+    write_jsonl(tmp_path / "tweets_2024-04-10_15-30-45.videos.jsonl",
+                [{"tweet_id": 1, "url": "https://x.com/user/status/1", "videos": [{"url": "v.mp4"}]}])
+    write_jsonl(tmp_path / "tweets_2024-04-10_15-30-45.snapshot.jsonl", [{"captured_at": 0, "html": "<div/>"}])
+    output = str(tmp_path / "x.jsonl")
+
+    assert merge_runs([str(tmp_path / "tweets_*.jsonl*")], output_file=output) == 1
+    [row] = list(iter_rows(output))
+    assert "tweet_id" not in row
+    assert row["num_like"] == 5 and row["num_views"] == 100
+
+
+def test_merge_newest_run_wins_and_older_fills(tmp_path):
+    write_jsonl(tmp_path / "tweets_2024-01-01_00-00-00.jsonl",
+                [tweet(1, num_like=1, lang="en"), tweet(3, num_like=3)])
+    write_jsonl(tmp_path / "tweets_2024-02-01_00-00-00.jsonl", [tweet(1, num_like=9), tweet(2, num_like=2)])
+    output = str(tmp_path / "x.jsonl")
+
+    assert merge_runs([str(tmp_path / "tweets_*.jsonl*")], output_file=output) == 3
+    rows = list(iter_rows(output))
+    # Newest tweet first
+    assert [row["url"][-1] for row in rows] == ["3", "2", "1"]
+    assert rows[2]["num_like"] == 9 and rows[2]["lang"] == "en"
+
+
+def test_merge_keeps_completed_text(tmp_path):
+    write_jsonl(tmp_path / "tweets_2024-01-01_00-00-00.jsonl", [tweet(1, text="the full long text")])
+    write_jsonl(tmp_path / "tweets_2024-02-01_00-00-00.jsonl", [tweet(1, text="the full…")])
+    output = str(tmp_path / "x.jsonl")
+
+    merge_runs([str(tmp_path / "tweets_*.jsonl*")], output_file=output)
+    assert [row["text"] for row in iter_rows(output)] == ["the full long text"]
+
+
+def test_merge_keeps_completed_text_with_card_title(tmp_path):
+    write_jsonl(tmp_path / "tweets_2024-01-01_00-00-00.jsonl",
+                [tweet(1, text="the full long text\nCard", card_title="Card")])
+    write_jsonl(tmp_path / "tweets_2024-02-01_00-00-00.jsonl",
+                [tweet(1, text="the full…\nCard", card_title="Card")])
+    output = str(tmp_path / "x.jsonl")
+
+    merge_runs([str(tmp_path / "tweets_*.jsonl*")], output_file=output)
+    assert [row["text"] for row in iter_rows(output)] == ["the full long text\nCard"]
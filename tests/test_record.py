@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+import json
+
+from conftest import tweet, write_jsonl
+from x_like_record import SCHEMA_VERSION, TweetRecord, decode_record, encode_record, iter_rows, migrate
+
+
+def test_migrate_unversioned_row():
+    old = tweet(1, num_view="120", num_like=None, num_retweet=float("nan"))
+    row = migrate(old)
+    assert row["schema_version"] == SCHEMA_VERSION
+    assert row["num_views"] == 120 and "num_view" not in row
+    assert row["num_like"] == 0 and row["num_retweet"] == 0 and row["num_reply"] == 0
+    # The input is not modified
+    assert "num_view" in old and "schema_version" not in old
+
+
+def test_migrate_keeps_newer_views():
+    assert migrate(tweet(1, num_view=5, num_views=9))["num_views"] == 9
+
+
+def test_record_round_trip_keeps_extra_fields():
+    record = decode_record(json.dumps(tweet(1, videos=[{"url": "v.mp4"}], card_title="Card")))
+    assert record.media_type == "No media" and record.images_urls == []
+    row = json.loads(encode_record(record))
+    assert row["videos"] == [{"url": "v.mp4"}] and row["card_title"] == "Card"
+    assert list(row)[:3] == ["text", "author_name", "author_handle"]
+    assert TweetRecord.from_dict(row).to_dict() == row
+
+
+def test_iter_rows_upgrades(tmp_path):
+    path = write_jsonl(tmp_path / "x.jsonl", [tweet(1, num_view=3), migrate(tweet(2))])
+    assert [row["num_views"] for row in iter_rows(path)] == [3, 0]
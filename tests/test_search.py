@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from conftest import tweet, write_jsonl
+from x_like_search import TweetSearchIndex, build_match_query, tokenize
+
+
+@pytest.fixture
+def index(tmp_path):
+    archive = write_jsonl(tmp_path / "x.jsonl", [
+        tweet(1, text="透明背景xyz 生成"),
+        tweet(2, text="un café très bon"),
+        tweet(3, text="long context RAG 检索增强"),
+        tweet(4, text="背景图片"),
+    ])
+    index = TweetSearchIndex(str(tmp_path / "search.db"))
+    index.update_from_jsonl(archive)
+    yield index
+    index.close()
+
+
+def ids(results):
+    return sorted(int(row["url"].rsplit("/", 1)[1]) for row in results)
+
+
+def test_tokenize():
+    assert tokenize("透明背景xyz") == ["透明", "明背", "背景", "xyz"]
+    assert tokenize("Café Привет") == ["café", "привет"]
+    assert tokenize("字", for_query=True) == ["字*"]
+
+
+def test_index_and_query_streams_match():
+    text = "透明背景xyz 生成 rag"
+    assert tokenize(text) == tokenize(text, for_query=True)
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("透明背景xyz", [1]),
+    ("透明 xyz", [1]),
+    ('"背景xyz"', [1]),
+    ("背景", [1, 4]),
+    ("成", [1]),
+    ("景", [1, 4]),
+    ("cafe", [2]),
+    ("café", [2]),
+    ('"long context" 检索', [3]),
+    ("xyz 不存在", []),
+])
+def test_search(index, query, expected):
+    assert ids(index.search(query)) == expected
+
+
+def test_build_match_query_empty():
+    assert build_match_query("  ,,, ") == ""
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from conftest import tweet
+from x_like_semantic import HashingEmbedder, SemanticIndex
+
+
+class FailingEmbedder(HashingEmbedder):
+
+    def __init__(self):
+        super().__init__()
+        self.name = "hashing-256"
+        self.fail = False
+        self.calls = []
+
+    def embed(self, texts):
+        self.calls.append(list(texts))
+        if self.fail:
+            raise RuntimeError("embedding endpoint down")
+        return super().embed(texts)
+
+
+def test_search(tmp_path):
+    index = SemanticIndex(str(tmp_path), dtype="float32")
+    index.add_rows([tweet(1, text="long context RAG"), tweet(2, text="透明背景 生成")])
+    assert index.search("RAG context", k=1)[0][0] == 1
+
+    reopened = SemanticIndex(str(tmp_path))
+    assert len(reopened) == 2
+    assert reopened.add_rows([tweet(1, text="long context RAG")]) == 0
+
+
+def test_embed_failure_leaves_index_consistent(tmp_path):
+    embedder = FailingEmbedder()
+    index = SemanticIndex(str(tmp_path), embedder=embedder)
+    index.add_rows([tweet(1, text="first")])
+
+    embedder.fail = True
+    with pytest.raises(RuntimeError):
+        index.add_rows([tweet(2, text="second"), tweet(3, text="third")])
+    assert len(index) == 1
+    assert set(index.positions) == {1}
+
+    reopened = SemanticIndex(str(tmp_path), embedder=embedder)
+    assert len(reopened) == 1
+    embedder.fail = False
+    assert reopened.add_rows([tweet(2, text="second")]) == 1
+    assert reopened.positions == {1: 0, 2: 1}
+
+
+def test_duplicate_in_batch_embedded_once(tmp_path):
+    embedder = FailingEmbedder()
+    index = SemanticIndex(str(tmp_path), embedder=embedder)
+    assert index.add_rows([tweet(1, text="old"), tweet(2, text="other"), tweet(1, text="new")]) == 2
+    assert embedder.calls == [["new", "other"]]
+    assert len(index) == 2
+    assert index.search("new", k=1)[0][0] == 1
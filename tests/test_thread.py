@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from conftest import tweet
+from x_like_thread import is_truncated, needs_completion
+
+
+def test_truncated_before_card_title():
+    row = tweet(1, text="A long post about RAG…\nHow we built it", card_title="How we built it")
+    assert is_truncated(row)
+    assert needs_completion(row)
+    assert not is_truncated(tweet(2, text="Read this\nA title…", card_title="A title…"))
+
+
+@pytest.mark.parametrize("text", [
+    "🧵 on long context",
+    "1/ Here is what we learned",
+    "(1/n) Here is what we learned",
+    "Here is what we learned 1/5",
+    "Here is what we learned, a thread",
+    "Here is what we learned. Thread 👇",
+])
+def test_thread_markers(text):
+    assert needs_completion(tweet(1, text=text))
+
+
+@pytest.mark.parametrize("text", [
+    "This thread is great, thanks",
+    "Python threading without the GIL",
+    "Reply to the thread above with your ideas",
+])
+def test_not_thread_markers(text):
+    assert not needs_completion(tweet(1, text=text))
+
+
+def test_card_title_is_not_a_marker():
+    assert not needs_completion(tweet(1, text="Nice read\nA thread", card_title="A thread"))
+
+
+def test_completed_row_only_when_truncated_again():
+    assert not needs_completion(tweet(1, text="🧵 1/ all of it", thread=[]))
+    assert needs_completion(tweet(1, text="🧵 1/ all…", thread=[]))
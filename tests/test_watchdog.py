@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+from loguru import logger
+
+import x_like_watchdog
+from x_like_watchdog import BrowserWatchdog
+
+
+def test_missing_psutil_warns_once(monkeypatch):
+    monkeypatch.setattr(x_like_watchdog, "psutil", None)
+    x_like_watchdog._warn_missing_psutil.cache_clear()
+    messages = []
+    logger.add(messages.append, level="WARNING")
+    BrowserWatchdog()
+    watchdog = BrowserWatchdog()
+    assert len(messages) == 1 and "psutil" in messages[0]
+    assert watchdog.rss_mb() is None
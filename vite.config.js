@@ -6,5 +6,9 @@ export default defineConfig({
   plugins: [react()],
   server: {
     port: 3000,
+    proxy: {
+      // python x_like_search.py
+      '/api': 'http://127.0.0.1:8765',
+    },
   },
 }) 
\ No newline at end of file
@@ -1,4 +1,3 @@
-import requests
 import json
 import re
 import urllib.parse
@@ -7,6 +6,9 @@ from typing import List, Dict
 import argparse
 from loguru import logger
 
+from config import EGRESS_PROXIES
+from x_like_egress import EgressPool
+
 script_dir = os.path.dirname(os.path.realpath(__file__))
 request_details_file = f'{script_dir}{os.sep}RequestDetails.json'
 request_details = json.load(open(request_details_file, 'r'))
@@ -27,6 +29,9 @@ headers = {
     "upgrade-insecure-requests": "1"
 }
 
+# 所有请求都经过出口池，按健康度和空闲连接分配到各个代理；替换 transport 即可改用其他代理
+transport = EgressPool(EGRESS_PROXIES or [None], headers=headers)
+
 
 def get_tokens(tweet_url):
     """
@@ -39,15 +44,8 @@ def get_tokens(tweet_url):
     # 使用默认的Bearer Token
     bearer_token = "AAAAAAAAAAAAAAAAAAAAANRILgAAAAAAnNwIzUejRCOuH5E6I8xnZz4puTs%3D1Zv7ttfk8LF81IUq16cHjhLTvJu4FA33AGWWjCpTnA"
 
-    # 获取guest token
-    with requests.Session() as s:
-        s.headers.update(headers)
-        s.headers.update({"authorization": f"Bearer {bearer_token}"})
-
-        # 激活bearer token并获取guest token
-        guest_response = s.post("https://api.twitter.com/1.1/guest/activate.json")
-        assert guest_response.status_code == 200, f'Failed to get guest token. Status code: {guest_response.status_code}'
-        guest_token = guest_response.json()["guest_token"]
+    # 获取guest token，每个出口复用自己激活的token，之后带该token的请求都从同一出口发出
+    guest_token = transport.guest_token(bearer_token)
 
     assert guest_token is not None, f'Failed to get guest token. Tweet url: {tweet_url}'
     return bearer_token, guest_token
@@ -71,12 +69,8 @@ def get_tweet_details(tweet_url, guest_token, bearer_token):
         tweet_id) == 1, f'无法从URL中解析推文ID。请确保使用正确的URL。推文URL: {tweet_url}'
     tweet_id = tweet_id[0]
 
-    # 首先获取页面以获取ct0 token
-    session = requests.Session()
-    session.headers.update(headers)
-
-    # 访问页面获取cookies
-    response = session.get(tweet_url)
+    # 首先访问页面，cookies保存在该token所属出口的会话中
+    response = transport.request("GET", tweet_url, token=guest_token)
     if response.status_code != 200:
         print(f"警告：获取页面失败，状态码: {response.status_code}")
 
@@ -129,7 +123,7 @@ def get_tweet_details(tweet_url, guest_token, bearer_token):
     api_headers.update(headers)
 
     # 发送请求
-    details = session.get(api_url, params=params, headers=api_headers)
+    details = transport.request("GET", api_url, token=guest_token, params=params, headers=api_headers)
 
     if details.status_code != 200:
         print(f"警告：获取推文详情失败，状态码: {details.status_code}")
@@ -248,7 +242,7 @@ def extract_media_info(j, tweet_url, target_all_mp4s=False):
 
 
 def download_parts(url, output_filename):
-    resp = requests.get(url, stream=True)
+    resp = transport.request("GET", url)
 
     # container begins with / ends with fmp4 and has a resolution in it we want to capture
     pattern = re.compile(r'(/[^\n]*/(\d+x\d+)/[^\n]*container=fmp4)')
@@ -270,7 +264,7 @@ def download_parts(url, output_filename):
 
     video_part_prefix = "https://video.twimg.com"
 
-    resp = requests.get(video_part_prefix + max_res_url, stream=True)
+    resp = transport.request("GET", video_part_prefix + max_res_url)
 
     mp4_pattern = re.compile(r'(/[^\n]*\.mp4)')
     mp4_parts = mp4_pattern.findall(resp.text)
@@ -284,19 +278,11 @@ def download_parts(url, output_filename):
     m4s_parts = m4s_part_pattern.findall(resp.text)
 
     with open(output_filename, 'wb') as f:
-        r = requests.get(mp4_url, stream=True)
-        for chunk in r.iter_content(chunk_size=1024):
-            if chunk:
-                f.write(chunk)
-                f.flush()
+        transport.download(mp4_url, f)
 
         for part in m4s_parts:
             part_url = video_part_prefix + part
-            r = requests.get(part_url, stream=True)
-            for chunk in r.iter_content(chunk_size=1024):
-                if chunk:
-                    f.write(chunk)
-                    f.flush()
+            transport.download(part_url, f)
 
     return True
 
@@ -347,12 +333,8 @@ def download_video(tweet_url, output_file, target_all_videos=False):
 
                     else:
                         # use a stream to download the file
-                        r = requests.get(mp4, stream=True)
                         with open(output_file, 'wb') as f:
-                            for chunk in r.iter_content(chunk_size=1024):
-                                if chunk:
-                                    f.write(chunk)
-                                    f.flush()
+                            transport.download(mp4, f)
                     video_counter += 1
             else:
                 original_url = repost_check(resp.text)
@@ -368,12 +350,8 @@ def download_video(tweet_url, output_file, target_all_videos=False):
                 download_parts(mp4, output_file)
             else:
                 # use a stream to download the file
-                r = requests.get(mp4, stream=True)
                 with open(output_file, 'wb') as f:
-                    for chunk in r.iter_content(chunk_size=1024):
-                        if chunk:
-                            f.write(chunk)
-                            f.flush()
+                    transport.download(mp4, f)
 
 
 def get_video_url(tweet_url):
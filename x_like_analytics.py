@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+import json
+import math
+import os
+from collections import Counter
+
+from loguru import logger
+
+from x_like_io import tweet_id_from_url, file_fingerprint, resume_offset
+from x_like_links import LinkCache, classify, domain, resolved_links
+from x_like_record import iter_rows_from
+
+
+ENGAGEMENT_FIELDS = ["num_like", "num_retweet", "num_reply", "num_views"]
+PERCENTILES = [50, 90, 99]
+
+
+def _bucket(value):
+    """Log-scale histogram bucket: 0 for 0, then 4 buckets per power of ten"""
+    if not value or value <= 0:
+        return 0
+    return int(math.log10(value) * 4) + 1
+
+
+def _bucket_floor(bucket):
+    if bucket == 0:
+        return 0
+    return int(round(10 ** ((bucket - 1) / 4)))
+
+
+class ArchiveStats:
+    """
+    Rolling aggregates over the archive. Each row is counted once (by tweet id),
+    and the state is persisted so later runs only process newly appended lines.
+    """
+
+    def __init__(self, state_file="data/stats_state.json", link_cache_file="data/link_cache.db"):
+        """
+        :param state_file: Persisted aggregates
+        :param link_cache_file: LinkCache used to map shortlinks to domains, read only
+        """
+        self.state_file = state_file
+        self.link_cache_file = link_cache_file
+        self.per_day = Counter()
+        self.media_types = Counter()
+        self.authors = Counter()
+        self.author_names = {}
+        self.langs = Counter()
+        self.engagement = {field: Counter() for field in ENGAGEMENT_FIELDS}
+        self.links = Counter()
+        self.seen_ids = set()
+        self.sources = {}
+        if os.path.exists(state_file):
+            self._load()
+
+    def _load(self):
+        with open(self.state_file, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        self.per_day.update(state["per_day"])
+        self.media_types.update(state["media_types"])
+        self.authors.update(state["authors"])
+        self.author_names = state["author_names"]
+        self.langs.update(state["langs"])
+        for field, hist in state["engagement"].items():
+            self.engagement[field].update({int(k): v for k, v in hist.items()})
+        self.links.update(state.get("links", {}))
+        self.seen_ids = set(state["seen_ids"])
+        self.sources = state["sources"]
+
+    def save(self):
+        state = {
+            "per_day": self.per_day,
+            "media_types": self.media_types,
+            "authors": self.authors,
+            "author_names": self.author_names,
+            "langs": self.langs,
+            "engagement": self.engagement,
+            "links": self.links,
+            "seen_ids": sorted(self.seen_ids),
+            "sources": self.sources,
+        }
+        tmp_file = f"{self.state_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_file, self.state_file)
+
+    def add(self, row):
+        """
+        Fold a single tweet into the aggregates
+        :param row: Tweet dict
+        :return: True if the tweet was new
+        """
+        tweet_id = tweet_id_from_url(row.get("url"))
+        if tweet_id is None or tweet_id in self.seen_ids:
+            return False
+        self.seen_ids.add(tweet_id)
+
+        if row.get("date"):
+            self.per_day[row["date"][:10]] += 1
+        self.media_types[row.get("media_type") or "No media"] += 1
+        self.langs[row.get("lang") or "unknown"] += 1
+        handle = row.get("author_handle")
+        if handle:
+            self.authors[handle] += 1
+            self.author_names[handle] = row.get("author_name") or handle
+        for field in ENGAGEMENT_FIELDS:
+            self.engagement[field][_bucket(row.get(field) or 0)] += 1
+        # Shortlinks are kept as is and mapped to their domain when the summary is built,
+        # so links expanded later are still counted under the right domain
+        for link in resolved_links(row):
+            if link["kind"] in ("external", "shortlink"):
+                self.links[link["final_url"] or link["url"]] += 1
+        return True
+
+    def update_from_jsonl(self, jsonl_file):
+        """
+        Process lines appended to a JSONL file since the last update. A rewritten file is read
+        again from the start, tweets counted before are skipped by id
+        :param jsonl_file: JSONL file path
+        :return: Number of new tweets counted
+        """
+        source = self.sources.get(jsonl_file)
+        # Older states stored a bare offset without a fingerprint
+        offset = resume_offset(jsonl_file, *source) if isinstance(source, list) else 0
+        count = 0
+        for row, offset in iter_rows_from(jsonl_file, offset):
+            if self.add(row):
+                count += 1
+        self.sources[jsonl_file] = [offset, file_fingerprint(jsonl_file, offset)]
+        logger.info(f"Added {count} new tweets from {jsonl_file}, {len(self.seen_ids)} in total")
+        return count
+
+    def percentiles(self, field):
+        """
+        Approximate percentiles from the log-bucket histogram (lower bucket bound)
+        :param field: Engagement field name
+        :return: {"p50": ..., "p90": ..., "p99": ...}
+        """
+        hist = self.engagement[field]
+        total = sum(hist.values())
+        result = {}
+        for p in PERCENTILES:
+            target = total * p / 100
+            running = 0
+            value = 0
+            for bucket in sorted(hist):
+                running += hist[bucket]
+                value = _bucket_floor(bucket)
+                if running >= target:
+                    break
+            result[f"p{p}"] = value
+        return result
+
+    def domains(self):
+        """
+        Linked domains by number of links, shortlinks are resolved through the LinkCache
+        without network requests. Shortlinks that were not expanded yet count as "unresolved".
+        """
+        cache = None
+        if self.link_cache_file and os.path.exists(self.link_cache_file):
+            cache = LinkCache(self.link_cache_file, read_only=True)
+        counts = Counter()
+        try:
+            for url, count in self.links.items():
+                final_url = url
+                if classify(url) == "shortlink":
+                    final_url = cache.final_url(url) if cache is not None else None
+                if final_url is None:
+                    counts["unresolved"] += count
+                elif classify(final_url) == "external":
+                    counts[domain(final_url)] += count
+        finally:
+            if cache is not None:
+                cache.close()
+        return counts
+
+    def summary(self, top_n=20):
+        """Compact summary for the frontend"""
+        return {
+            "total": len(self.seen_ids),
+            "per_day": dict(sorted(self.per_day.items())),
+            "media_types": dict(self.media_types),
+            "langs": dict(self.langs.most_common()),
+            "top_authors": [
+                {"handle": handle, "name": self.author_names.get(handle, handle), "count": count}
+                for handle, count in self.authors.most_common(top_n)
+            ],
+            "engagement": {field: self.percentiles(field) for field in ENGAGEMENT_FIELDS},
+            "top_domains": [{"domain": d, "count": c} for d, c in self.domains().most_common(top_n)],
+        }
+
+    def save_summary(self, output_file="data/stats.json", top_n=20):
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(top_n), f, ensure_ascii=False, separators=(',', ':'))
+        logger.info(f"Stats summary saved to {output_file}")
+
+    def render_dashboard(self, output_file="data/dashboard.html", top_n=30):
+        """
+        Render likes calendar heatmap, media mix, language and author charts to a static HTML file
+        :param output_file: Output HTML file path
+        :param top_n: Number of authors in the author chart
+        """
+        import pandas as pd
+        import plotly.graph_objects as go
+        from plotly_calplot import calplot
+
+        day_df = pd.DataFrame(sorted(self.per_day.items()), columns=["date", "likes"])
+        # plotly_calplot only accepts datetime64[ns], pandas 3 parses to microseconds by default
+        day_df["date"] = pd.to_datetime(day_df["date"]).astype("datetime64[ns]")
+
+        figures = [
+            calplot(day_df, x="date", y="likes", title="Likes per day"),
+            go.Figure(go.Pie(labels=list(self.media_types), values=list(self.media_types.values())),
+                      layout={"title": "Media types"}),
+            go.Figure(go.Bar(x=[k for k, _ in self.langs.most_common(15)],
+                             y=[v for _, v in self.langs.most_common(15)]),
+                      layout={"title": "Languages"}),
+        ]
+        top_authors = self.authors.most_common(top_n)
+        figures.append(go.Figure(
+            go.Bar(x=[count for _, count in top_authors][::-1],
+                   y=[self.author_names.get(handle, handle) for handle, _ in top_authors][::-1],
+                   orientation="h"),
+            layout={"title": f"Top {top_n} authors", "height": 24 * top_n + 120},
+        ))
+
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write("<html><head><meta charset='utf-8'><title>X-Like LLM stats</title></head><body>\n")
+            for i, fig in enumerate(figures):
+                f.write(fig.to_html(full_html=False, include_plotlyjs="cdn" if i == 0 else False))
+            f.write("</body></html>\n")
+        logger.info(f"Dashboard saved to {output_file}")
+
+
+if __name__ == "__main__":
+
+    stats = ArchiveStats("data/stats_state.json")
+    stats.update_from_jsonl("data/x.jsonl")
+    stats.save()
+    stats.save_summary("data/stats.json")
+    stats.render_dashboard("data/dashboard.html")
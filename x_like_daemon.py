@@ -0,0 +1,381 @@
+# -*- coding: utf-8 -*-
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from loguru import logger
+from selenium.common.exceptions import WebDriverException
+
+from config import TWITTER_AUTH_TOKEN
+from x_like_io import tweet_id_from_url, file_fingerprint, resume_offset
+from x_like_record import iter_rows, iter_rows_from
+from x_like_scrap import TwitterExtractor, get_author_avatar
+from x_like_video import VideoResolver, merge_videos
+from x_like_watchdog import BrowserWatchdog
+
+
+JOB_KINDS = ("sync", "resolve_media", "refresh_avatars")
+
+
+class Account:
+    """One account whose likes are kept in sync"""
+
+    def __init__(self, handle, auth_token=TWITTER_AUTH_TOKEN, interval=3600, priority=10,
+                 method='remove', canonical_file=None, media_interval=6 * 3600):
+        """
+        :param handle: Screen name without "@"
+        :param auth_token: auth_token cookie used for this account
+        :param interval: Seconds between two syncs
+        :param priority: Lower runs first when several jobs are due
+        :param method: fetch_tweets method
+        :param canonical_file: Archive the sync appends to, data/x_<handle>.jsonl by default
+        :param media_interval: Seconds between two video resolution passes, 0 to disable
+        """
+        self.handle = handle.lstrip("@")
+        self.auth_token = auth_token
+        self.interval = interval
+        self.priority = priority
+        self.method = method
+        self.canonical_file = canonical_file or f"data/x_{self.handle}.jsonl"
+        self.media_interval = media_interval
+
+    @property
+    def likes_url(self):
+        return f"https://twitter.com/{self.handle}/likes"
+
+
+class Job:
+    _ids = itertools.count(1)
+
+    def __init__(self, kind, account=None, priority=10, params=None, timeout=3 * 3600):
+        """
+        :param kind: One of JOB_KINDS
+        :param account: Account handle, required for sync and resolve_media
+        :param priority: Lower runs first
+        :param params: Extra keyword arguments for the job
+        :param timeout: Seconds after which a running job makes /health fail
+        """
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind {kind!r}, expected one of {JOB_KINDS}")
+        self.id = next(self._ids)
+        self.kind = kind
+        self.account = account
+        self.priority = priority
+        self.params = params or {}
+        self.timeout = timeout
+        self.state = "queued"
+        self.created = time.time()
+        self.started = self.finished = None
+        self.error = None
+        self.result = None
+
+    def to_dict(self):
+        return {
+            "id": self.id, "kind": self.kind, "account": self.account, "priority": self.priority,
+            "params": self.params, "state": self.state, "created": self.created,
+            "started": self.started, "finished": self.finished, "error": self.error, "result": self.result,
+        }
+
+
+class SyncDaemon:
+    """
+    Keeps one authenticated TwitterExtractor warm and runs jobs on it one at a time.
+    Jobs come from the per-account schedules and from POST /jobs. Due jobs run by
+    priority; periodic jobs are rescheduled after they finish, so a slow sync never
+    piles up behind itself. Known tweet ids of each account stay in memory and only
+    the newly appended part of the archive is read before the next sync.
+    """
+
+    def __init__(self, accounts, host="127.0.0.1", port=8766, headless=True,
+                 avatar_interval=24 * 3600, avatar_file="data/author_avatar.jsonl", history=50):
+        """
+        :param accounts: List of Account
+        :param host: Status endpoint host
+        :param port: Status endpoint port
+        :param headless: Run Chrome headless
+        :param avatar_interval: Seconds between two avatar refreshes, 0 to disable
+        :param avatar_file: Avatar JSONL written by get_author_avatar
+        :param history: Number of finished jobs kept for /status
+        """
+        self.accounts = {a.handle: a for a in accounts}
+        self.host, self.port = host, port
+        self.headless = headless
+        self.avatar_interval = avatar_interval
+        self.avatar_file = avatar_file
+        self.history = history
+
+        self.cond = threading.Condition()
+        self.waiting = []  # (run_at, seq, job, every)
+        self.ready = []  # (priority, seq, job, every)
+        self.seq = itertools.count()
+        self.current = None
+        self.finished = []
+        self.stopping = False
+
+        self.extractor = None
+        self.started = time.time()
+        self.browser_starts = 0
+        self.known = {}  # handle -> {"ids": set, "offset": int}
+        self.server = None
+
+    # Scheduling
+
+    def submit(self, job, delay=0, every=None):
+        """
+        Queue a job
+        :param delay: Seconds before it becomes due
+        :param every: Reschedule the same kind of job this many seconds after it finishes
+        """
+        with self.cond:
+            heapq.heappush(self.waiting, (time.time() + delay, next(self.seq), job, every))
+            self.cond.notify()
+        return job
+
+    def _schedule_defaults(self):
+        for account in self.accounts.values():
+            self.submit(Job("sync", account.handle, account.priority), every=account.interval)
+            if account.media_interval:
+                self.submit(Job("resolve_media", account.handle, account.priority + 1),
+                            delay=account.media_interval, every=account.media_interval)
+        if self.avatar_interval:
+            self.submit(Job("refresh_avatars", priority=100), delay=60, every=self.avatar_interval)
+
+    def _next_job(self):
+        with self.cond:
+            while not self.stopping:
+                now = time.time()
+                while self.waiting and self.waiting[0][0] <= now:
+                    _, seq, job, every = heapq.heappop(self.waiting)
+                    heapq.heappush(self.ready, (job.priority, seq, job, every))
+                if self.ready:
+                    _, _, job, every = heapq.heappop(self.ready)
+                    return job, every
+                timeout = self.waiting[0][0] - now if self.waiting else None
+                self.cond.wait(timeout)
+            return None, None
+
+    # Browser
+
+    def _browser(self, auth_token=TWITTER_AUTH_TOKEN):
+        """The warm extractor, restarted if Chrome died since the last job"""
+        if self.extractor is not None:
+            try:
+                self.extractor.driver.current_url
+            except WebDriverException as e:
+                logger.warning(f"Browser is gone, restarting it: {e}")
+                self._quit_browser()
+        if self.extractor is None:
+            self.extractor = TwitterExtractor(headless=self.headless, interactive=False, watchdog=BrowserWatchdog())
+            self.browser_starts += 1
+        if auth_token != self.extractor.auth_token:
+            self.extractor.set_token(auth_token)
+        return self.extractor
+
+    def _quit_browser(self):
+        if self.extractor is not None:
+            try:
+                self.extractor.driver.quit()
+            except WebDriverException:
+                pass
+            self.extractor = None
+
+    # Jobs
+
+    def _known_ids(self, account):
+        """Known ids of the account, extended with whatever was appended to its archive since"""
+        known = self.known.setdefault(account.handle, {"ids": set(), "offset": 0, "fingerprint": None})
+        if not resume_offset(account.canonical_file, known["offset"], known["fingerprint"]):
+            # New, or rewritten (merge, video and link annotation) since the last read
+            known["ids"], known["offset"] = set(), 0
+        for row, offset in iter_rows_from(account.canonical_file, known["offset"]):
+            tweet_id = tweet_id_from_url(row.get("url"))
+            if tweet_id is not None:
+                known["ids"].add(tweet_id)
+            known["offset"] = offset
+        known["fingerprint"] = file_fingerprint(account.canonical_file, known["offset"])
+        return known["ids"]
+
+    def _account(self, job):
+        account = self.accounts.get((job.account or "").lstrip("@"))
+        if account is None:
+            raise ValueError(f"Unknown account {job.account!r}")
+        return account
+
+    def _run_sync(self, job):
+        account = self._account(job)
+        known_ids = self._known_ids(account)
+        params = {"method": account.method, **job.params}
+        self._browser(account.auth_token).fetch_tweets(
+            account.likes_url, sync=True, canonical_file=account.canonical_file, known_ids=known_ids, **params
+        )
+        # Ids saved by this run are picked up from the archive before the next one
+        self._known_ids(account)
+
+    def _run_resolve_media(self, job):
+        account = self._account(job)
+        side_file = f"{os.path.splitext(account.canonical_file)[0]}.videos.jsonl"
+        resolver = VideoResolver(side_file, workers=job.params.get("workers", 4))
+        try:
+            for row in iter_rows(account.canonical_file):
+                if "videos" not in row:
+                    resolver.submit(row)
+        finally:
+            resolver.close()
+        if os.path.exists(side_file):
+            merge_videos(account.canonical_file, side_file)
+            os.remove(side_file)
+        self._known_ids(account)
+
+    def _run_refresh_avatars(self, job):
+        jsonl_file = job.params.get("jsonl_file")
+        if jsonl_file is None:
+            # get_author_avatar reads a single file, concatenate the archives of all accounts
+            jsonl_file = "data/daemon_avatar_input.jsonl"
+            with open(jsonl_file, "w", encoding="utf-8") as out:
+                for account in self.accounts.values():
+                    if os.path.exists(account.canonical_file):
+                        with open(account.canonical_file, "r", encoding="utf-8") as f:
+                            out.writelines(f)
+        job.result = get_author_avatar(jsonl_file, self.avatar_file, extractor=self._browser())
+        if job.result["failed"] and not job.result["fetched"]:
+            raise RuntimeError(f"No avatar fetched, {job.result['failed']} failed")
+
+    def _run(self, job, every):
+        job.state, job.started = "running", time.time()
+        with self.cond:
+            self.current = job
+        logger.info(f"Job {job.id} {job.kind} {job.account or ''} started")
+        try:
+            getattr(self, f"_run_{job.kind}")(job)
+            job.state = "done"
+        except Exception as e:
+            job.state, job.error = "failed", f"{type(e).__name__}: {e}"
+            logger.error(f"Job {job.id} {job.kind} failed: {job.error}\n{traceback.format_exc()}")
+        job.finished = time.time()
+        logger.info(f"Job {job.id} {job.kind} {job.state} in {job.finished - job.started:.1f}s")
+        with self.cond:
+            self.current = None
+            self.finished = (self.finished + [job])[-self.history:]
+        if every and not self.stopping:
+            self.submit(Job(job.kind, job.account, job.priority, job.params, job.timeout), delay=every, every=every)
+
+    # Status endpoint
+
+    def status(self):
+        with self.cond:
+            queued = sorted(self.ready) + sorted(self.waiting)
+            return {
+                "uptime": round(time.time() - self.started, 1),
+                "browser_running": self.extractor is not None,
+                "browser_starts": self.browser_starts,
+                "browser_health": self.extractor.watchdog.last_sample if self.extractor is not None else None,
+                "accounts": {
+                    handle: {"known_ids": len(self.known.get(handle, {}).get("ids", ()))}
+                    for handle in self.accounts
+                },
+                "current": self.current.to_dict() if self.current else None,
+                "queued": [
+                    {**entry[2].to_dict(), "due": entry[0] if entry in self.waiting else None}
+                    for entry in queued
+                ],
+                "finished": [job.to_dict() for job in reversed(self.finished)],
+            }
+
+    def health(self):
+        """(ok, reason): unhealthy while a job overruns its timeout or the last 3 jobs failed"""
+        with self.cond:
+            current, recent = self.current, self.finished[-3:]
+        if current is not None and time.time() - current.started > current.timeout:
+            return False, f"job {current.id} {current.kind} running for {time.time() - current.started:.0f}s"
+        if len(recent) == 3 and all(job.state == "failed" for job in recent):
+            return False, f"last jobs failed: {recent[-1].error}"
+        return True, "ok"
+
+    def _make_handler(self):
+        daemon = self
+
+        class DaemonHandler(BaseHTTPRequestHandler):
+            def _send(self, code, payload):
+                body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                path = urlparse(self.path).path
+                if path == '/status':
+                    self._send(200, daemon.status())
+                elif path == '/health':
+                    ok, reason = daemon.health()
+                    self._send(200 if ok else 503, {"ok": ok, "reason": reason})
+                else:
+                    self.send_error(404)
+
+            def do_POST(self):
+                if urlparse(self.path).path != '/jobs':
+                    self.send_error(404)
+                    return
+                try:
+                    length = int(self.headers.get('Content-Length', 0))
+                    data = json.loads(self.rfile.read(length) or b'{}')
+                    job = Job(data["kind"], data.get("account"), int(data.get("priority", 5)),
+                              data.get("params"), int(data.get("timeout", 3 * 3600)))
+                    if job.kind in ("sync", "resolve_media"):
+                        daemon._account(job)
+                    delay = float(data.get("delay", 0))
+                    if not 0 <= delay < float("inf"):
+                        raise ValueError(f"Invalid delay {data.get('delay')!r}")
+                except (KeyError, ValueError, TypeError) as e:
+                    self.send_error(400, str(e))
+                    return
+                daemon.submit(job, delay=delay)
+                self._send(202, job.to_dict())
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        return DaemonHandler
+
+    # Lifecycle
+
+    def stop(self):
+        """Stop after the running job finishes"""
+        with self.cond:
+            self.stopping = True
+            self.cond.notify_all()
+
+    def run_forever(self):
+        """Serve the status endpoint and run jobs until stop() or Ctrl+C"""
+        self.server = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        logger.info(f"Sync daemon listening on http://{self.host}:{self.port}/status")
+        self._schedule_defaults()
+        try:
+            while True:
+                job, every = self._next_job()
+                if job is None:
+                    break
+                self._run(job, every)
+        except KeyboardInterrupt:
+            logger.info("Interrupted, shutting down")
+        finally:
+            self.stop()
+            self.server.shutdown()
+            self.server.server_close()
+            self._quit_browser()
+
+
+if __name__ == "__main__":
+
+    daemon = SyncDaemon([
+        Account("tim4sk", interval=3600),
+    ])
+    daemon.run_forever()
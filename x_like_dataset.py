@@ -0,0 +1,367 @@
+# -*- coding: utf-8 -*-
+from datetime import date as dt_date
+
+import numpy as np
+from loguru import logger
+
+from x_like_io import STATUS_ID_PATTERN, tweet_id_from_url
+from x_like_record import COUNT_FIELDS, iter_rows
+
+
+EPOCH_ORDINAL = dt_date(1970, 1, 1).toordinal()
+
+
+def _day_number(date):
+    """Days since 1970-01-01 for a "YYYY-MM-DD" string, -1 if missing"""
+    if not date:
+        return -1
+    try:
+        return dt_date(int(date[:4]), int(date[5:7]), int(date[8:10])).toordinal() - EPOCH_ORDINAL
+    except ValueError:
+        return -1
+
+
+def _day_string(day):
+    if day < 0:
+        return ""
+    return dt_date.fromordinal(int(day) + EPOCH_ORDINAL).strftime("%Y-%m-%d")
+
+
+class Dictionary:
+    """Dictionary encoding of a string column into dense integer codes"""
+
+    def __init__(self, values=None):
+        self.values = list(values or [])
+        self.codes = {value: i for i, value in enumerate(self.values)}
+
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def code_of(self, value):
+        """Code of a value or -1 if it never occurs (matches nothing in filters)"""
+        return self.codes.get(value, -1)
+
+    def __getitem__(self, code):
+        return self.values[code]
+
+    def __len__(self):
+        return len(self.values)
+
+
+class TweetDataset:
+    """
+    Columnar in-memory tweet archive.
+    Authors, languages and media types are dictionary encoded, counts are int64 arrays,
+    dates are int64 days since epoch and the tweet URL is rebuilt from handle and id.
+    """
+
+    def __init__(self, ids, days, author_codes, lang_codes, media_codes, counts,
+                 authors, author_names, langs, media_types, texts=None):
+        self.ids = ids
+        self.days = days
+        self.author_codes = author_codes
+        self.lang_codes = lang_codes
+        self.media_codes = media_codes
+        self.counts = counts
+        self.authors = authors
+        self.author_names = author_names
+        self.langs = langs
+        self.media_types = media_types
+        self.texts = texts
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_rows(cls, rows, load_text=True):
+        """
+        Build a dataset from an iterable of tweet dicts. Duplicate URLs keep the last row.
+        :param rows: Iterable of tweet dicts
+        :param load_text: Keep tweet text (the only non-columnar field)
+        """
+        authors, langs, media_types = Dictionary(), Dictionary(), Dictionary()
+        author_names = []
+        position = {}
+        ids, days, author_codes, lang_codes, media_codes, texts = [], [], [], [], [], []
+        counts = {field: [] for field in COUNT_FIELDS}
+
+        for row in rows:
+            tweet_id = tweet_id_from_url(row.get("url"))
+            if tweet_id is None:
+                continue
+            handle = row.get("author_handle") or ""
+            code = authors.encode(handle)
+            if code == len(author_names):
+                author_names.append(row.get("author_name") or "")
+            values = (
+                _day_number(row.get("date")),
+                code,
+                langs.encode(row.get("lang") or ""),
+                media_types.encode(row.get("media_type") or "No media"),
+            )
+            row_counts = [row.get(f) or 0 for f in COUNT_FIELDS]
+
+            i = position.get(tweet_id)
+            if i is None:
+                position[tweet_id] = len(ids)
+                ids.append(tweet_id)
+                for column, value in zip((days, author_codes, lang_codes, media_codes), values):
+                    column.append(value)
+                for field, value in zip(COUNT_FIELDS, row_counts):
+                    counts[field].append(value)
+                if load_text:
+                    texts.append(row.get("text") or "")
+            else:
+                for column, value in zip((days, author_codes, lang_codes, media_codes), values):
+                    column[i] = value
+                for field, value in zip(COUNT_FIELDS, row_counts):
+                    counts[field][i] = value
+                if load_text:
+                    texts[i] = row.get("text") or ""
+
+        return cls(
+            ids=np.array(ids, dtype=np.int64),
+            days=np.array(days, dtype=np.int64),
+            author_codes=np.array(author_codes, dtype=np.int32),
+            lang_codes=np.array(lang_codes, dtype=np.int16),
+            media_codes=np.array(media_codes, dtype=np.int8),
+            counts={field: np.array(values, dtype=np.int64) for field, values in counts.items()},
+            authors=authors,
+            author_names=author_names,
+            langs=langs,
+            media_types=media_types,
+            texts=texts if load_text else None,
+        )
+
+    @classmethod
+    def from_jsonl(cls, jsonl_file, load_text=True):
+        dataset = cls.from_rows(iter_rows(jsonl_file), load_text=load_text)
+        logger.info(f"Loaded {len(dataset)} tweets from {jsonl_file} ({dataset.nbytes() / 1e6:.1f} MB)")
+        return dataset
+
+    @classmethod
+    def from_parquet(cls, parquet_file, load_text=True):
+        """Read only the needed columns of a Parquet export (needs pyarrow)"""
+        import pandas as pd
+        import pyarrow.parquet as pq
+
+        columns = ["url", "date", "author_handle", "author_name", "lang", "media_type", "num_view"]
+        columns += list(COUNT_FIELDS)
+        if load_text:
+            columns.append("text")
+        names = set(pq.read_schema(parquet_file).names)
+        df = pd.read_parquet(parquet_file, columns=[c for c in columns if c in names])
+        dataset = cls.from_frame(df, load_text=load_text)
+        logger.info(f"Loaded {len(dataset)} tweets from {parquet_file} ({dataset.nbytes() / 1e6:.1f} MB)")
+        return dataset
+
+    @classmethod
+    def from_frame(cls, df, load_text=True):
+        """
+        Build a dataset from a DataFrame of tweet rows with vectorized column operations,
+        same result as from_rows (duplicate URLs keep the last row at the first row's position)
+        :param df: DataFrame with the JSONL columns, missing columns take their defaults
+        :param load_text: Keep tweet text
+        """
+        import pandas as pd
+
+        def column(name, default=""):
+            if name not in df.columns:
+                return pd.Series(default, index=df.index, dtype=object)
+            return df[name].where(df[name].notna() & (df[name] != ""), default)
+
+        def count(name):
+            if name not in df.columns:
+                return pd.Series(0, index=df.index, dtype=np.int64)
+            values = pd.to_numeric(df[name], errors="coerce").replace([np.inf, -np.inf], np.nan)
+            return values.fillna(0).astype(np.int64)
+
+        ids = pd.to_numeric(column("url").astype(str).str.extract(STATUS_ID_PATTERN, expand=False),
+                            errors="coerce")
+        frame = pd.DataFrame({
+            "id": ids,
+            "date": column("date").astype(str).str[:10],
+            "author": column("author_handle"),
+            "author_name": column("author_name"),
+            "lang": column("lang"),
+            "media_type": column("media_type", "No media"),
+            **{field: count(field) for field in COUNT_FIELDS},
+        })
+        # Unversioned exports stored views as num_view
+        if "num_view" in df.columns:
+            frame["num_views"] = frame["num_views"].where(frame["num_views"] != 0, count("num_view"))
+        if load_text:
+            frame["text"] = column("text")
+        frame = frame[frame["id"].notna()]
+        frame["id"] = frame["id"].astype(np.int64)
+
+        # Authors keep the name of their first row, like Dictionary.encode in from_rows
+        author_codes, authors = pd.factorize(frame["author"])
+        author_names = frame["author_name"].groupby(author_codes).first()
+
+        first = frame.drop_duplicates("id", keep="first")["id"]
+        last = frame.drop_duplicates("id", keep="last").set_index("id").loc[first]
+        days = pd.to_datetime(last["date"], format="%Y-%m-%d", errors="coerce")
+        days = np.where(days.isna(), -1, days.to_numpy().astype("datetime64[D]").astype(np.int64))
+        lang_codes, langs = pd.factorize(last["lang"])
+        media_codes, media_types = pd.factorize(last["media_type"])
+        author_index = pd.Index(authors)
+
+        return cls(
+            ids=first.to_numpy(dtype=np.int64),
+            days=days.astype(np.int64),
+            author_codes=author_index.get_indexer(last["author"]).astype(np.int32),
+            lang_codes=lang_codes.astype(np.int16),
+            media_codes=media_codes.astype(np.int8),
+            counts={field: last[field].to_numpy(dtype=np.int64) for field in COUNT_FIELDS},
+            authors=Dictionary(authors.tolist()),
+            author_names=author_names.tolist(),
+            langs=Dictionary(langs.tolist()),
+            media_types=Dictionary(media_types.tolist()),
+            texts=last["text"].tolist() if load_text else None,
+        )
+
+    def nbytes(self):
+        """Memory used by the numeric columns"""
+        arrays = [self.ids, self.days, self.author_codes, self.lang_codes, self.media_codes]
+        arrays += list(self.counts.values())
+        return sum(a.nbytes for a in arrays)
+
+    def mask(self, author=None, media_type=None, lang=None, start_date=None, end_date=None, **minimums):
+        """
+        Vectorized row filter
+        :param author: Author handle (with @ symbol)
+        :param media_type: "Image", "Video" or "No media"
+        :param lang: Language code
+        :param start_date: Inclusive "YYYY-MM-DD" lower bound
+        :param end_date: Inclusive "YYYY-MM-DD" upper bound
+        :param minimums: Lower bounds on count fields, e.g. num_like=100
+        :return: Boolean numpy array
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if author is not None:
+            mask &= self.author_codes == self.authors.code_of(author)
+        if media_type is not None:
+            mask &= self.media_codes == self.media_types.code_of(media_type)
+        if lang is not None:
+            mask &= self.lang_codes == self.langs.code_of(lang)
+        if start_date:
+            mask &= self.days >= _day_number(start_date)
+        if end_date:
+            mask &= self.days <= _day_number(end_date)
+        for field, minimum in minimums.items():
+            mask &= self.counts[field] >= minimum
+        return mask
+
+    def take(self, indices):
+        """
+        Subset by boolean mask or index array, sharing the dictionaries
+        :param indices: Boolean mask or integer indices
+        :return: New TweetDataset
+        """
+        if isinstance(indices, np.ndarray) and indices.dtype == bool:
+            indices = np.flatnonzero(indices)
+        return TweetDataset(
+            ids=self.ids[indices],
+            days=self.days[indices],
+            author_codes=self.author_codes[indices],
+            lang_codes=self.lang_codes[indices],
+            media_codes=self.media_codes[indices],
+            counts={field: values[indices] for field, values in self.counts.items()},
+            authors=self.authors,
+            author_names=self.author_names,
+            langs=self.langs,
+            media_types=self.media_types,
+            texts=[self.texts[i] for i in indices] if self.texts is not None else None,
+        )
+
+    def filter(self, **kwargs):
+        return self.take(self.mask(**kwargs))
+
+    def argsort(self, field="date", descending=True):
+        """
+        Stable sort order by "date", "id" or a count field, ties keep their row order either way
+        :return: Integer index array
+        """
+        if field == "date":
+            keys = self.days
+        elif field == "id":
+            keys = self.ids
+        else:
+            keys = self.counts[field]
+        # Reversing an ascending sort would also reverse the ties, sort the negated keys instead
+        return np.argsort(-keys if descending else keys, kind="stable")
+
+    def sort(self, field="date", descending=True):
+        return self.take(self.argsort(field, descending))
+
+    def group_count(self, by="author"):
+        """
+        Row counts per dictionary value, largest first
+        :param by: "author", "lang" or "media_type"
+        :return: List of (value, count)
+        """
+        codes, dictionary = self._group_column(by)
+        counts = np.bincount(codes, minlength=len(dictionary))
+        order = np.argsort(-counts, kind="stable")
+        return [(dictionary[i], int(counts[i])) for i in order if counts[i] > 0]
+
+    def group_sum(self, by="author", field="num_like"):
+        """
+        Sum of a count field per dictionary value, largest first
+        :return: List of (value, total)
+        """
+        codes, dictionary = self._group_column(by)
+        totals = np.bincount(codes, weights=self.counts[field], minlength=len(dictionary))
+        order = np.argsort(-totals, kind="stable")
+        return [(dictionary[i], int(totals[i])) for i in order if totals[i] > 0]
+
+    def per_day(self):
+        """
+        Tweet counts per day
+        :return: List of ("YYYY-MM-DD", count) in date order
+        """
+        days, counts = np.unique(self.days[self.days >= 0], return_counts=True)
+        return [(_day_string(d), int(c)) for d, c in zip(days, counts)]
+
+    def _group_column(self, by):
+        if by == "author":
+            return self.author_codes, self.authors
+        if by == "lang":
+            return self.lang_codes, self.langs
+        if by == "media_type":
+            return self.media_codes, self.media_types
+        raise ValueError(f"Unknown group column: {by}")
+
+    def row(self, i):
+        """Decode a single row back to the JSONL dict layout"""
+        handle = self.authors[self.author_codes[i]]
+        row = {
+            "text": self.texts[i] if self.texts is not None else "",
+            "author_name": self.author_names[self.author_codes[i]],
+            "author_handle": handle,
+            "date": _day_string(self.days[i]),
+            "lang": self.langs[self.lang_codes[i]],
+            "url": f"https://twitter.com/{handle.lstrip('@')}/status/{self.ids[i]}",
+            "media_type": self.media_types[self.media_codes[i]],
+        }
+        row.update({field: int(values[i]) for field, values in self.counts.items()})
+        return row
+
+    def iter_rows(self):
+        for i in range(len(self)):
+            yield self.row(i)
+
+
+if __name__ == "__main__":
+
+    dataset = TweetDataset.from_jsonl("data/x.jsonl")
+    recent = dataset.filter(start_date="2024-01-01", num_like=100).sort("num_like")
+    logger.info(f"{len(recent)} tweets since 2024-01-01 with 100+ likes")
+    for handle, count in dataset.group_count("author")[:10]:
+        logger.info(f"{handle}: {count}")
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import re
+import sqlite3
+import threading
+
+import numpy as np
+from loguru import logger
+
+from x_like_io import tweet_id_from_url, file_fingerprint, resume_offset
+from x_like_record import iter_rows_from
+from x_like_search import tokenize
+
+
+NUM_PERM = 64
+BANDS = 16  # 16 bands x 4 rows: pairs above ~0.6 Jaccard collide with high probability
+PRIME = np.uint64(4294967291)  # largest prime below 2^32
+MEDIA_WEIGHT = 4  # an identical image counts as several shared shingles
+MEDIA_ID_PATTERN = re.compile(r'/(?:media|ext_tw_video_thumb|amplify_video_thumb|tweet_video_thumb)/([^/?.]+)')
+
+_rng = np.random.RandomState(1)
+PERM_A = _rng.randint(1, 4294967291, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+PERM_B = _rng.randint(0, 4294967291, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signatures (
+    id INTEGER PRIMARY KEY,
+    cluster_id INTEGER,
+    signature BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_signatures_cluster ON signatures(cluster_id);
+CREATE TABLE IF NOT EXISTS bands (
+    band INTEGER,
+    bucket INTEGER,
+    id INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_bands ON bands(band, bucket);
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY,
+    offset INTEGER,
+    fingerprint TEXT
+);
+"""
+
+
+def shingles(row):
+    """
+    Features of a tweet: token 2-grams of the text (words and CJK bigrams)
+    plus the media ids of attached images and video posters
+    """
+    tokens = tokenize(row.get("text"))
+    features = {f"{a} {b}" for a, b in zip(tokens, tokens[1:])} or set(tokens)
+    for url in row.get("images_urls") or []:
+        match = MEDIA_ID_PATTERN.search(url)
+        if match:
+            features.update(f"media:{match.group(1)}:{i}" for i in range(MEDIA_WEIGHT))
+    return features
+
+
+def minhash(features):
+    """
+    MinHash signature of a feature set
+    :return: uint64 array of NUM_PERM values, or None for an empty set
+    """
+    if not features:
+        return None
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(f.encode("utf-8"), digest_size=4).digest(), "little") for f in features],
+        dtype=np.uint64,
+    )
+    # a, b < 2^32 and hash < 2^32 so a * hash + b fits in uint64 before the modulo
+    values = (np.outer(hashes, PERM_A) + PERM_B) % PRIME
+    return values.min(axis=0)
+
+
+def _band_buckets(signature):
+    rows = NUM_PERM // BANDS
+    return [
+        int.from_bytes(hashlib.blake2b(signature[b * rows:(b + 1) * rows].tobytes(), digest_size=8).digest(),
+                       "little", signed=True)
+        for b in range(BANDS)
+    ]
+
+
+class DuplicateIndex:
+    """
+    Incremental near-duplicate clustering with MinHash + LSH banding.
+    A new tweet joins the cluster of its most similar earlier tweet (estimated Jaccard >= threshold),
+    otherwise it starts a cluster whose id is its own tweet id.
+    """
+
+    def __init__(self, db_path="data/dedup.db", threshold=0.6):
+        self.threshold = threshold
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        if "fingerprint" not in [c[1] for c in self.conn.execute("PRAGMA table_info(sources)")]:
+            self.conn.execute("ALTER TABLE sources ADD COLUMN fingerprint TEXT")
+
+    def _assign(self, tweet_id, signature):
+        found = self.conn.execute("SELECT cluster_id FROM signatures WHERE id = ?", (tweet_id,)).fetchone()
+        if found:
+            return found[0]
+
+        buckets = _band_buckets(signature)
+        candidates = set()
+        for band, bucket in enumerate(buckets):
+            for (candidate,) in self.conn.execute(
+                    "SELECT id FROM bands WHERE band = ? AND bucket = ?", (band, bucket)):
+                candidates.add(candidate)
+
+        cluster_id, best = tweet_id, self.threshold
+        for candidate in candidates:
+            other_cluster, blob = self.conn.execute(
+                "SELECT cluster_id, signature FROM signatures WHERE id = ?", (candidate,)
+            ).fetchone()
+            similarity = float(np.mean(np.frombuffer(blob, dtype=np.uint64) == signature))
+            if similarity >= best:
+                cluster_id, best = other_cluster, similarity
+
+        self.conn.execute("INSERT INTO signatures VALUES (?, ?, ?)", (tweet_id, cluster_id, signature.tobytes()))
+        self.conn.executemany("INSERT INTO bands VALUES (?, ?, ?)",
+                              [(band, bucket, tweet_id) for band, bucket in enumerate(buckets)])
+        return cluster_id
+
+    def add_rows(self, rows):
+        """
+        Assign cluster ids to rows
+        :param rows: Iterable of tweet dicts
+        :return: {tweet_id: cluster_id} for the rows that could be signed
+        """
+        assigned = {}
+        with self.lock, self.conn:
+            for row in rows:
+                tweet_id = tweet_id_from_url(row.get("url"))
+                signature = minhash(shingles(row))
+                if tweet_id is None or signature is None:
+                    continue
+                assigned[tweet_id] = self._assign(tweet_id, signature)
+        return assigned
+
+    def update_from_jsonl(self, jsonl_file):
+        """
+        Cluster rows appended to a JSONL file since the last call, or all of them if the file was rewritten
+        :return: Number of new rows that joined an existing cluster
+        """
+        found = self.conn.execute("SELECT offset, fingerprint FROM sources WHERE path = ?", (jsonl_file,)).fetchone()
+        offset = resume_offset(jsonl_file, *found) if found else 0
+        duplicates = total = 0
+        with self.lock, self.conn:
+            for row, offset in iter_rows_from(jsonl_file, offset):
+                tweet_id = tweet_id_from_url(row.get("url"))
+                signature = minhash(shingles(row))
+                if tweet_id is None or signature is None:
+                    continue
+                total += 1
+                if self._assign(tweet_id, signature) != tweet_id:
+                    duplicates += 1
+            self.conn.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?)",
+                              (jsonl_file, offset, file_fingerprint(jsonl_file, offset)))
+        if total:
+            logger.info(f"Clustered {total} new tweets from {jsonl_file}, {duplicates} near-duplicates")
+        return duplicates
+
+    def cluster_of(self, url):
+        """Cluster id of a tweet URL, or None if it has not been clustered"""
+        tweet_id = tweet_id_from_url(url)
+        with self.lock:
+            found = self.conn.execute("SELECT cluster_id FROM signatures WHERE id = ?", (tweet_id,)).fetchone()
+        return found[0] if found else None
+
+    def cluster_map(self):
+        """{tweet_id: cluster_id} for every clustered tweet"""
+        with self.lock:
+            return dict(self.conn.execute("SELECT id, cluster_id FROM signatures"))
+
+    def duplicate_ratio(self):
+        with self.lock:
+            total, clusters = self.conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT cluster_id) FROM signatures"
+            ).fetchone()
+        return 1 - clusters / total if total else 0.0
+
+
+def representatives(rows, cluster_map):
+    """
+    Yield only the first row of every cluster, so downstream stages (enrichment,
+    exports) process each cluster once. Rows that were never clustered pass through.
+    :param rows: Iterable of tweet dicts
+    :param cluster_map: {tweet_id: cluster_id} from DuplicateIndex.cluster_map()
+    """
+    seen = set()
+    for row in rows:
+        tweet_id = tweet_id_from_url(row.get("url"))
+        cluster_id = cluster_map.get(tweet_id, tweet_id)
+        if cluster_id in seen:
+            continue
+        seen.add(cluster_id)
+        yield row
+
+
+if __name__ == "__main__":
+
+    index = DuplicateIndex("data/dedup.db")
+    index.update_from_jsonl("data/x.jsonl")
+    logger.info(f"Duplicate ratio: {index.duplicate_ratio():.1%}")
@@ -0,0 +1,424 @@
+# -*- coding: utf-8 -*-
+import glob
+import heapq
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from array import array
+from datetime import datetime
+
+from loguru import logger
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from x_like_io import is_side_file, tweet_id_from_url
+from x_like_record import COUNT_FIELDS, iter_rows
+
+
+MAGIC = b"XLTS1\n"
+RUN_FILE_TIME = re.compile(r"tweets_(\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})")
+
+
+def _zigzag(n):
+    return (n << 1) ^ (n >> 63)
+
+
+def _unzigzag(n):
+    return (n >> 1) ^ -(n & 1)
+
+
+def _write_varint(out, n):
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _lock(f):
+    """Exclusive lock on an open log, held by one writer across decode and append"""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+
+def _unlock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _read_varint(buf, pos):
+    result = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+class EngagementStore:
+    """
+    Append-only time series of (tweet_id, observed_at, like/retweet/reply/view counts).
+
+    Every observation is one self-delimiting frame of varints:
+        key = ordinal << 1 | new      (new frames carry the tweet id once, later ones only the ordinal)
+        [tweet_id]                    (new frames only)
+        zigzag(observed_at - previous observed_at of the tweet)
+        zigzag(count - previous count of the tweet) for each of COUNT_FIELDS
+    A repeated observation of a tweet is typically 8-12 bytes instead of a full JSON row.
+
+    Decoded observations are kept in flat arrays with a per-tweet chain (prev) for range
+    queries. The arrays are snapshotted next to the log on close, so opening a large store
+    only decodes the frames appended since.
+
+    Several stores (scrapes, ThreadCompleter, parse_snapshots) may write the same log.
+    Observations are buffered as they come and only encoded when flushing, under an exclusive
+    lock on the log (fcntl, where available) and after decoding the frames others appended.
+    """
+
+    def __init__(self, path="data/engagement.ts", flush_every=200):
+        """
+        :param path: Log file, the index snapshot is stored as <path>.idx
+        :param flush_every: Buffered observations written to disk in one append
+        """
+        self.path = path
+        self.index_path = f"{path}.idx"
+        self.flush_every = flush_every
+        self.lock = threading.Lock()
+        self.pending = []  # (tweet_id, observed_at, values) not written yet
+        self.pending_last = {}  # tweet_id -> latest pending (observed_at, values)
+        self.pending_keys = set()  # (tweet_id, observed_at) of the pending observations
+        self._reset()
+        self._open()
+
+    # Loading
+
+    def _open(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        try:
+            with open(self.path, "xb") as f:
+                f.write(MAGIC)
+            return
+        except FileExistsError:
+            pass
+        self._load_index()
+        start = time.time()
+        with open(self.path, "r+b") as f:
+            _lock(f)
+            try:
+                if f.read(len(MAGIC)) != MAGIC:
+                    raise ValueError(f"{self.path} is not an engagement store")
+                decoded = self._catch_up(f)
+            finally:
+                _unlock(f)
+        if decoded:
+            logger.info(f"Decoded {decoded} engagement observations in {time.time() - start:.2f}s")
+
+    def _catch_up(self, f):
+        """
+        Decode the frames appended to the log since valid_length. Call with the log locked.
+        Whatever cannot be decoded (a frame cut off by a crash, or a bad frame) is truncated.
+        """
+        f.seek(self.valid_length)
+        tail = f.read()
+        end = self.valid_length + len(tail)
+        decoded = self._decode(tail)
+        if self.valid_length < end:
+            logger.warning(f"Truncating {end - self.valid_length} bytes of {self.path} after the last valid frame")
+            f.truncate(self.valid_length)
+        return decoded
+
+    def _decode(self, buf):
+        pos, decoded = 0, 0
+        while pos < len(buf):
+            try:
+                key, p = _read_varint(buf, pos)
+                tweet_id = None
+                if key & 1:
+                    tweet_id, p = _read_varint(buf, p)
+                deltas = []
+                for _ in range(len(COUNT_FIELDS) + 1):
+                    value, p = _read_varint(buf, p)
+                    deltas.append(_unzigzag(value))
+            except IndexError:
+                break
+            ordinal = key >> 1
+            if ordinal != len(self.ids) if tweet_id is not None else ordinal >= len(self.ids):
+                logger.error(f"{self.path}: unexpected ordinal {ordinal} at byte {self.valid_length + pos}")
+                break
+            if tweet_id is not None:
+                self._add_tweet(tweet_id)
+                observed_at, values = deltas[0], deltas[1:]
+            else:
+                last = self.last[ordinal]
+                observed_at = self.time[last] + deltas[0]
+                values = [self.counts[name][last] + d for name, d in zip(COUNT_FIELDS, deltas[1:])]
+            self._append(ordinal, observed_at, values)
+            pos = p
+            decoded += 1
+        self.valid_length += pos
+        return decoded
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, "rb") as f:
+                header = json.loads(f.readline())
+                if header["valid_length"] > os.path.getsize(self.path):
+                    raise ValueError("index is newer than the log")
+                arrays = [self.ids, self.last, self.tweet, self.prev, self.time] + [self.counts[n] for n in COUNT_FIELDS]
+                for target, size in zip(arrays, header["sizes"]):
+                    target.fromfile(f, size)
+        except (OSError, EOFError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring engagement index {self.index_path}: {e}")
+            self._reset()
+            return
+        self.ordinals = {tweet_id: ordinal for ordinal, tweet_id in enumerate(self.ids)}
+        self.valid_length = header["valid_length"]
+
+    def _reset(self):
+        self.ids = array("q")  # ordinal -> tweet id
+        self.ordinals = {}  # tweet id -> ordinal
+        self.last = array("i")  # ordinal -> position of its latest observation
+        self.tweet = array("i")  # position -> ordinal
+        self.prev = array("i")  # position -> previous position of the same tweet, -1 for the first
+        self.time = array("q")  # position -> observed_at (unix seconds)
+        self.counts = {name: array("q") for name in COUNT_FIELDS}
+        self.valid_length = len(MAGIC)
+
+    def _save_index(self):
+        arrays = [self.ids, self.last, self.tweet, self.prev, self.time] + [self.counts[n] for n in COUNT_FIELDS]
+        fd, tmp_file = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(os.path.abspath(self.index_path)))
+        with os.fdopen(fd, "wb") as f:
+            header = {"valid_length": self.valid_length, "sizes": [len(a) for a in arrays]}
+            f.write(json.dumps(header).encode("utf-8") + b"\n")
+            for a in arrays:
+                a.tofile(f)
+        os.replace(tmp_file, self.index_path)
+
+    def _add_tweet(self, tweet_id):
+        ordinal = len(self.ids)
+        self.ids.append(tweet_id)
+        self.ordinals[tweet_id] = ordinal
+        self.last.append(-1)
+        return ordinal
+
+    def _append(self, ordinal, observed_at, values):
+        position = len(self.time)
+        self.tweet.append(ordinal)
+        self.prev.append(self.last[ordinal])
+        self.time.append(observed_at)
+        for name, value in zip(COUNT_FIELDS, values):
+            self.counts[name].append(value)
+        self.last[ordinal] = position
+
+    # Writing
+
+    def observe(self, tweet_id, counts, observed_at=None):
+        """
+        Record the counts of a tweet. An observation equal to the tweet's latest one, or at a time
+        the tweet already has one for (a snapshot parsed again), is skipped.
+        :param tweet_id: Numeric status id
+        :param counts: Dict with COUNT_FIELDS
+        :param observed_at: Unix seconds or datetime, now by default
+        :return: True if the observation was stored
+        """
+        if observed_at is None:
+            observed_at = time.time()
+        elif isinstance(observed_at, datetime):
+            observed_at = observed_at.timestamp()
+        observed_at = int(observed_at)
+        values = [int(counts.get(name) or 0) for name in COUNT_FIELDS]
+        with self.lock:
+            latest = self.pending_last.get(tweet_id) or self._latest(tweet_id)
+            if latest == (observed_at, values) or self._observed(tweet_id, observed_at):
+                return False
+            self.pending.append((tweet_id, observed_at, values))
+            self.pending_last[tweet_id] = (observed_at, values)
+            self.pending_keys.add((tweet_id, observed_at))
+            if len(self.pending) >= self.flush_every:
+                self._flush()
+        return True
+
+    def _observed(self, tweet_id, observed_at):
+        if (tweet_id, observed_at) in self.pending_keys:
+            return True
+        ordinal = self.ordinals.get(tweet_id)
+        return ordinal is not None and any(self.time[p] == observed_at for p in self._chain(ordinal))
+
+    def _latest(self, tweet_id):
+        ordinal = self.ordinals.get(tweet_id)
+        if ordinal is None:
+            return None
+        last = self.last[ordinal]
+        return self.time[last], [self.counts[name][last] for name in COUNT_FIELDS]
+
+    def _encode(self, out, tweet_id, observed_at, values):
+        """Append the frame of one observation to out and apply it, False if it repeats the latest one"""
+        ordinal = self.ordinals.get(tweet_id)
+        if ordinal is None:
+            ordinal = self._add_tweet(tweet_id)
+            _write_varint(out, ordinal << 1 | 1)
+            _write_varint(out, tweet_id)
+            _write_varint(out, _zigzag(observed_at))
+            for value in values:
+                _write_varint(out, _zigzag(value))
+        else:
+            last = self.last[ordinal]
+            previous = [self.counts[name][last] for name in COUNT_FIELDS]
+            if self.time[last] == observed_at and previous == values:
+                return False
+            _write_varint(out, ordinal << 1)
+            _write_varint(out, _zigzag(observed_at - self.time[last]))
+            for value, before in zip(values, previous):
+                _write_varint(out, _zigzag(value - before))
+        self._append(ordinal, observed_at, values)
+        return True
+
+    def observe_row(self, row, observed_at=None):
+        """observe() for a scraped tweet dict"""
+        tweet_id = tweet_id_from_url(row.get("url"))
+        if tweet_id is None:
+            return False
+        return self.observe(tweet_id, row, observed_at)
+
+    def _flush(self):
+        """Decode what other writers appended, then encode and append the buffered observations"""
+        with open(self.path, "r+b") as f:
+            _lock(f)
+            try:
+                self._catch_up(f)
+                if self.pending:
+                    out = bytearray()
+                    for tweet_id, observed_at, values in self.pending:
+                        self._encode(out, tweet_id, observed_at, values)
+                    f.seek(self.valid_length)
+                    f.write(out)
+                    self.valid_length += len(out)
+            finally:
+                _unlock(f)
+        self.pending = []
+        self.pending_last = {}
+        self.pending_keys = set()
+
+    def flush(self):
+        """Write buffered observations and pick up the ones other writers added"""
+        with self.lock:
+            self._flush()
+
+    def close(self):
+        """Write buffered observations and the index snapshot"""
+        with self.lock:
+            self._flush()
+            self._save_index()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def import_jsonl(self, jsonl_file, observed_at=None):
+        """
+        Backfill observations from an existing JSONL file. The time of a run file is taken
+        from its tweets_<date>_<time> name, other files use their modification time.
+        :return: Number of observations stored
+        """
+        if observed_at is None:
+            match = RUN_FILE_TIME.search(os.path.basename(jsonl_file))
+            if match:
+                observed_at = datetime.strptime(match.group(1), "%Y-%m-%d_%H-%M-%S").timestamp()
+            else:
+                observed_at = os.path.getmtime(jsonl_file)
+        stored = sum(self.observe_row(row, observed_at) for row in iter_rows(jsonl_file))
+        logger.info(f"Imported {stored} observations from {jsonl_file}")
+        return stored
+
+    def backfill(self, patterns=("data/tweets_*.jsonl",)):
+        """Import every run file, oldest first. Snapshot and video side files are skipped"""
+        paths = sorted(path for pattern in patterns for path in glob.glob(pattern) if not is_side_file(path))
+        return sum(self.import_jsonl(path) for path in paths)
+
+    # Queries
+
+    def _chain(self, ordinal):
+        position = self.last[ordinal]
+        while position >= 0:
+            yield position
+            position = self.prev[position]
+
+    def series(self, tweet_id, start=None, end=None):
+        """
+        Observations of one tweet in [start, end], oldest first
+        :return: List of {"observed_at", <count fields>}
+        """
+        self.flush()
+        ordinal = self.ordinals.get(tweet_id)
+        if ordinal is None:
+            return []
+        positions = [p for p in self._chain(ordinal)
+                     if (start is None or self.time[p] >= start) and (end is None or self.time[p] <= end)]
+        positions.sort(key=lambda p: self.time[p])
+        return [{"observed_at": self.time[p], **{name: self.counts[name][p] for name in COUNT_FIELDS}}
+                for p in positions]
+
+    def top_growers(self, field="num_like", start=None, end=None, n=20, relative=False):
+        """
+        Tweets whose count grew the most between their latest observation at or before start
+        and their latest observation at or before end
+        :param field: One of COUNT_FIELDS
+        :param start: Unix seconds, the first observation of each tweet by default
+        :param end: Unix seconds, now by default
+        :param relative: Rank by growth ratio instead of absolute growth
+        :return: List of {"tweet_id", "start", "end", "growth", "ratio"}
+        """
+        if field not in COUNT_FIELDS:
+            raise ValueError(f"Unknown field {field!r}, expected one of {COUNT_FIELDS}")
+        self.flush()
+        end = time.time() if end is None else end
+        counts, times = self.counts[field], self.time
+        candidates = []
+        for ordinal, tweet_id in enumerate(self.ids):
+            chain = [p for p in self._chain(ordinal) if times[p] <= end]
+            if len(chain) < 2:
+                continue
+            chain.sort(key=lambda p: times[p])
+            if start is None:
+                first = chain[0]
+            else:
+                before = [p for p in chain if times[p] <= start]
+                if not before:
+                    continue
+                first = before[-1]
+            last = chain[-1]
+            if last == first:
+                continue
+            growth = counts[last] - counts[first]
+            ratio = growth / counts[first] if counts[first] else float(growth)
+            candidates.append((ratio if relative else growth, tweet_id, counts[first], counts[last], growth, ratio))
+        top = heapq.nlargest(n, candidates)
+        return [{"tweet_id": t[1], "start": t[2], "end": t[3], "growth": t[4], "ratio": round(t[5], 4)} for t in top]
+
+    def stats(self):
+        return {
+            "tweets": len(self.ids),
+            "observations": len(self.time),
+            "bytes": self.valid_length,
+            "pending": len(self.pending),
+        }
+
+
+if __name__ == "__main__":
+
+    with EngagementStore("data/engagement.ts") as store:
+        store.backfill(("data/tweets_*.jsonl",))
+        logger.info(store.stats())
+        for grower in store.top_growers("num_like", n=10):
+            logger.info(grower)
@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import openai
+from openai import OpenAI
+from loguru import logger
+
+from config import OPENAI_API_KEY, BASE_URL, LLM_MODEL
+from x_like_dedup import representatives
+from x_like_io import tweet_id_from_url
+from x_like_links import LinkCache, resolved_links
+from x_like_ratelimit import retry_after_seconds
+from x_like_record import iter_rows
+
+
+# Bump when the prompt or output schema changes, cached results of older versions are ignored
+PROMPT_VERSION = "v1"
+
+SYSTEM_PROMPT = """You annotate tweets that a user liked and bookmarked for research.
+For every numbered tweet return a summary (one sentence, in the tweet's language), 1-3 broad topics and up to 5 short lowercase tags.
+Reply with JSON only: {"items": [{"id": <number>, "summary": "...", "topics": ["..."], "tags": ["..."]}]}"""
+
+
+def content_key(text, prompt_version=PROMPT_VERSION):
+    """Cache key: hash of the tweet text plus the prompt version"""
+    return hashlib.sha256(f"{prompt_version}\n{text}".encode("utf-8")).hexdigest()
+
+
+class EnrichmentCache:
+    def __init__(self, cache_file="data/enrich_cache.db"):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(cache_file, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS enrichment (key TEXT PRIMARY KEY, prompt_version TEXT, result TEXT)"
+        )
+
+    def get(self, key):
+        with self.lock:
+            found = self.conn.execute("SELECT result FROM enrichment WHERE key = ?", (key,)).fetchone()
+        return json.loads(found[0]) if found else None
+
+    def contains(self, key):
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM enrichment WHERE key = ?", (key,)).fetchone() is not None
+
+    def close(self):
+        self.conn.close()
+
+    def put_many(self, items, prompt_version=PROMPT_VERSION):
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO enrichment VALUES (?, ?, ?)",
+                [(key, prompt_version, json.dumps(result, ensure_ascii=False)) for key, result in items],
+            )
+
+
+class AdaptiveBackoff:
+    """
+    Shared pacing for all workers: the delay doubles on 429/5xx (or follows Retry-After)
+    and halves on every success, so throughput settles just under the endpoint's limit.
+    """
+
+    def __init__(self, base_delay=0.5, max_delay=60.0):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.delay = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        delay = self.delay
+        if delay > 0:
+            time.sleep(delay)
+
+    def success(self):
+        with self.lock:
+            self.delay = self.delay / 2 if self.delay > self.base_delay else 0.0
+
+    def failure(self, retry_after=None):
+        """
+        :param retry_after: Retry-After header value, seconds or an HTTP date
+        :return: The new delay
+        """
+        seconds = retry_after_seconds(retry_after)
+        with self.lock:
+            if seconds is not None:
+                self.delay = min(self.max_delay, seconds)
+            else:
+                self.delay = min(self.max_delay, max(self.base_delay, self.delay * 2))
+            return self.delay
+
+
+class LLMEnricher:
+    def __init__(self, cache_file="data/enrich_cache.db", model=LLM_MODEL, batch_size=8, concurrency=4,
+                 max_retries=5, json_mode=True, client=None, api_key=OPENAI_API_KEY, base_url=BASE_URL,
+                 link_cache_file="data/link_cache.db"):
+        """
+        :param cache_file: SQLite cache of results keyed by content hash + prompt version
+        :param model: Chat model name
+        :param batch_size: Number of tweets packed into one prompt
+        :param concurrency: Maximum number of requests in flight
+        :param max_retries: Attempts per batch before giving up (the batch is retried on the next run)
+        :param json_mode: Request response_format=json_object (disable for endpoints that reject it)
+        :param client: Optional preconfigured OpenAI client
+        :param link_cache_file: LinkCache whose expanded links are added to the prompt as context
+        """
+        self.cache = EnrichmentCache(cache_file)
+        self.model = model
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.json_mode = json_mode
+        self.client = client or OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+        self.backoff = AdaptiveBackoff()
+        self.stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "failures": 0, "enriched": 0}
+        self.links = None
+        if link_cache_file and os.path.exists(link_cache_file):
+            self.links = LinkCache(link_cache_file, read_only=True)
+
+    def close(self):
+        self.cache.close()
+        if self.links is not None:
+            self.links.close()
+
+    def _count(self, name, n=1):
+        # Called from the worker threads
+        with self.stats_lock:
+            self.stats[name] += n
+
+    @staticmethod
+    def _key(row):
+        """
+        Cache key of a row, from the tweet text only. Links resolved on a later run only change
+        the prompt, so they must not turn an enriched tweet into a cache miss.
+        :return: content_key or None for rows without text
+        """
+        text = (row.get("text") or "").strip()
+        return content_key(text) if text else None
+
+    def _prompt_text(self, row):
+        """Tweet text plus the destinations of its external links, read from the link cache"""
+        text = (row.get("text") or "").strip()
+        if not text:
+            return ""
+        links = [link["final_url"] for link in resolved_links(row, self.links)
+                 if link["kind"] == "external" and link["final_url"]]
+        if links:
+            text = f"{text}\nLinks: " + " ".join(dict.fromkeys(url[:120] for url in links))
+        return text
+
+    def _build_messages(self, texts):
+        body = "\n\n".join(f"[{i + 1}] {text}" for i, text in enumerate(texts))
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": body},
+        ]
+
+    @staticmethod
+    def _parse_response(content, count):
+        # Some endpoints wrap JSON in markdown fences even in JSON mode
+        content = re.sub(r"^```(?:json)?\s*|\s*```$", "", content.strip())
+        items = json.loads(content).get("items", [])
+        results = {}
+        for item in items:
+            try:
+                index = int(item["id"]) - 1
+            except (KeyError, TypeError, ValueError):
+                continue
+            if 0 <= index < count:
+                results[index] = {
+                    "summary": str(item.get("summary", "")),
+                    "topics": [str(t) for t in item.get("topics", [])],
+                    "tags": [str(t) for t in item.get("tags", [])],
+                }
+        return results
+
+    def _enrich_batch(self, batch):
+        """
+        Enrich one batch of (key, text), caching whatever items the model returned
+        :return: Number of tweets enriched
+        """
+        texts = [text for _, text in batch]
+        kwargs = {"response_format": {"type": "json_object"}} if self.json_mode else {}
+        for attempt in range(self.max_retries):
+            self.backoff.wait()
+            self._count("requests")
+            try:
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=self._build_messages(texts),
+                    temperature=0,
+                    **kwargs,
+                )
+                results = self._parse_response(response.choices[0].message.content, len(batch))
+            except (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError) as e:
+                self._count("failures")
+                retry_after = None
+                if getattr(e, "response", None) is not None:
+                    retry_after = e.response.headers.get("retry-after")
+                delay = self.backoff.failure(retry_after)
+                logger.warning(f"LLM request failed ({type(e).__name__}), backing off {delay:.1f}s, attempt {attempt + 1}")
+                continue
+            except openai.APIError as e:
+                # Rejected requests (bad request, auth, context length, ...) fail the same way again
+                self._count("failures")
+                logger.error(f"LLM request failed ({type(e).__name__}: {e}), skipping a batch of {len(batch)} tweets")
+                return 0
+            except (json.JSONDecodeError, AttributeError, IndexError) as e:
+                self._count("failures")
+                logger.warning(f"Could not parse LLM response: {e}, attempt {attempt + 1}")
+                continue
+
+            self.backoff.success()
+            self.cache.put_many([(batch[i][0], result) for i, result in results.items()])
+            self._count("enriched", len(results))
+            return len(results)
+
+        logger.error(f"Giving up on a batch of {len(batch)} tweets, it will be retried on the next run")
+        return 0
+
+    def _iter_batches(self, rows):
+        batch, pending = [], set()
+        for row in rows:
+            key = self._key(row)
+            # Identical texts (retweets, reposts) are enriched once
+            if key is None or key in pending or self.cache.contains(key):
+                continue
+            pending.add(key)
+            batch.append((key, self._prompt_text(row)))
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def enrich_rows(self, rows):
+        """
+        Enrich all rows that are not cached yet. Safe to interrupt and rerun.
+        :param rows: Iterable of tweet dicts (streamed, only a few batches are held in memory)
+        :return: Number of tweets enriched in this run
+        """
+        start = time.time()
+        enriched = 0
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = set()
+            for batch in self._iter_batches(rows):
+                futures.add(executor.submit(self._enrich_batch, batch))
+                if len(futures) >= self.concurrency * 2:
+                    done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                    enriched += sum(f.result() for f in done)
+            enriched += sum(f.result() for f in futures)
+        logger.info(
+            f"Enriched {enriched} tweets in {time.time() - start:.1f}s "
+            f"({self.stats['requests']} requests, {self.stats['failures']} failures)"
+        )
+        return enriched
+
+    def enrich_file(self, jsonl_file, output_file="data/enrichment.jsonl", cluster_map=None):
+        """
+        Enrich a JSONL archive and write one {url, summary, topics, tags} line per tweet
+        :param jsonl_file: Input JSONL file path
+        :param output_file: Output JSONL file path
+        :param cluster_map: Optional {tweet_id: cluster_id} from DuplicateIndex.cluster_map(),
+                            only one tweet per near-duplicate cluster is sent to the model
+        """
+        rows = iter_rows(jsonl_file)
+        if cluster_map is not None:
+            rows = representatives(rows, cluster_map)
+        self.enrich_rows(rows)
+
+        tmp_file = f"{output_file}.tmp"
+        written = 0
+        cluster_results = {}
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            for row in iter_rows(jsonl_file):
+                key = self._key(row)
+                result = self.cache.get(key) if key is not None else None
+                if cluster_map is not None:
+                    tweet_id = tweet_id_from_url(row.get("url"))
+                    cluster_id = cluster_map.get(tweet_id, tweet_id)
+                    if result is None:
+                        result = cluster_results.get(cluster_id)
+                    else:
+                        cluster_results.setdefault(cluster_id, result)
+                if result is None:
+                    continue
+                json.dump({"url": row.get("url"), **result}, f, ensure_ascii=False)
+                f.write("\n")
+                written += 1
+        os.replace(tmp_file, output_file)
+        logger.info(f"Saved enrichment for {written} tweets to {output_file}")
+
+
+if __name__ == "__main__":
+
+    enricher = LLMEnricher("data/enrich_cache.db", batch_size=8, concurrency=4)
+    enricher.enrich_file("data/x.jsonl", "data/enrichment.jsonl")
+    enricher.close()
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+import gzip
+import json
+import os
+import shutil
+from collections import Counter
+from datetime import datetime
+
+from loguru import logger
+
+from x_like_io import tweet_id_from_url, date_key
+from x_like_record import iter_rows
+
+
+# Author fields are moved to the author dictionary instead of being repeated in every row
+AUTHOR_FIELDS = ("author_name", "author_avatar")
+
+
+def _write_gzip_json(path, obj):
+    with gzip.open(path, 'wt', encoding='utf-8', compresslevel=6) as f:
+        json.dump(obj, f, ensure_ascii=False, separators=(',', ':'))
+
+
+def export_shards(jsonl_files, output_dir="data/shards", shard_size=1000, cluster_map=None):
+    """
+    Export tweets as gzip JSON shards sorted newest first, plus an author dictionary
+    and a manifest, so the frontend can paint from the first shard and load the rest lazily.
+    :param jsonl_files: List of JSONL files, later files win for duplicate tweets
+    :param output_dir: Output directory (replaced atomically)
+    :param shard_size: Number of tweets per shard
+    :param cluster_map: Optional {tweet_id: cluster_id} from DuplicateIndex.cluster_map(),
+                        adds cluster_id/cluster_size to rows and the duplicate count to the manifest
+    :return: Manifest dict
+    """
+    tweets = {}
+    authors = {}
+    for jsonl_file in jsonl_files:
+        for row in iter_rows(jsonl_file):
+            url = row.get("url")
+            if not url:
+                continue
+            handle = row.get("author_handle") or ""
+            if handle:
+                name, avatar = authors.get(handle, ("", ""))
+                authors[handle] = (row.get("author_name") or name, row.get("author_avatar") or avatar)
+            for field in AUTHOR_FIELDS:
+                row.pop(field, None)
+            tweets[url] = row
+
+    rows = sorted(
+        tweets.values(),
+        key=lambda r: (date_key(r.get("date")), tweet_id_from_url(r.get("url")) or 0),
+        reverse=True,
+    )
+
+    num_clusters = None
+    if cluster_map is not None:
+        cluster_sizes = Counter()
+        for row in rows:
+            tweet_id = tweet_id_from_url(row.get("url"))
+            row["cluster_id"] = str(cluster_map.get(tweet_id, tweet_id))
+            cluster_sizes[row["cluster_id"]] += 1
+        for row in rows:
+            row["cluster_size"] = cluster_sizes[row["cluster_id"]]
+        num_clusters = len(cluster_sizes)
+
+    tmp_dir = f"{output_dir}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    shards = []
+    for i in range(0, len(rows), shard_size):
+        chunk = rows[i:i + shard_size]
+        filename = f"shard-{len(shards):04d}.json.gz"
+        _write_gzip_json(os.path.join(tmp_dir, filename), chunk)
+        shards.append({
+            "file": filename,
+            "count": len(chunk),
+            # Shards are newest first
+            "start_date": chunk[-1].get("date") or "",
+            "end_date": chunk[0].get("date") or "",
+        })
+
+    _write_gzip_json(os.path.join(tmp_dir, "authors.json.gz"),
+                     {handle: list(info) for handle, info in authors.items()})
+
+    manifest = {
+        "version": 1,
+        "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "total": len(rows),
+        "shard_size": shard_size,
+        "start_date": rows[-1].get("date") if rows else "",
+        "end_date": rows[0].get("date") if rows else "",
+        "authors": "authors.json.gz",
+        "num_authors": len(authors),
+        "num_clusters": num_clusters,
+        "shards": shards,
+    }
+    with open(os.path.join(tmp_dir, "manifest.json"), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+
+    # Swap the whole directory so the viewer never sees a half-written export
+    old_dir = f"{output_dir}.old"
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(output_dir):
+        os.rename(output_dir, old_dir)
+    os.rename(tmp_dir, output_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+    logger.info(f"Exported {len(rows)} tweets in {len(shards)} shards and {len(authors)} authors to {output_dir}")
+    return manifest
+
+
+if __name__ == "__main__":
+
+    export_shards(["data/x.jsonl"], output_dir="data/shards", shard_size=1000)
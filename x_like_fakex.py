@@ -0,0 +1,805 @@
+# -*- coding: utf-8 -*-
+import contextlib
+import http.client
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import requests
+from loguru import logger
+
+
+# Hosts the clients talk to; route_to() sends their requests to the fake server instead
+X_HOSTS = re.compile(r'^https?://(?:api\.|mobile\.)?(?:twitter\.com|x\.com)|^https?://video\.twimg\.com')
+
+FIRST_ID = 1800000000000000000
+RESOLUTIONS = ["480x270", "640x360", "1280x720"]
+
+
+class FakeXConfig:
+    def __init__(self, latency=0.02, jitter=0.01, error_rate=0.0, rate_limit=None, window=60,
+                 reload_rate=0.0, num_tweets=2000, page_size=20, segments=4, segment_size=64 * 1024,
+                 video_every=5, thread_every=7, seed=1):
+        """
+        :param latency: Mean added response delay in seconds
+        :param jitter: Random delay added on top of latency (uniform 0..jitter)
+        :param error_rate: Probability of a 503 on API and media requests
+        :param rate_limit: Requests per window and (endpoint, guest token) before 429, None for unlimited
+        :param window: Rate-limit window in seconds, reported in x-rate-limit-reset
+        :param reload_rate: Probability that a timeline page shows "Something went wrong. Try reloading."
+        :param num_tweets: Tweets in the fake likes timeline
+        :param page_size: Tweets per timeline page
+        :param segments: fMP4 segments per video
+        :param segment_size: Bytes per segment
+        :param video_every: Every n-th tweet has a video
+        :param thread_every: Every n-th tweet is a truncated thread starter
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.window = window
+        self.reload_rate = reload_rate
+        self.num_tweets = num_tweets
+        self.page_size = page_size
+        self.segments = segments
+        self.segment_size = segment_size
+        self.video_every = video_every
+        self.thread_every = thread_every
+        self.seed = seed
+
+
+def fake_tweet(i, config):
+    """Deterministic tweet number i of the timeline (0 is the newest like)"""
+    rng = random.Random(config.seed * 1000003 + i)
+    handle = f"user{rng.randint(1, 200)}"
+    tweet_id = FIRST_ID - i * 7919
+    is_video = i % config.video_every == 0
+    is_thread = not is_video and i % config.thread_every == 0
+    words = " ".join(rng.choice(["llm", "agent", "rag", "prompt", "模型", "推理", "数据", "benchmark"])
+                     for _ in range(rng.randint(8, 40)))
+    return {
+        "id": tweet_id,
+        "handle": handle,
+        "name": f"User {handle[4:]}",
+        "date": (datetime(2025, 4, 10) - timedelta(hours=i * 3)).strftime("%Y-%m-%d"),
+        "text": f"🧵 1/ {words}…" if is_thread else words,
+        "full_text": f"🧵 1/ {words} {words}" if is_thread else words,
+        "media_type": "Video" if is_video else ("Image" if i % 3 == 0 else "No media"),
+        "num_reply": rng.randint(0, 500),
+        "num_retweet": rng.randint(0, 5000),
+        "num_like": rng.randint(0, 50000),
+        "num_views": rng.randint(1000, 5000000),
+    }
+
+
+def _tweet_index(tweet_id):
+    return (FIRST_ID - int(tweet_id)) // 7919
+
+
+def _tweet_result(tweet, config, text=None, reply_to=None, tweet_id=None):
+    """GraphQL tweet result in the shape of TweetResultByRestId / TweetDetail"""
+    tweet_id = tweet_id or tweet["id"]
+    legacy = {
+        "id_str": str(tweet_id),
+        "full_text": text if text is not None else tweet["full_text"][:280],
+        "created_at": datetime.strptime(tweet["date"], "%Y-%m-%d").strftime("%a %b %d %H:%M:%S +0000 %Y"),
+        "conversation_id_str": str(tweet["id"]),
+        "in_reply_to_status_id_str": str(reply_to) if reply_to else None,
+        "favorite_count": tweet["num_like"],
+        "retweet_count": tweet["num_retweet"],
+        "reply_count": tweet["num_reply"],
+        "entities": {},
+    }
+    if tweet["media_type"] == "Video" and reply_to is None:
+        media_url = f"https://video.twimg.com/ext_tw_video/{tweet_id}/pu"
+        variants = [
+            {"content_type": "application/x-mpegURL", "url": f"{media_url}/pl/{tweet_id}.m3u8?tag=12&container=fmp4"},
+        ] + [
+            {"bitrate": 256000 * (n + 1), "content_type": "video/mp4",
+             "url": f"{media_url}/vid/avc1/{resolution}/{tweet_id}.mp4?tag=12"}
+            for n, resolution in enumerate(RESOLUTIONS)
+        ]
+        legacy["extended_entities"] = {"media": [{
+            "type": "video",
+            "media_url_https": f"https://pbs.twimg.com/ext_tw_video_thumb/{tweet_id}/pu/img/thumb",
+            "video_info": {"variants": variants},
+        }]}
+    result = {
+        "__typename": "Tweet",
+        "rest_id": str(tweet_id),
+        "core": {"user_results": {"result": {"legacy": {"screen_name": tweet["handle"], "name": tweet["name"]}}}},
+        "legacy": legacy,
+        "views": {"count": str(tweet["num_views"]), "state": "EnabledWithCount"},
+    }
+    if text is None and len(tweet["full_text"]) > 280:
+        result["note_tweet"] = {"note_tweet_results": {"result": {"text": tweet["full_text"]}}}
+    return result
+
+
+def _detail_entries(tweet, config):
+    """Focal tweet plus a short self-thread for thread starters and a reply by someone else"""
+    entries = [{"content": {"itemContent": {"tweet_results": {"result": _tweet_result(tweet, config)}}}}]
+    previous = tweet["id"]
+    if tweet["text"].startswith("🧵"):
+        for n in range(2, 4):
+            child_id = tweet["id"] + n
+            child = _tweet_result(tweet, config, text=f"{n}/ follow-up {n}", reply_to=previous, tweet_id=child_id)
+            entries.append({"content": {"items": [{"item": {"itemContent": {"tweet_results": {"result": child}}}}]}})
+            previous = child_id
+    other = dict(tweet, handle="someone_else")
+    reply = _tweet_result(other, config, text="nice", reply_to=tweet["id"], tweet_id=tweet["id"] + 100)
+    entries.append({"content": {"items": [{"item": {"itemContent": {"tweet_results": {"result": reply}}}}]}})
+    return entries
+
+
+def _article(tweet):
+    """One timeline cell with the markup TwitterExtractor reads"""
+    status = f"/{tweet['handle']}/status/{tweet['id']}"
+    media = ""
+    if tweet["media_type"] == "Image":
+        media = (f'<div data-testid="tweetPhoto"><img src="https://pbs.twimg.com/media/F{tweet["id"]}'
+                 f'?format=jpg&amp;name=small"></div>')
+    elif tweet["media_type"] == "Video":
+        media = (f'<div data-testid="videoPlayer"><video poster="https://pbs.twimg.com/ext_tw_video_thumb/'
+                 f'{tweet["id"]}/pu/img/thumb.jpg"></video></div>')
+    return f"""<div data-testid="cellInnerDiv"><article data-testid="tweet">
+<img class="css-9pa8cd" src="https://pbs.twimg.com/profile_images/{tweet['handle']}_normal.jpg">
+<div data-testid="User-Name"><div>{escape(tweet['name'], quote=False)}</div><div>@{tweet['handle']}</div></div>
+<a href="{status}"><time datetime="{tweet['date']}T08:00:00.000Z">{tweet['date']}</time></a>
+<div data-testid="tweetText" lang="en">{escape(tweet['text'], quote=False)}</div>
+{media}
+<button data-testid="reply" aria-label="{tweet['num_reply']} Replies. Reply"></button>
+<button data-testid="retweet" aria-label="{tweet['num_retweet']} reposts. Repost"></button>
+<button data-testid="unlike" aria-label="{tweet['num_like']} Likes. Liked"></button>
+<a href="{status}/analytics" aria-label="{tweet['num_views']} views. View post analytics"></a>
+</article></div>"""
+
+
+TIMELINE_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Likes / X</title></head>
+<body><main><div id="timeline">{cells}</div></main>
+<script>
+let cursor = {next};
+let loading = false;
+// Load the next page when the user scrolls near the bottom or the scraper removed most cells
+setInterval(async () => {{
+  const cells = document.querySelectorAll("[data-testid='cellInnerDiv']").length;
+  const nearBottom = window.innerHeight + window.scrollY >= document.body.scrollHeight - 1500;
+  if (loading || cursor < 0 || (!nearBottom && cells > 10)) return;
+  loading = true;
+  try {{
+    const response = await fetch("/i/fake/timeline?cursor=" + cursor);
+    const page = await response.json();
+    document.getElementById("timeline").insertAdjacentHTML("beforeend", page.html);
+    cursor = page.next;
+  }} finally {{
+    loading = false;
+  }}
+}}, 200);
+</script></body></html>"""
+
+TRY_RELOADING = ('<div data-testid="cellInnerDiv"><span>Something went wrong. Try reloading.</span>'
+                 '<button onclick="location.reload()"><span>Retry</span></button></div>')
+
+
+class FakeXServer:
+    """
+    Local stand-in for the parts of X the scraper and media tools use: guest activation,
+    TweetResultByRestId, TweetDetail, HLS/fMP4 playlists and segments, progressive mp4s
+    and a likes timeline page for Selenium. Latency, errors, 429s and "Try reloading"
+    pages are injected according to FakeXConfig.
+    """
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or FakeXConfig()
+        self.rng = random.Random(self.config.seed)
+        self.lock = threading.Lock()
+        self.requests = Counter()
+        self.statuses = Counter()
+        self.windows = {}
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        logger.info(f"Fake X listening on {self.url}, likes page at {self.url}/fake_user/likes")
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self):
+        with self.lock:
+            return {"requests": dict(self.requests), "statuses": dict(self.statuses)}
+
+    def _rate_limit_headers(self, endpoint, token):
+        """Count a request against its window, return (headers, exhausted)"""
+        config = self.config
+        if config.rate_limit is None:
+            return {}, False
+        now = time.time()
+        with self.lock:
+            reset_at, used = self.windows.get((endpoint, token), (0, 0))
+            if now >= reset_at:
+                reset_at, used = int(now) + config.window, 0
+            used += 1
+            self.windows[(endpoint, token)] = (reset_at, used)
+        headers = {
+            "x-rate-limit-limit": str(config.rate_limit),
+            "x-rate-limit-remaining": str(max(0, config.rate_limit - used)),
+            "x-rate-limit-reset": str(reset_at),
+        }
+        return headers, used > config.rate_limit
+
+    def _timeline_page(self, cursor):
+        config = self.config
+        if self.rng.random() < config.reload_rate:
+            return TRY_RELOADING, cursor
+        end = min(cursor + config.page_size, config.num_tweets)
+        cells = "".join(_article(fake_tweet(i, config)) for i in range(cursor, end))
+        return cells, end if end < config.num_tweets else -1
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes, Nagle would hold the body until the delayed ACK
+            disable_nagle_algorithm = True
+
+            def _send(self, status, body=b"", content_type="application/json", headers=None):
+                if isinstance(body, str):
+                    body = body.encode("utf-8")
+                elif not isinstance(body, bytes):
+                    body = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+                with fake.lock:
+                    fake.statuses[status] += 1
+
+            def _delay(self):
+                config = fake.config
+                time.sleep(config.latency + fake.rng.random() * config.jitter)
+
+            def _api(self, endpoint, make_body):
+                """Latency, rate limit and error injection shared by the API endpoints"""
+                with fake.lock:
+                    fake.requests[endpoint] += 1
+                self._delay()
+                headers, exhausted = fake._rate_limit_headers(endpoint, self.headers.get("x-guest-token"))
+                if exhausted:
+                    self._send(429, {"errors": [{"code": 88, "message": "Rate limit exceeded"}]}, headers=headers)
+                elif fake.rng.random() < fake.config.error_rate:
+                    self._send(503, {"errors": [{"message": "Over capacity"}]}, headers=headers)
+                else:
+                    self._send(200, make_body(), headers=headers)
+
+            def do_POST(self):
+                path = urlparse(self.path).path
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    self.rfile.read(length)
+                if path == "/1.1/guest/activate.json":
+                    self._api("guest_activate", lambda: {"guest_token": str(fake.rng.randint(10 ** 18, 10 ** 19))})
+                else:
+                    self._send(404, {"errors": [{"message": "Not found"}]})
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                path, params = parsed.path, {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                config = fake.config
+
+                graphql = re.match(r'^/i/api/graphql/[^/]+/(\w+)$', path)
+                if graphql:
+                    operation = graphql.group(1)
+                    variables = json.loads(params.get("variables", "{}"))
+                    tweet_id = variables.get("tweetId") or variables.get("focalTweetId")
+                    tweet = fake_tweet(_tweet_index(tweet_id or FIRST_ID), config)
+                    tweet["id"] = int(tweet_id or FIRST_ID)
+                    if operation == "TweetResultByRestId":
+                        self._api(operation, lambda: {"data": {"tweetResult": {"result": _tweet_result(tweet, config)}}})
+                    elif operation == "TweetDetail":
+                        self._api(operation, lambda: {"data": {"threaded_conversation_with_injections_v2": {
+                            "instructions": [{"type": "TimelineAddEntries", "entries": _detail_entries(tweet, config)}]
+                        }}})
+                    else:
+                        self._send(404, {"errors": [{"message": f"Unknown operation {operation}"}]})
+                    return
+
+                if path.startswith("/ext_tw_video/"):
+                    self._media(path)
+                elif path == "/i/fake/timeline":
+                    with fake.lock:
+                        fake.requests["timeline"] += 1
+                    self._delay()
+                    html, next_cursor = fake._timeline_page(int(params.get("cursor", 0)))
+                    self._send(200, {"html": html, "next": next_cursor})
+                elif path.endswith("/likes"):
+                    with fake.lock:
+                        fake.requests["likes_page"] += 1
+                    self._delay()
+                    cells, next_cursor = fake._timeline_page(0)
+                    self._send(200, TIMELINE_PAGE.format(cells=cells, next=next_cursor), "text/html; charset=utf-8")
+                elif re.match(r'^/[^/]+/status/\d+', path) or path in ("/", ""):
+                    self._send(200, "<!DOCTYPE html><html><body>X</body></html>", "text/html; charset=utf-8")
+                elif path == "/fake/stats":
+                    self._send(200, fake.stats())
+                else:
+                    self._send(404, {"errors": [{"message": "Not found"}]})
+
+            def _media(self, path):
+                """HLS master and media playlists, init segment, fMP4 segments and progressive mp4s"""
+                config = fake.config
+                match = re.match(r'^/ext_tw_video/(\d+)/pu/', path)
+                if not match:
+                    self._send(404)
+                    return
+                tweet_id = match.group(1)
+                base = f"/ext_tw_video/{tweet_id}/pu"
+                if path.endswith(".m3u8") and "/avc1/" not in path:
+                    lines = ["#EXTM3U", "#EXT-X-VERSION:6", "#EXT-X-INDEPENDENT-SEGMENTS"]
+                    for n, resolution in enumerate(RESOLUTIONS):
+                        lines.append(f"#EXT-X-STREAM-INF:BANDWIDTH={256000 * (n + 1)},RESOLUTION={resolution}")
+                        lines.append(f"{base}/pl/avc1/{resolution}/{tweet_id}.m3u8?container=fmp4")
+                    self._api("hls_master", lambda: "\n".join(lines) + "\n")
+                elif path.endswith(".m3u8"):
+                    resolution = path.split("/avc1/")[1].split("/")[0]
+                    lines = ["#EXTM3U", "#EXT-X-VERSION:6", "#EXT-X-TARGETDURATION:3",
+                             f'#EXT-X-MAP:URI="{base}/vid/avc1/0/0/{resolution}/init.mp4"']
+                    for n in range(config.segments):
+                        lines.append("#EXTINF:3.000,")
+                        lines.append(f"{base}/vid/avc1/{n * 3000}/{(n + 1) * 3000}/{resolution}/{n}.m4s")
+                    lines.append("#EXT-X-ENDLIST")
+                    self._api("hls_media", lambda: "\n".join(lines) + "\n")
+                else:
+                    size = config.segment_size * (config.segments if path.endswith(".mp4") and "/init" not in path else 1)
+                    self._api("video_bytes", lambda: bytes(size))
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        return Handler
+
+
+class RedirectStub:
+    """
+    Local link shortener for testing link expansion. Every path is /<kind>/<code>:
+        /s/<code>       301 -> /hop/<code> -> 302 -> /article/<code> (200, large body)
+        /article/<code> 200
+        /dead/<code>    404
+        /loop/<code>    301 to itself
+        /nohead/<code>  405 for HEAD, 200 for GET
+        /slow/<code>    answers after `slow` seconds
+    Requests per method and kind and the peak of concurrent requests per Host header are counted.
+    """
+
+    def __init__(self, latency=0.02, slow=5.0, body_size=1 << 20, host="127.0.0.1", port=0):
+        self.latency = latency
+        self.slow = slow
+        self.body_size = body_size
+        self.lock = threading.Lock()
+        self.requests = Counter()
+        self.active = Counter()
+        self.peak = Counter()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self):
+        with self.lock:
+            return {"requests": dict(self.requests), "peak": dict(self.peak)}
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes, Nagle would hold the body until the delayed ACK
+            disable_nagle_algorithm = True
+
+            def _answer(self, head):
+                host = self.headers.get("Host", "")
+                parts = urlparse(self.path).path.strip("/").split("/")
+                kind, code = (parts + [""])[:2]
+                with stub.lock:
+                    stub.requests[f"{self.command} {kind}"] += 1
+                    stub.active[host] += 1
+                    stub.peak[host] = max(stub.peak[host], stub.active[host])
+                try:
+                    time.sleep(stub.slow if kind == "slow" else stub.latency)
+                    status, location, body = 200, None, b""
+                    if kind == "s":
+                        status, location = 301, f"/hop/{code}"
+                    elif kind == "hop":
+                        status, location = 302, f"/article/{code}"
+                    elif kind == "loop":
+                        status, location = 301, self.path
+                    elif kind == "dead":
+                        status = 404
+                    elif kind == "nohead" and head:
+                        status = 405
+                    elif kind not in ("article", "nohead", "slow"):
+                        status = 404
+                    if status == 200:
+                        body = b"x" * stub.body_size
+                    self.send_response(status)
+                    if location:
+                        self.send_header("Location", location)
+                    self.send_header("Content-Type", "text/html")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    if not head:
+                        self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    with stub.lock:
+                        stub.active[host] -= 1
+
+            def do_HEAD(self):
+                self._answer(head=True)
+
+            def do_GET(self):
+                self._answer(head=False)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        return Handler
+
+
+class FakeProxy:
+    """
+    Local forward proxy standing in for one egress address. It relays the absolute-URI requests
+    requests sends to an http:// proxy (plain HTTP only, which is what route_to() produces) and
+    can play a throttled or failing egress: after rate_limit requests per window it answers 429
+    with Retry-After, and error_rate of the requests get a 502. Stopping it makes the egress
+    refuse connections. Requests, statuses and the peak of concurrent requests are counted.
+    """
+
+    # Headers that describe one hop and must not be relayed
+    HOP_HEADERS = {"connection", "keep-alive", "proxy-connection", "proxy-authorization", "te",
+                   "trailer", "transfer-encoding", "upgrade", "content-length"}
+
+    def __init__(self, latency=0.0, rate_limit=None, window=60, error_rate=0.0, seed=1, host="127.0.0.1", port=0):
+        """
+        :param latency: Seconds added to every relayed request
+        :param rate_limit: Requests per window before 429, None for unlimited
+        :param window: Rate-limit window in seconds
+        :param error_rate: Probability of a 502 instead of relaying
+        """
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.window = window
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.statuses = Counter()
+        self.active = 0
+        self.peak = 0
+        self.window_start, self.window_used = time.time(), 0
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self):
+        with self.lock:
+            return {"requests": self.requests, "statuses": dict(self.statuses), "peak": self.peak}
+
+    def _throttled(self):
+        """Count a request against the window, return the seconds until its reset if it is exhausted"""
+        if self.rate_limit is None:
+            return None
+        now = time.time()
+        with self.lock:
+            if now - self.window_start >= self.window:
+                self.window_start, self.window_used = now, 0
+            self.window_used += 1
+            if self.window_used > self.rate_limit:
+                return self.window_start + self.window - now
+        return None
+
+    def _handler(self):
+        proxy = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes, Nagle would hold the body until the delayed ACK
+            disable_nagle_algorithm = True
+
+            def _reply(self, status, body=b"", headers=()):
+                self.send_response(status)
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(body)
+                with proxy.lock:
+                    proxy.statuses[status] += 1
+
+            def _relay(self):
+                with proxy.lock:
+                    proxy.requests += 1
+                    proxy.active += 1
+                    proxy.peak = max(proxy.peak, proxy.active)
+                try:
+                    length = int(self.headers.get("Content-Length") or 0)
+                    body = self.rfile.read(length) if length else None
+                    time.sleep(proxy.latency)
+                    reset_in = proxy._throttled()
+                    if reset_in is not None:
+                        self._reply(429, b"Too Many Requests", [("Retry-After", str(max(1, int(reset_in))))])
+                        return
+                    if proxy.rng.random() < proxy.error_rate:
+                        self._reply(502, b"Bad Gateway")
+                        return
+                    target = urlparse(self.path)
+                    headers = {k: v for k, v in self.headers.items() if k.lower() not in FakeProxy.HOP_HEADERS}
+                    connection = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=60)
+                    try:
+                        path = target.path + (f"?{target.query}" if target.query else "")
+                        connection.request(self.command, path or "/", body=body, headers=headers)
+                        upstream = connection.getresponse()
+                        data = upstream.read()
+                        relayed = [(k, v) for k, v in upstream.getheaders() if k.lower() not in FakeProxy.HOP_HEADERS]
+                        self._reply(upstream.status, data, relayed)
+                    except OSError as e:
+                        self._reply(502, f"Upstream error: {e}".encode("utf-8"))
+                    finally:
+                        connection.close()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    with proxy.lock:
+                        proxy.active -= 1
+
+            do_GET = do_POST = do_HEAD = _relay
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        return Handler
+
+
+class FakeLLM:
+    """
+    Local OpenAI-compatible chat completions endpoint for testing LLMEnricher. It answers
+    POST /v1/chat/completions with one {id, summary, topics, tags} item per "[n] text" block
+    of the last user message, after rate_limit requests per window it answers 429 with
+    Retry-After and error_rate of the requests get a 503. Point the client at f"{url}/v1".
+    Requests, statuses, tweets seen and the peak of concurrent requests are counted.
+    """
+
+    def __init__(self, latency=0.02, rate_limit=None, window=60, error_rate=0.0, seed=1, host="127.0.0.1", port=0):
+        """
+        :param latency: Seconds added to every completion
+        :param rate_limit: Requests per window before 429, None for unlimited
+        :param window: Rate-limit window in seconds
+        :param error_rate: Probability of a 503 instead of a completion
+        """
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.window = window
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.tweets = 0
+        self.statuses = Counter()
+        self.active = 0
+        self.peak = 0
+        self.window_start, self.window_used = time.time(), 0
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self):
+        with self.lock:
+            return {"requests": self.requests, "tweets": self.tweets, "statuses": dict(self.statuses),
+                    "peak": self.peak}
+
+    def _throttled(self):
+        """Count a request against the window, return the seconds until its reset if it is exhausted"""
+        if self.rate_limit is None:
+            return None
+        now = time.time()
+        with self.lock:
+            if now - self.window_start >= self.window:
+                self.window_start, self.window_used = now, 0
+            self.window_used += 1
+            if self.window_used > self.rate_limit:
+                return self.window_start + self.window - now
+        return None
+
+    @staticmethod
+    def _completion(request):
+        """Deterministic annotation of every numbered tweet in the prompt"""
+        prompt = next((m["content"] for m in reversed(request.get("messages", [])) if m.get("role") == "user"), "")
+        items = []
+        for number, text in re.findall(r'^\[(\d+)\] (.*)$', prompt, re.M):
+            words = re.findall(r'\w+', text.lower())
+            items.append({"id": int(number), "summary": " ".join(words[:8]), "topics": ["ai"],
+                          "tags": list(dict.fromkeys(words))[:5]})
+        content = json.dumps({"items": items}, ensure_ascii=False)
+        return len(items), {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": (len(prompt) + len(content)) // 4},
+        }
+
+    def _handler(self):
+        llm = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes, Nagle would hold the body until the delayed ACK
+            disable_nagle_algorithm = True
+
+            def _send(self, status, body, headers=()):
+                body = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+                with llm.lock:
+                    llm.statuses[status] += 1
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b"{}"
+                if urlparse(self.path).path.rstrip("/") not in ("/v1/chat/completions", "/chat/completions"):
+                    self._send(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+                    return
+                with llm.lock:
+                    llm.requests += 1
+                    llm.active += 1
+                    llm.peak = max(llm.peak, llm.active)
+                try:
+                    time.sleep(llm.latency)
+                    reset_in = llm._throttled()
+                    if reset_in is not None:
+                        self._send(429, {"error": {"message": "Rate limit reached", "type": "rate_limit_exceeded"}},
+                                   [("Retry-After", str(max(1, int(reset_in))))])
+                    elif llm.rng.random() < llm.error_rate:
+                        self._send(503, {"error": {"message": "Overloaded", "type": "server_error"}})
+                    else:
+                        try:
+                            tweets, completion = llm._completion(json.loads(body))
+                        except (ValueError, AttributeError, KeyError) as e:
+                            self._send(400, {"error": {"message": f"Bad request: {e}", "type": "invalid_request_error"}})
+                            return
+                        with llm.lock:
+                            llm.tweets += tweets
+                        self._send(200, completion)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    with llm.lock:
+                        llm.active -= 1
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        return Handler
+
+
+@contextlib.contextmanager
+def route_to(base_url):
+    """
+    Send every requests call to twitter.com, x.com and video.twimg.com to base_url instead,
+    so x-media-scraper.py and the other HTTP clients run unchanged against a FakeXServer
+    """
+    original = requests.Session.request
+
+    def request(session, method, url, *args, **kwargs):
+        return original(session, method, X_HOSTS.sub(base_url, url), *args, **kwargs)
+
+    requests.Session.request = request
+    try:
+        yield
+    finally:
+        requests.Session.request = original
+
+
+if __name__ == "__main__":
+
+    server = FakeXServer(FakeXConfig(latency=0.05, error_rate=0.02, rate_limit=150, reload_rate=0.05), port=8899)
+    server.start()
+    logger.info("Point the scraper at http://127.0.0.1:8899/fake_user/likes, Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(60)
+            logger.info(server.stats())
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+import bz2
+import gzip
+import hashlib
+import json
+import lzma
+import os
+import re
+
+from loguru import logger
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+STATUS_ID_PATTERN = re.compile(r'/status/(\d+)')
+FINGERPRINT_BYTES = 4096
+# Files next to the runs that tweets_*.jsonl* globs also match: capture snapshots and video side files
+SIDE_FILE_PATTERN = re.compile(r'\.(?:snapshot|videos)\.jsonl')
+
+
+def is_side_file(path):
+    """True for snapshot and video side files, whose rows are not tweets"""
+    return bool(SIDE_FILE_PATTERN.search(os.path.basename(path)))
+
+
+def tweet_id_from_url(url):
+    """
+    Extract the numeric status id from a tweet URL
+    :param url: Tweet URL (twitter.com or x.com)
+    :return: Tweet id as int or None
+    """
+    if not url:
+        return None
+    match = STATUS_ID_PATTERN.search(url)
+    return int(match.group(1)) if match else None
+
+
+def date_key(date):
+    """
+    Convert a "YYYY-MM-DD" date string to an integer key (20240301)
+    :param date: Date string
+    :return: Integer key or 0 if the date is missing/invalid
+    """
+    if not date or len(date) < 10:
+        return 0
+    try:
+        return int(date[:4]) * 10000 + int(date[5:7]) * 100 + int(date[8:10])
+    except ValueError:
+        return 0
+
+
+if orjson is not None:
+    loads = orjson.loads
+
+    def dumps(obj):
+        return orjson.dumps(obj).decode('utf-8')
+else:
+    loads = json.loads
+
+    def dumps(obj):
+        return json.dumps(obj, ensure_ascii=False)
+
+
+def open_text(path, mode='rt'):
+    """
+    Open a text file, transparently handling .gz, .bz2 and .xz compression
+    :param path: File path
+    :param mode: 'rt' or 'wt'
+    """
+    if path.endswith('.gz'):
+        return gzip.open(path, mode, encoding='utf-8')
+    if path.endswith('.bz2'):
+        return bz2.open(path, mode, encoding='utf-8')
+    if path.endswith('.xz'):
+        return lzma.open(path, mode, encoding='utf-8')
+    return open(path, mode.replace('t', ''), encoding='utf-8')
+
+
+def iter_jsonl(path):
+    """
+    Yield rows from a (possibly compressed) JSONL file, skipping blank and malformed lines
+    :param path: JSONL file path
+    """
+    with open_text(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def iter_jsonl_from(path, offset=0):
+    """
+    Yield (row, end_offset) for every complete line after the given byte offset.
+    A trailing line without newline is left for the next call, so files that are
+    still being appended to by a running scrape can be followed incrementally.
+    :param path: JSONL file path
+    :param offset: Byte offset to start reading from
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        while True:
+            line = f.readline()
+            if not line or not line.endswith(b'\n'):
+                return
+            offset += len(line)
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield loads(line), offset
+            except json.JSONDecodeError:
+                continue
+
+
+def file_fingerprint(path, offset):
+    """
+    Identity of the first `offset` bytes of a file: its inode plus a hash of the bytes at the
+    start and right before the offset. Appending keeps it, rewriting the file (a merge or an
+    annotation pass replacing it with a temp file) changes it.
+    :return: Fingerprint string, None if the file is missing or shorter than offset
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    if stat.st_size < offset:
+        return None
+    with open(path, 'rb') as f:
+        head = f.read(min(offset, FINGERPRINT_BYTES))
+        f.seek(max(0, offset - FINGERPRINT_BYTES))
+        tail = f.read(offset - max(0, offset - FINGERPRINT_BYTES))
+    return f"{stat.st_ino}:{hashlib.sha1(head + b'|' + tail).hexdigest()}"
+
+
+def resume_offset(path, offset, fingerprint):
+    """
+    Stored offset into a JSONL file that is followed incrementally, or 0 if the file was
+    rewritten since the offset was taken and has to be read again from the start
+    :param fingerprint: file_fingerprint(path, offset) stored together with the offset
+    """
+    if not offset:
+        return 0
+    if fingerprint is None or file_fingerprint(path, offset) != fingerprint:
+        logger.info(f"{path} was rewritten since it was last read, reading it again from the start")
+        return 0
+    return offset
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urljoin, urlparse
+from urllib.request import pathname2url
+
+import requests
+from requests.adapters import HTTPAdapter
+from loguru import logger
+
+from x_like_record import encode_record, iter_rows
+
+
+X_LINK = re.compile(r'^https?://(?:www\.|mobile\.)?(?:twitter\.com|x\.com)/', re.IGNORECASE)
+MEDIA_LINK = re.compile(r'^https?://(?:pbs|video|abs)\.twimg\.com/|^https?://(?:www\.)?(?:twitter\.com|x\.com)/[^/]+/status/\d+/(?:photo|video)/', re.IGNORECASE)
+SHORTENERS = {"t.co", "bit.ly", "buff.ly", "ow.ly", "tinyurl.com", "dlvr.it", "lnkd.in", "goo.gl", "trib.al", "ift.tt", "youtu.be"}
+# Some servers refuse HEAD, retry those with a GET whose body is never read
+HEAD_REFUSED = {403, 405, 501}
+
+
+def classify(url, shorteners=SHORTENERS):
+    """
+    Kind of a link: "media" (X images and videos), "internal" (profiles, statuses, hashtags on X),
+    "shortlink" (t.co and other redirectors) or "external"
+    """
+    if not url:
+        return "external"
+    if MEDIA_LINK.match(url):
+        return "media"
+    if X_LINK.match(url):
+        return "internal"
+    if domain(url) in shorteners:
+        return "shortlink"
+    return "external"
+
+
+def domain(url):
+    """Lowercase host without www."""
+    host = (urlparse(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+class LinkCache:
+    """
+    SQLite cache of url -> final url. Failed expansions are cached too, and are retried
+    once they are older than negative_ttl.
+    """
+
+    def __init__(self, cache_file="data/link_cache.db", negative_ttl=24 * 3600, read_only=False):
+        """
+        :param cache_file: SQLite cache file
+        :param negative_ttl: Seconds before a failed link is tried again
+        :param read_only: Open an existing cache without creating, migrating or locking it for writes
+        """
+        self.negative_ttl = negative_ttl
+        self.lock = threading.Lock()
+        if read_only:
+            uri = f"file:{pathname2url(os.path.abspath(cache_file))}?mode=ro"
+            self.conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            return
+        self.conn = sqlite3.connect(cache_file, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS links (url TEXT PRIMARY KEY, final_url TEXT, status INTEGER, "
+            "error TEXT, resolved_at REAL)"
+        )
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def get(self, url):
+        """
+        :return: {"final_url", "status", "error"} or None if unknown or a negative entry expired
+        """
+        with self.lock:
+            found = self.conn.execute(
+                "SELECT final_url, status, error, resolved_at FROM links WHERE url = ?", (url,)
+            ).fetchone()
+        if found is None:
+            return None
+        final_url, status, error, resolved_at = found
+        if final_url is None and time.time() - resolved_at > self.negative_ttl:
+            return None
+        return {"final_url": final_url, "status": status, "error": error}
+
+    def final_url(self, url):
+        """Cached destination of a link, the link itself if it needs no expansion, else None"""
+        found = self.get(url)
+        if found is not None:
+            return found["final_url"]
+        return url if classify(url) != "shortlink" else None
+
+    def put(self, url, final_url, status=None, error=None):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO links VALUES (?, ?, ?, ?, ?)",
+                              (url, final_url, status, error, time.time()))
+
+    def stats(self):
+        with self.lock:
+            total, failed = self.conn.execute(
+                "SELECT COUNT(*), SUM(final_url IS NULL) FROM links"
+            ).fetchone()
+        return {"cached": total, "failed": failed or 0}
+
+
+def resolved_links(row, cache=None):
+    """
+    Links of a row as [{"url", "final_url", "kind", "domain"}], taken from the "links" field
+    written by LinkExpander.expand_file, or looked up in a LinkCache. Never touches the network,
+    unresolved shortlinks have final_url None.
+    """
+    if "links" in row:
+        return row["links"]
+    links = []
+    for url in row.get("mentioned_urls") or []:
+        final_url = cache.final_url(url) if cache is not None else (url if classify(url) != "shortlink" else None)
+        kind = classify(final_url or url)
+        links.append({"url": url, "final_url": final_url, "kind": kind,
+                      "domain": domain(final_url) if final_url else None})
+    return links
+
+
+class LinkExpander:
+    """
+    Resolves shortlinks concurrently with HEAD requests, following redirects by hand so no
+    body is downloaded and every hop goes through a per-host concurrency cap. Results go to
+    a LinkCache shared by all consumers.
+    """
+
+    def __init__(self, cache_file="data/link_cache.db", workers=16, per_host=4, timeout=10,
+                 max_redirects=10, negative_ttl=24 * 3600, shorteners=SHORTENERS):
+        """
+        :param cache_file: SQLite url -> final url cache
+        :param workers: Concurrent expansions
+        :param per_host: Concurrent requests to one host
+        :param timeout: Seconds per request
+        :param max_redirects: Hops before a link counts as failed
+        :param negative_ttl: Seconds before a failed link is tried again
+        :param shorteners: Hosts whose links are expanded
+        """
+        self.cache = LinkCache(cache_file, negative_ttl)
+        self.workers = workers
+        self.per_host = per_host
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+        self.shorteners = shorteners
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"User-Agent": "Mozilla/5.0 (compatible; x-like-link-expander)"})
+        self.host_lock = threading.Lock()
+        self.host_slots = defaultdict(lambda: threading.BoundedSemaphore(self.per_host))
+        self.stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "resolved": 0, "failed": 0}
+
+    def _count(self, name):
+        # Called from the worker threads
+        with self.stats_lock:
+            self.stats[name] += 1
+
+    def close(self):
+        self.session.close()
+        self.cache.close()
+
+    def _request(self, url):
+        with self.host_lock:
+            slot = self.host_slots[urlparse(url).netloc.lower()]
+        with slot:
+            self._count("requests")
+            response = self.session.head(url, allow_redirects=False, timeout=self.timeout)
+            if response.status_code in HEAD_REFUSED:
+                self._count("requests")
+                response = self.session.get(url, allow_redirects=False, timeout=self.timeout, stream=True)
+                response.close()
+            return response
+
+    def resolve(self, url):
+        """
+        Follow the redirects of one link
+        :return: (final_url, status, error), final_url is None on failure
+        """
+        current = url
+        try:
+            for _ in range(self.max_redirects + 1):
+                response = self._request(current)
+                location = response.headers.get("Location")
+                if not (300 <= response.status_code < 400 and location):
+                    if response.status_code >= 400 and current == url:
+                        return None, response.status_code, f"HTTP {response.status_code}"
+                    return current, response.status_code, None
+                current = urljoin(current, location)
+                # Links into X need no further requests
+                if classify(current) in ("internal", "media"):
+                    return current, response.status_code, None
+            return None, None, f"More than {self.max_redirects} redirects"
+        except requests.RequestException as e:
+            return None, None, f"{type(e).__name__}: {e}"
+
+    def _expand(self, url):
+        final_url, status, error = self.resolve(url)
+        self.cache.put(url, final_url, status, error)
+        self._count("resolved" if final_url else "failed")
+        return url, final_url
+
+    def expand(self, urls):
+        """
+        Expand every shortlink that is not cached yet
+        :param urls: Iterable of links, other kinds and duplicates are skipped
+        :return: Number of links requested in this run
+        """
+        start = time.time()
+        requested = 0
+        seen = set()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = set()
+            for url in urls:
+                if url in seen or classify(url, self.shorteners) != "shortlink" or self.cache.get(url) is not None:
+                    continue
+                seen.add(url)
+                futures.add(executor.submit(self._expand, url))
+                requested += 1
+                if len(futures) >= self.workers * 2:
+                    _, futures = wait(futures, return_when=FIRST_COMPLETED)
+            wait(futures)
+        logger.info(
+            f"Expanded {requested} links in {time.time() - start:.1f}s "
+            f"({self.stats['requests']} requests, {self.stats['failed']} failed)"
+        )
+        return requested
+
+    def expand_file(self, jsonl_file):
+        """
+        Expand the mentioned_urls of a JSONL file and store them in a "links" list of
+        {"url", "final_url", "kind", "domain"} per row, rewriting the file atomically
+        :return: Number of rows with links
+        """
+        self.expand(url for row in iter_rows(jsonl_file) for url in row.get("mentioned_urls") or [])
+        updated = 0
+        fd, tmp_file = tempfile.mkstemp(suffix=".jsonl", dir=os.path.dirname(os.path.abspath(jsonl_file)))
+        with os.fdopen(fd, "w", encoding="utf-8") as out:
+            for row in iter_rows(jsonl_file):
+                if row.get("mentioned_urls"):
+                    row.pop("links", None)
+                    row["links"] = resolved_links(row, self.cache)
+                    updated += 1
+                out.write(encode_record(row) + "\n")
+        os.replace(tmp_file, jsonl_file)
+        logger.info(f"Stored links of {updated} rows in {jsonl_file}")
+        return updated
+
+
+if __name__ == "__main__":
+
+    expander = LinkExpander("data/link_cache.db", workers=16, per_host=4)
+    expander.expand_file("data/x.jsonl")
+    expander.close()
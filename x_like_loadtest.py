@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+import contextlib
+import os
+import tempfile
+import threading
+import time
+
+from loguru import logger
+
+from x_like_egress import EgressPool
+from x_like_fakex import FakeProxy, FakeXConfig, FakeXServer, fake_tweet, route_to
+from x_like_video import load_media_scraper
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def run_load(clients, duration=10.0, concurrency=4):
+    """
+    Call every client from `concurrency` threads for `duration` seconds and measure it.
+    Clients run one after another, so their numbers do not disturb each other.
+    :param clients: {name: func(i)}, a call fails if it raises or returns False
+    :return: {name: {"calls", "errors", "throughput", "p50_ms", "p90_ms", "p99_ms", "max_ms"}}
+    """
+    report = {}
+    for name, func in clients.items():
+        latencies, errors = [], []
+        lock = threading.Lock()
+        counter = iter(range(10 ** 9))
+        deadline = time.perf_counter() + duration
+
+        def worker():
+            while time.perf_counter() < deadline:
+                with lock:
+                    i = next(counter)
+                start = time.perf_counter()
+                try:
+                    ok = func(i) is not False
+                    error = None if ok else "returned False"
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies.append(elapsed)
+                    if error:
+                        errors.append(error)
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - start
+
+        latencies.sort()
+        report[name] = {
+            "calls": len(latencies),
+            "errors": len(errors),
+            "throughput": round(len(latencies) / wall, 2),
+            "p50_ms": round(_percentile(latencies, 0.5) * 1000, 1),
+            "p90_ms": round(_percentile(latencies, 0.9) * 1000, 1),
+            "p99_ms": round(_percentile(latencies, 0.99) * 1000, 1),
+            "max_ms": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+        }
+        logger.info(f"{name}: {report[name]}" + (f", first error: {errors[0]}" if errors else ""))
+    return report
+
+
+def default_clients(config, output_dir, transport=None):
+    """
+    The HTTP clients of this repo, each called with a different fake tweet per iteration.
+    Requests must be routed to the fake server with route_to() while they run.
+    :param transport: EgressPool the media clients use instead of their default one
+    """
+    from x_like_thread import ThreadCompleter
+
+    scraper = load_media_scraper()
+    if transport is not None:
+        scraper.transport = transport
+    completer = ThreadCompleter(os.path.join(output_dir, "thread_cache.db"), workers=1,
+                                engagement_file=os.path.join(output_dir, "engagement.ts"), transport=transport)
+
+    def tweet(i, video=False):
+        index = i % config.num_tweets
+        if video:
+            index -= index % config.video_every
+        t = fake_tweet(index, config)
+        return t["id"], f"https://x.com/{t['handle']}/status/{t['id']}"
+
+    def tweet_details(i):
+        _, url = tweet(i)
+        bearer_token, guest_token = scraper.get_tokens(url)
+        return scraper.get_tweet_details(url, guest_token, bearer_token) is not None
+
+    def video_info(i):
+        _, url = tweet(i, video=True)
+        return bool(scraper.get_video_info(url))
+
+    def thread_detail(i):
+        tweet_id, _ = tweet(i)
+        return completer.fetch(tweet_id) is not None
+
+    def hls_download(i):
+        tweet_id, _ = tweet(i, video=True)
+        output = os.path.join(output_dir, f"{threading.get_ident()}.mp4")
+        return scraper.download_parts(
+            f"https://video.twimg.com/ext_tw_video/{tweet_id}/pu/pl/{tweet_id}.m3u8?tag=12&container=fmp4", output
+        )
+
+    return {
+        "get_tokens": lambda i: scraper.get_tokens(tweet(i)[1]),
+        "get_tweet_details": tweet_details,
+        "get_video_info": video_info,
+        "thread_detail": thread_detail,
+        "download_parts": hls_download,
+    }
+
+
+def run_default_load(config=None, duration=10.0, concurrency=4):
+    """Start a fake server, route the clients to it and load every default client"""
+    config = config or FakeXConfig()
+    with FakeXServer(config) as server, route_to(server.url), tempfile.TemporaryDirectory() as output_dir:
+        report = run_load(default_clients(config, output_dir), duration=duration, concurrency=concurrency)
+        logger.info(f"Fake X served {server.stats()}")
+    return report
+
+
+def run_egress_load(config=None, proxies=3, throttled=1, rate_limit=20, window=5, duration=10.0, concurrency=8):
+    """
+    Load the media clients through an EgressPool of local FakeProxy egresses, the first `throttled`
+    of which answer 429 after rate_limit requests per window
+    :return: run_load report plus "egress" (pool stats per egress) and "proxies" (what each proxy saw)
+    """
+    config = config or FakeXConfig()
+    stand_ins = [FakeProxy(rate_limit=rate_limit if n < throttled else None, window=window) for n in range(proxies)]
+    with contextlib.ExitStack() as stack:
+        for proxy in stand_ins:
+            stack.enter_context(proxy)
+        server = stack.enter_context(FakeXServer(config))
+        stack.enter_context(route_to(server.url))
+        output_dir = stack.enter_context(tempfile.TemporaryDirectory())
+        pool = EgressPool([proxy.url for proxy in stand_ins], base_cooldown=0.5)
+        clients = default_clients(config, output_dir, transport=pool)
+        report = run_load({name: clients[name] for name in ("get_tweet_details", "get_video_info", "download_parts")},
+                          duration=duration, concurrency=concurrency)
+        report["egress"] = pool.stats()
+        report["proxies"] = {proxy.url: proxy.stats() for proxy in stand_ins}
+    for name, stats in report["egress"].items():
+        logger.info(f"Egress {name}: {stats}")
+    return report
+
+
+if __name__ == "__main__":
+
+    run_default_load(FakeXConfig(latency=0.03, jitter=0.05, error_rate=0.01, rate_limit=300), duration=5, concurrency=8)
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+import glob
+import heapq
+import os
+import re
+import tempfile
+from datetime import datetime
+
+from loguru import logger
+
+from x_like_io import tweet_id_from_url, dumps, is_side_file, loads
+from x_like_record import encode_record, iter_rows
+from x_like_thread import is_truncated
+
+
+RUN_TIMESTAMP = re.compile(r'(\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})')
+
+
+def run_timestamp(path):
+    """
+    Time a run file was scraped: the timestamp in its name (tweets_2024-04-10_15-30-45.jsonl),
+    otherwise the file modification time
+    """
+    match = RUN_TIMESTAMP.search(os.path.basename(path))
+    if match:
+        return datetime.strptime(match.group(1), "%Y-%m-%d_%H-%M-%S").timestamp()
+    return os.path.getmtime(path)
+
+
+def _sort_key(line):
+    # Chunk lines are "<tweet_id>\t<run_ts>\t<json>", sorted by id then run, newest first.
+    # Tweet ids are snowflakes, so id order is post date order.
+    tweet_id, ts, _ = line.split("\t", 2)
+    return -int(tweet_id), -float(ts)
+
+
+def _write_chunk(lines, tmp_dir):
+    lines.sort(key=_sort_key)
+    fd, path = tempfile.mkstemp(suffix=".chunk", dir=tmp_dir)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.writelines(lines)
+    return path
+
+
+def merge_runs(patterns=("data/tweets_*.jsonl*",), output_file="data/x.jsonl", chunk_size=50000,
+               include_output=True):
+    """
+    Merge any number of scrape runs into one canonical JSONL, newest tweets first.
+    Rows are deduplicated by tweet id; the newest run's values win and fields it lacks are
+    filled from older runs. Full text completed by ThreadCompleter beats a newer truncated one. Uses an external merge sort, so memory is bounded by chunk_size.
+    :param patterns: Glob patterns of run files (.jsonl, .gz, .bz2 and .xz), matching side files are skipped
+    :param output_file: Canonical output file, replaced atomically
+    :param chunk_size: Rows sorted in memory at a time
+    :param include_output: Also merge the existing output file (as the oldest run)
+    :return: Number of unique tweets written
+    """
+    paths = sorted({path for pattern in patterns for path in glob.glob(pattern) if not is_side_file(path)})
+    if include_output and os.path.exists(output_file) and output_file not in paths:
+        paths.insert(0, output_file)
+    if not paths:
+        logger.warning(f"No run files match {patterns}")
+        return 0
+
+    output_dir = os.path.dirname(os.path.abspath(output_file))
+    tmp_dir = tempfile.mkdtemp(prefix="merge_", dir=output_dir)
+    chunks, lines, skipped = [], [], 0
+    try:
+        for path in paths:
+            # The existing output is older than every run
+            ts = 0.0 if path == output_file else run_timestamp(path)
+            for row in iter_rows(path):
+                tweet_id = tweet_id_from_url(row.get("url"))
+                if tweet_id is None:
+                    skipped += 1
+                    continue
+                lines.append(f"{tweet_id}\t{ts}\t{dumps(row)}\n")
+                if len(lines) >= chunk_size:
+                    chunks.append(_write_chunk(lines, tmp_dir))
+                    lines = []
+        if lines:
+            chunks.append(_write_chunk(lines, tmp_dir))
+            lines = []
+
+        written = 0
+        fd, tmp_output = tempfile.mkstemp(suffix=".jsonl", dir=output_dir)
+        with os.fdopen(fd, 'w', encoding='utf-8') as out:
+            files = [open(chunk, 'r', encoding='utf-8') for chunk in chunks]
+            try:
+                current_id, merged = None, None
+                for line in heapq.merge(*files, key=_sort_key):
+                    tweet_id, _, data = line.split("\t", 2)
+                    row = loads(data)
+                    if tweet_id == current_id:
+                        # Older observation of the same tweet: only fill missing fields
+                        for key, value in row.items():
+                            if merged.get(key) in (None, "", []):
+                                merged[key] = value
+                        # A newer run only saw the "Show more" preview of a completed text
+                        if is_truncated(merged) and row.get("text") and not is_truncated(row):
+                            merged["text"] = row["text"]
+                        continue
+                    if merged is not None:
+                        out.write(encode_record(merged) + "\n")
+                        written += 1
+                    current_id, merged = tweet_id, row
+                if merged is not None:
+                    out.write(encode_record(merged) + "\n")
+                    written += 1
+            finally:
+                for f in files:
+                    f.close()
+        os.replace(tmp_output, output_file)
+    finally:
+        for chunk in chunks:
+            os.remove(chunk)
+        os.rmdir(tmp_dir)
+
+    logger.info(f"Merged {len(paths)} files into {output_file}: {written} unique tweets"
+                + (f", skipped {skipped} rows without a tweet URL" if skipped else ""))
+    return written
+
+
+if __name__ == "__main__":
+
+    merge_runs(["data/tweets_*.jsonl*"], output_file="data/x.jsonl")
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from loguru import logger
+
+
+SCRAPER_FILE = "x_like_scrap.py"
+
+
+def _command_detail(command, params):
+    """Short description of what a WebDriver command targets"""
+    params = params or {}
+    if "using" in params and "value" in params:
+        return f"{params['using']}: {params['value']}"
+    if "script" in params:
+        return " ".join(params["script"].split())[:60]
+    if "name" in params:
+        return params["name"]
+    if "url" in params:
+        return params["url"]
+    return ""
+
+
+class CommandTracer:
+    """
+    Records every WebDriver command sent by a TwitterExtractor: command, selector, duration,
+    the extractor call stack that issued it and the tweet element being processed.
+    """
+
+    def __init__(self, driver):
+        self.records = []
+        self.lock = threading.Lock()
+        self.executor = driver.command_executor
+        self._original_execute = self.executor.execute
+        self.executor.execute = self._execute
+
+    def uninstall(self):
+        self.executor.execute = self._original_execute
+
+    def reset(self):
+        """Drop the records of earlier calls, so every report covers a single run"""
+        with self.lock:
+            self.records = []
+
+    @staticmethod
+    def _extractor_stack():
+        """
+        Scraper functions on the current call stack (outermost first) and the id of
+        the tweet element passed to _process_tweet, if any
+        """
+        stack, tweet = [], None
+        frame = sys._getframe(2)
+        while frame is not None:
+            code = frame.f_code
+            if code.co_filename.endswith(SCRAPER_FILE) and code.co_name != "<module>":
+                stack.append(code.co_name)
+                if code.co_name == "_process_tweet":
+                    element = frame.f_locals.get("tweet")
+                    tweet = getattr(element, "id", None) or tweet
+            frame = frame.f_back
+        stack.reverse()
+        return stack, tweet
+
+    def _execute(self, command, params=None):
+        stack, tweet = self._extractor_stack()
+        start = time.perf_counter()
+        try:
+            return self._original_execute(command, params)
+        finally:
+            duration = time.perf_counter() - start
+            with self.lock:
+                self.records.append({
+                    "command": command,
+                    "detail": _command_detail(command, params),
+                    "duration": duration,
+                    "stack": stack,
+                    "tweet": tweet,
+                })
+
+    def summary(self, top=15):
+        """
+        Aggregate cost per extractor method (innermost frame), per command/selector and per tweet
+        :return: Dict of sorted (name, calls, seconds) lists and per-tweet stats
+        """
+        by_method, by_selector = defaultdict(lambda: [0, 0.0]), defaultdict(lambda: [0, 0.0])
+        by_tweet = defaultdict(lambda: [0, 0.0])
+        for record in self.records:
+            method = record["stack"][-1] if record["stack"] else "<outside extractor>"
+            selector = f"{record['command']}({record['detail']})"
+            for table, key in ((by_method, method), (by_selector, selector), (by_tweet, record["tweet"])):
+                if key is None:
+                    continue
+                table[key][0] += 1
+                table[key][1] += record["duration"]
+
+        def ranked(table):
+            rows = sorted(table.items(), key=lambda item: item[1][1], reverse=True)[:top]
+            return [(name, calls, round(seconds, 4)) for name, (calls, seconds) in rows]
+
+        tweets = list(by_tweet.values())
+        return {
+            "commands": len(self.records),
+            "seconds": round(sum(r["duration"] for r in self.records), 3),
+            "by_method": ranked(by_method),
+            "by_selector": ranked(by_selector),
+            "tweets": len(tweets),
+            "commands_per_tweet": round(sum(c for c, _ in tweets) / len(tweets), 1) if tweets else 0,
+            "seconds_per_tweet": round(sum(s for _, s in tweets) / len(tweets), 4) if tweets else 0,
+        }
+
+    def _stacks(self):
+        for record in self.records:
+            frames = record["stack"] + [record["command"]]
+            if record["detail"]:
+                frames.append(record["detail"])
+            yield frames, record["duration"]
+
+    def write_collapsed(self, output_file):
+        """Collapsed stacks (flamegraph.pl / inferno), weights in microseconds"""
+        totals = defaultdict(float)
+        for frames, duration in self._stacks():
+            totals[";".join(f.replace(";", ",") for f in frames)] += duration
+        with open(output_file, 'w', encoding='utf-8') as f:
+            for stack, duration in totals.items():
+                f.write(f"{stack} {int(duration * 1e6)}\n")
+
+    def write_speedscope(self, output_file, name="fetch_tweets WebDriver commands"):
+        """Sampled speedscope profile, one weighted sample per command"""
+        frame_index, frames, samples, weights = {}, [], [], []
+        for stack, duration in self._stacks():
+            sample = []
+            for frame in stack:
+                if frame not in frame_index:
+                    frame_index[frame] = len(frames)
+                    frames.append({"name": frame})
+                sample.append(frame_index[frame])
+            samples.append(sample)
+            weights.append(round(duration * 1000, 3))
+        profile = {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round(sum(weights), 3),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(profile, f)
+
+    def write_reports(self, prefix):
+        """Write summary JSON, collapsed stacks and speedscope files next to each other"""
+        summary = self.summary()
+        with open(f"{prefix}.summary.json", 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=1)
+        self.write_collapsed(f"{prefix}.collapsed.txt")
+        self.write_speedscope(f"{prefix}.speedscope.json")
+        logger.info(
+            f"WebDriver trace: {summary['commands']} commands, {summary['seconds']}s, "
+            f"{summary['commands_per_tweet']} commands/tweet. Reports saved to {prefix}.*"
+        )
+        for method, calls, seconds in summary["by_method"][:5]:
+            logger.info(f"  {method}: {calls} commands, {seconds}s")
+
+
+def run_profiled(profiler, output_prefix, func, *args, **kwargs):
+    """
+    Run func under cProfile or pyinstrument
+    :param profiler: "cprofile" or "pyinstrument"
+    :param output_prefix: Output path without extension (.prof or .html is added)
+    """
+    if profiler == "cprofile":
+        import cProfile
+
+        prof = cProfile.Profile()
+        try:
+            return prof.runcall(func, *args, **kwargs)
+        finally:
+            prof.dump_stats(f"{output_prefix}.prof")
+            logger.info(f"cProfile stats saved to {output_prefix}.prof")
+    if profiler == "pyinstrument":
+        from pyinstrument import Profiler
+
+        prof = Profiler()
+        prof.start()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            prof.stop()
+            with open(f"{output_prefix}.html", 'w', encoding='utf-8') as f:
+                f.write(prof.output_html())
+            logger.info(f"pyinstrument report saved to {output_prefix}.html")
+    raise ValueError(f"Unknown profiler: {profiler}")
+
+
+def profiled(method):
+    """
+    Decorator for TwitterExtractor methods: runs them under self.profiler when set and
+    writes the command tracer reports when tracing is enabled
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        prefix = os.path.join("data", f"profile_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}")
+        if getattr(self, "tracer", None) is not None:
+            # A warm extractor is reused across runs, earlier commands belong to earlier reports
+            self.tracer.reset()
+        try:
+            if getattr(self, "profiler", None):
+                return run_profiled(self.profiler, prefix, method, self, *args, **kwargs)
+            return method(self, *args, **kwargs)
+        finally:
+            tracer = getattr(self, "tracer", None)
+            if tracer is not None and tracer.records:
+                tracer.write_reports(prefix)
+    return wrapper
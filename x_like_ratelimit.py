@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import re
+import threading
+import time
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+
+from loguru import logger
+
+
+GRAPHQL_OPERATION = re.compile(r'/graphql/[^/]+/([^/?]+)')
+API_PATH = re.compile(r'^(?:https?://[^/]+)?(/(?:1\.1|2|i/api))(/[^?#]*)')
+URL_HOST = re.compile(r'^https?://([^/?#]+)')
+ID_SEGMENT = re.compile(r'/(?:\d+|[0-9a-f]{16,})(?=/|\.|$)', re.IGNORECASE)
+
+
+def endpoint_name(url):
+    """
+    Rate limits on X are per endpoint: the GraphQL operation name, the REST path with ids
+    folded to :id, otherwise the host. Media and page URLs carry per-item paths, so keying
+    them by path would create a new budget for every request
+    :param url: Request URL
+    """
+    match = GRAPHQL_OPERATION.search(url)
+    if match:
+        return match.group(1)
+    match = API_PATH.search(url)
+    if match:
+        return match.group(1) + ID_SEGMENT.sub('/:id', match.group(2))
+    match = URL_HOST.search(url)
+    return match.group(1).lower() if match else '/'
+
+
+def retry_after_seconds(value, now=None):
+    """
+    Seconds to wait from a Retry-After header, which holds either a number of seconds or an HTTP date
+    :param value: Header value
+    :param now: Epoch seconds the date is measured from, the current time by default
+    :return: Seconds (0 for dates in the past), None if the header is missing or unparsable
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, when.timestamp() - (time.time() if now is None else now))
+
+
+class Budget:
+    def __init__(self):
+        self.limit = None
+        self.remaining = None
+        self.reset_at = 0.0
+        self.next_allowed = 0.0
+        self.min_interval = 0.0
+
+
+class RateLimitGovernor:
+    """
+    Shared pacing for all X API callers, driven by the x-rate-limit-* response headers.
+    Budgets are kept per (endpoint, token). Callers are spread evenly over the remaining
+    window so the budget runs out right at reset time, and once it is exhausted they
+    sleep exactly until x-rate-limit-reset.
+    """
+
+    def __init__(self, safety_margin=1, clock=time.time):
+        """
+        :param safety_margin: Requests kept in reserve per window
+        :param clock: Time source in epoch seconds (x-rate-limit-reset is an epoch timestamp)
+        """
+        self.safety_margin = safety_margin
+        self.clock = clock
+        self.budgets = {}
+        self.lock = threading.Lock()
+
+    def _budget(self, endpoint, token):
+        key = (endpoint, token)
+        budget = self.budgets.get(key)
+        if budget is None:
+            budget = self.budgets[key] = Budget()
+            # Endpoint-wide settings apply to every token
+            shared = self.budgets.get((endpoint, None))
+            if shared is not None:
+                budget.min_interval = shared.min_interval
+        return budget
+
+    def configure(self, endpoint, min_interval):
+        """
+        Fixed pacing for endpoints without rate-limit headers (e.g. browser page loads)
+        :param endpoint: Endpoint name
+        :param min_interval: Minimum seconds between calls
+        """
+        with self.lock:
+            for (name, _), budget in self.budgets.items():
+                if name == endpoint:
+                    budget.min_interval = min_interval
+            self._budget(endpoint, None).min_interval = min_interval
+
+    def _reserve(self, endpoint, token):
+        """Reserve the next slot and return how long the caller has to wait for it"""
+        with self.lock:
+            budget = self._budget(endpoint, token)
+            now = self.clock()
+            if budget.reset_at and now >= budget.reset_at:
+                # Window rolled over, the next response will tell us the new budget
+                budget.remaining = None
+                budget.reset_at = 0.0
+
+            start = max(now, budget.next_allowed)
+            interval = budget.min_interval
+            if budget.remaining is not None:
+                usable = budget.remaining - self.safety_margin
+                if usable <= 0:
+                    start = max(start, budget.reset_at)
+                    budget.remaining = None
+                    budget.reset_at = 0.0
+                else:
+                    interval = max(interval, (budget.reset_at - start) / usable)
+                    budget.remaining -= 1
+            budget.next_allowed = start + interval
+            return max(0.0, start - now)
+
+    def acquire(self, endpoint, token=None):
+        """Block the calling thread until a request to the endpoint is allowed"""
+        delay = self._reserve(endpoint, token)
+        if delay > 0:
+            logger.debug(f"Rate limit governor: waiting {delay:.2f}s for {endpoint}")
+            time.sleep(delay)
+
+    async def acquire_async(self, endpoint, token=None):
+        """asyncio variant of acquire"""
+        delay = self._reserve(endpoint, token)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def update(self, endpoint, token, headers, status_code=200):
+        """
+        Record the budget reported by a response
+        :param headers: Response headers (case-insensitive mapping)
+        :param status_code: Response status, 429 empties the budget until reset
+        """
+        limit = headers.get('x-rate-limit-limit')
+        remaining = headers.get('x-rate-limit-remaining')
+        reset = headers.get('x-rate-limit-reset')
+        with self.lock:
+            budget = self._budget(endpoint, token)
+            if limit is not None:
+                budget.limit = int(limit)
+            if remaining is not None and reset is not None:
+                budget.remaining = int(remaining)
+                budget.reset_at = float(reset)
+            if status_code == 429:
+                budget.remaining = 0
+                if reset is None:
+                    now = self.clock()
+                    retry_after = retry_after_seconds(headers.get('retry-after'), now)
+                    budget.reset_at = now + (retry_after if retry_after is not None else 60.0)
+                # Everyone queued behind this call waits for the reset as well
+                budget.next_allowed = max(budget.next_allowed, budget.reset_at)
+
+    def request(self, session, method, url, endpoint=None, token=None, max_retries=2, **kwargs):
+        """
+        Paced requests.Session call. A 429 waits until the reported reset and retries.
+        :param session: requests.Session (or the requests module)
+        :param endpoint: Budget name, derived from the URL by default
+        :param token: Guest/auth token the budget belongs to
+        :return: requests.Response (the last one if all retries hit 429)
+        """
+        endpoint = endpoint or endpoint_name(url)
+        for attempt in range(max_retries + 1):
+            self.acquire(endpoint, token)
+            response = session.request(method, url, **kwargs)
+            self.update(endpoint, token, response.headers, response.status_code)
+            if response.status_code != 429:
+                return response
+            logger.warning(f"429 from {endpoint}, waiting for rate limit reset (attempt {attempt + 1})")
+        return response
+
+    def status(self):
+        """Snapshot of all budgets for logging"""
+        with self.lock:
+            return {
+                f"{endpoint}|{token}" if token else endpoint: {
+                    "limit": budget.limit,
+                    "remaining": budget.remaining,
+                    "reset_in": round(max(0.0, budget.reset_at - self.clock()), 1) if budget.reset_at else None,
+                }
+                for (endpoint, token), budget in self.budgets.items()
+            }
+
+
+# Process-wide governor shared by the scraper and media tools
+governor = RateLimitGovernor()
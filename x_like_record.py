@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+from x_like_io import dumps, loads, iter_jsonl, iter_jsonl_from
+
+
+SCHEMA_VERSION = 2
+COUNT_FIELDS = ("num_like", "num_retweet", "num_reply", "num_views")
+
+# Field name -> default, in the order rows are written
+FIELDS = {
+    "text": "",
+    "author_name": "",
+    "author_handle": "",
+    "author_avatar": "",
+    "date": "",
+    "lang": "",
+    "url": "",
+    "mentioned_urls": list,
+    "is_retweet": False,
+    "media_type": "No media",
+    "images_urls": list,
+    "num_views": 0,
+    "num_reply": 0,
+    "num_retweet": 0,
+    "num_like": 0,
+}
+
+
+class TweetRecord:
+    """
+    One liked tweet as written by the scraper. Slotted, so a record costs a fraction of a row dict.
+    Keys outside the schema (videos, cluster ids, ...) are kept in extra.
+    """
+
+    __slots__ = tuple(FIELDS) + ("extra",)
+
+    def __init__(self, **values):
+        for name, default in FIELDS.items():
+            value = values.pop(name, None)
+            if value is None:
+                value = default() if callable(default) else default
+            setattr(self, name, value)
+        self.extra = values
+
+    @classmethod
+    def from_dict(cls, row):
+        """Build a record from a row of any schema version"""
+        row = migrate(row)
+        row.pop("schema_version")
+        return cls(**row)
+
+    def to_dict(self):
+        row = {name: getattr(self, name) for name in FIELDS}
+        row.update(self.extra)
+        row["schema_version"] = SCHEMA_VERSION
+        return row
+
+    def __repr__(self):
+        return f"TweetRecord(url={self.url!r}, date={self.date!r}, author_handle={self.author_handle!r})"
+
+
+def _count(value):
+    """Count as int, 0 for missing values and the NaN pandas writes for empty cells"""
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError, OverflowError):
+        return 0
+
+
+def _upgrade_v1(row):
+    # Unversioned rows: views were stored as num_view and counts could be missing or None
+    if "num_view" in row:
+        views = row.pop("num_view")
+        if not row.get("num_views"):
+            row["num_views"] = views
+    for name in COUNT_FIELDS:
+        row[name] = _count(row.get(name))
+    return row
+
+
+# MIGRATIONS[v] upgrades a row from schema version v to v + 1
+MIGRATIONS = {
+    1: _upgrade_v1,
+}
+
+
+def migrate(row):
+    """
+    Upgrade a row dict to SCHEMA_VERSION. Rows without schema_version are version 1.
+    :param row: Tweet dict (copied, the input is not modified)
+    :return: Upgraded dict
+    """
+    row = dict(row)
+    version = row.get("schema_version") or 1
+    while version < SCHEMA_VERSION:
+        row = MIGRATIONS[version](row)
+        version += 1
+    row["schema_version"] = version
+    return row
+
+
+def encode_record(row):
+    """
+    Serialize a TweetRecord (or a row dict) as one JSON line without the newline
+    """
+    # Rows read through migrate() already have every field, dump them without the record round trip
+    if isinstance(row, dict) and row.get("schema_version") == SCHEMA_VERSION and FIELDS.keys() <= row.keys():
+        return dumps(row)
+    if not isinstance(row, TweetRecord):
+        row = TweetRecord.from_dict(row)
+    return dumps(row.to_dict())
+
+
+def decode_record(line):
+    """Parse a JSON line of any schema version into a TweetRecord"""
+    return TweetRecord.from_dict(loads(line))
+
+
+def append_records(records, filename):
+    """Append records (or row dicts) to a JSONL file"""
+    with open(filename, "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(encode_record(record))
+            f.write("\n")
+
+
+def iter_records(path):
+    """Yield TweetRecords from a (possibly compressed) JSONL file, upgrading old rows"""
+    for row in iter_jsonl(path):
+        yield TweetRecord.from_dict(row)
+
+
+def iter_rows(path):
+    """Yield row dicts upgraded to SCHEMA_VERSION from a (possibly compressed) JSONL file"""
+    for row in iter_jsonl(path):
+        yield migrate(row)
+
+
+def iter_rows_from(path, offset=0):
+    """iter_jsonl_from with rows upgraded to SCHEMA_VERSION"""
+    for row, offset in iter_jsonl_from(path, offset):
+        yield migrate(row), offset
@@ -14,9 +14,17 @@ import pandas as pd
 from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_exception_type
 from loguru import logger
 from config import TWITTER_AUTH_TOKEN
+from x_like_dataset import TweetDataset
+from x_like_engagement import EngagementStore
+from x_like_io import dumps, is_side_file, open_text, tweet_id_from_url
+from x_like_record import encode_record, iter_rows
+from x_like_profile import CommandTracer, profiled
+from x_like_ratelimit import governor
+from x_like_video import VideoResolver, merge_videos
+from x_like_watchdog import BrowserRecycle
 import requests
-from bs4 import BeautifulSoup
 import os
+import glob
 
 
 headers = {
@@ -24,8 +32,24 @@ headers = {
 }
 
 class TwitterExtractor:
-    def __init__(self, headless=True):
+    def __init__(self, headless=True, trace_commands=False, profiler=None, interactive=True, watchdog=None):
+        """
+        :param headless: Run Chrome headless
+        :param trace_commands: Record every WebDriver command and write cost reports after fetch_tweets
+        :param profiler: None, "cprofile" or "pyinstrument" to profile fetch_tweets
+        :param interactive: Pause for a manual page refresh on timeouts. Turn off for unattended runs
+        :param watchdog: BrowserWatchdog that recycles Chrome when it degrades during fetch_tweets
+        """
+        self.headless = headless
         self.driver = self._start_chrome(headless)
+        self.tracer = CommandTracer(self.driver) if trace_commands else None
+        self.profiler = profiler
+        self.interactive = interactive
+        self.watchdog = watchdog
+        self.engagement = None
+        self.snapshot = None
+        if watchdog is not None:
+            watchdog.attach(self.driver)
         self.set_token()
         self.consecutive_invisible_tweets = 0  # Add counter
         self.attempt_count = 0  # Add attempt counter
@@ -40,9 +64,64 @@ class TwitterExtractor:
     def set_token(self, auth_token=TWITTER_AUTH_TOKEN):
         if not auth_token or auth_token == "YOUR_TWITTER_AUTH_TOKEN_HERE":
             raise ValueError("Access token is missing. Please configure it properly.")
-        expiration = (datetime.now() + timedelta(days=7)).strftime("%Y-%m-%d")
-        cookie_script = f"document.cookie = 'auth_token={auth_token}; expires={expiration}; path=/';"
-        self.driver.execute_script(cookie_script)
+        expiration = datetime.now() + timedelta(days=7)
+        # X sets auth_token HttpOnly, a document.cookie write cannot replace it when switching accounts
+        self.driver.delete_all_cookies()
+        self.driver.add_cookie({
+            "name": "auth_token",
+            "value": auth_token,
+            "path": "/",
+            "expiry": int(expiration.timestamp()),
+        })
+        self.auth_token = auth_token
+
+    def recycle(self):
+        """Replace Chrome with a fresh instance logged in with the same token"""
+        if self.watchdog is not None:
+            self.watchdog.detach()
+        try:
+            self.driver.quit()
+        except Exception as e:
+            logger.warning(f"Error quitting the old browser: {e}")
+        self.driver = self._start_chrome(self.headless)
+        if self.tracer is not None:
+            records = self.tracer.records
+            self.tracer = CommandTracer(self.driver)
+            self.tracer.records = records
+        if self.watchdog is not None:
+            self.watchdog.attach(self.driver)
+        self.set_token(self.auth_token)
+
+    def _skip_seen(self, processed_urls):
+        """
+        After a recycle the timeline starts from the top again. Remove the cells of tweets
+        that were already processed as soon as they load, so the loop gets back to where it was
+        """
+        seen = [tweet_id for tweet_id in map(tweet_id_from_url, processed_urls) if tweet_id is not None]
+        if not seen:
+            return
+        self.driver.execute_script(
+            """
+            const seen = new Set(arguments[0].map(String));
+            const prune = () => {
+                let removed = 0;
+                document.querySelectorAll("div[data-testid='cellInnerDiv']").forEach(cell => {
+                    const link = cell.querySelector("article[data-testid='tweet'] a[href*='/status/']");
+                    const match = link && link.getAttribute('href').match(/\/status\/(\d+)/);
+                    if (match && seen.has(match[1])) {
+                        cell.remove();
+                        removed++;
+                    }
+                });
+                // Nudge the timeline so it loads the next page into the freed space
+                if (removed) window.scrollBy(0, 1);
+            };
+            new MutationObserver(prune).observe(document.body, { childList: true, subtree: true });
+            prune();
+            """,
+            seen,
+        )
+        logger.info(f"Skipping {len(seen)} already processed tweets on the fresh browser")
     
     def fetch_user_avatar(self, author_handle):
         """
@@ -153,8 +232,9 @@ class TwitterExtractor:
                 time.sleep(3)
             
             # Add pause mechanism
-            logger.info("Timeout encountered, please refresh the page manually and press Enter to continue...")
-            input("Press Enter to continue...")
+            if self.interactive:
+                logger.info("Timeout encountered, please refresh the page manually and press Enter to continue...")
+                input("Press Enter to continue...")
             
             raise
         except NoSuchElementException:
@@ -165,8 +245,9 @@ class TwitterExtractor:
                 time.sleep(3)
             
             # Add pause mechanism
-            logger.info("Element not found, please refresh the page manually and press Enter to continue...")
-            input("Press Enter to continue...")
+            if self.interactive:
+                logger.info("Element not found, please refresh the page manually and press Enter to continue...")
+                input("Press Enter to continue...")
             
             raise
 
@@ -223,6 +304,9 @@ class TwitterExtractor:
                 "images_urls": (self._get_images_urls(tweet) if self._get_media_type(tweet) in ["Image", "Video"] else []),
                 "num_views": self._get_view_count(tweet),
             }
+            if card_title:
+                # Kept separately so the "Show more" ellipsis can be found before the appended title
+                data["card_title"] = card_title
             
             # Convert date format
             if data["date"]:
@@ -474,11 +558,110 @@ class TwitterExtractor:
             logger.warning(f"Error deleting tweet: {e}")
             return
 
+    def _mark_loaded_cells(self, batch_no):
+        """
+        Tag every loaded timeline cell (tweet, age-restricted or unavailable post) with the batch
+        number in a single script call and return the tweet articles inside them
+        """
+        marked = self.driver.execute_script(
+            """
+            const batch = String(arguments[0]);
+            let count = 0;
+            document.querySelectorAll("div[data-testid='cellInnerDiv']").forEach(cell => {
+                if (cell.hasAttribute('data-xlike-batch')) return;
+                if (cell.querySelector("article[data-testid='tweet']")
+                    || /Age-restricted adult content|This post is unavailable/.test(cell.textContent)) {
+                    cell.setAttribute('data-xlike-batch', batch);
+                    count++;
+                }
+            });
+            return count;
+            """,
+            batch_no,
+        )
+        if not marked:
+            return []
+        return self.driver.find_elements(
+            By.CSS_SELECTOR, f"div[data-xlike-batch='{batch_no}'] article[data-testid='tweet']"
+        )
+
+    def _keep_cells(self, tweets, max_retries=2):
+        """
+        Take the cells of tweets that failed to process out of their batch, so the prune leaves them
+        on the page and the next batch tries them again. A cell that failed more than max_retries
+        times stays in its batch and is pruned.
+        :return: Number of cells kept
+        """
+        kept = 0
+        for tweet in tweets:
+            try:
+                kept += self.driver.execute_script(
+                    """
+                    const cell = arguments[0].closest("div[data-testid='cellInnerDiv']");
+                    if (!cell) return 0;
+                    const retries = Number(cell.getAttribute('data-xlike-retries') || 0) + 1;
+                    if (retries > arguments[1]) return 0;
+                    cell.setAttribute('data-xlike-retries', String(retries));
+                    cell.removeAttribute('data-xlike-batch');
+                    return 1;
+                    """,
+                    tweet,
+                    max_retries,
+                )
+            except StaleElementReferenceException:
+                # Already gone from the page, nothing left to retry
+                continue
+        return kept
+
+    def _prune_batch(self, batch_no, attempts=3):
+        """
+        Remove all cells of a batch in one script call and verify by counting the markers left
+        """
+        for attempt in range(attempts):
+            remaining = self.driver.execute_script(
+                """
+                const selector = "div[data-xlike-batch='" + arguments[0] + "']";
+                document.querySelectorAll(selector).forEach(cell => cell.remove());
+                // Nudge the timeline so it loads the next page into the freed space
+                window.scrollBy(0, 1);
+                return document.querySelectorAll(selector).length;
+                """,
+                batch_no,
+            )
+            if remaining == 0:
+                return
+            logger.warning(f"{remaining} cells of batch {batch_no} still present, attempt {attempt + 1}")
+        raise Exception(f"Failed to prune batch {batch_no} after {attempts} attempts")
+
+    def _capture_cells(self):
+        """
+        Take the outerHTML of every loaded tweet cell and remove the cells, all in one script call.
+        Only the url and time are read here, parsing happens offline in x_like_snapshot.py
+        :return: (page origin, [(outerHTML, url, datetime), ...])
+        """
+        return self.driver.execute_script(
+            """
+            const captured = [];
+            document.querySelectorAll("div[data-testid='cellInnerDiv']").forEach(cell => {
+                if (cell.querySelector("article[data-testid='tweet']")) {
+                    const link = cell.querySelector("article[data-testid='tweet'] a[href*='/status/']");
+                    const time = cell.querySelector("time");
+                    captured.push([cell.outerHTML, link ? link.href : "", time ? time.getAttribute("datetime") : ""]);
+                    cell.remove();
+                } else if (/Age-restricted adult content|This post is unavailable/.test(cell.textContent)) {
+                    cell.remove();
+                }
+            });
+            // Nudge the timeline so it loads the next page into the freed space
+            window.scrollBy(0, 1);
+            return [location.origin, captured];
+            """
+        )
+
     @staticmethod
     def _save_to_json(data, filename="data.json"):
         with open(filename, "a", encoding="utf-8") as file:
-            json.dump(data, file, ensure_ascii=False)
-            file.write("\n")
+            file.write(encode_record(data) + "\n")
 
     @staticmethod
     def _save_to_excel(json_filename, output_filename="data/data.xlsx"):
@@ -510,18 +693,134 @@ class TwitterExtractor:
             pass
         return 0
 
-    def fetch_tweets(self, page_url, start_date, end_date, method='remove'):
+    @staticmethod
+    def load_known_ids(patterns=("data/x.jsonl", "data/tweets_*.jsonl*")):
+        """
+        Collect the ids of tweets that are already archived
+        :param patterns: Glob patterns of existing JSONL outputs, compressed run files included
+        :return: Set of tweet ids
+        """
+        known_ids = set()
+        for pattern in patterns:
+            for path in glob.glob(pattern):
+                if is_side_file(path):
+                    # Capture snapshots and video side files, the rows are in the run file
+                    continue
+                for row in iter_rows(path):
+                    tweet_id = tweet_id_from_url(row.get("url"))
+                    if tweet_id is not None:
+                        known_ids.add(tweet_id)
+        logger.info(f"Loaded {len(known_ids)} already archived tweets")
+        return known_ids
+
+    def _save_row(self, row, cur_filename, canonical_file=None, video_resolver=None):
+        """Append a scraped row to the run file (and the canonical file in sync mode)"""
+        self._save_to_json(row, filename=f"{cur_filename}.jsonl")
+        if canonical_file is not None:
+            self._save_to_json(row, filename=canonical_file)
+        if video_resolver is not None:
+            video_resolver.submit(row)
+        if self.engagement is not None:
+            self.engagement.observe_row(row)
+        logger.info(f"Saving tweets...\n{row['date']},  {row['author_name']} -- {row['text'][:50]}...\n\n")
+
+    @profiled
+    def fetch_tweets(self, page_url, start_date=None, end_date=None, method='remove', sync=False,
+                     stop_after_known=20, canonical_file="data/x.jsonl", resolve_videos=False, video_workers=4,
+                     known_ids=None, engagement_file="data/engagement.ts"):
+        """
+        Scrape liked tweets
+        :param page_url: Likes page URL
+        :param start_date: Stop at tweets older than this "YYYY-MM-DD" date (optional in sync mode)
+        :param end_date: Skip tweets newer than this "YYYY-MM-DD" date (optional in sync mode)
+        :param method: 'remove', 'batch_remove', 'capture' or 'scroll'. 'batch_remove' harvests every loaded
+                       tweet and removes them together, keeping the low memory of 'remove'. 'capture' only
+                       dumps the cell HTML to <run file>.snapshot.jsonl.gz, parse it with x_like_snapshot.py
+        :param sync: Incremental mode, stop after stop_after_known consecutive already archived
+                     likes and append only new tweets to canonical_file
+        :param resolve_videos: Resolve video variants in a background thread pool while scrolling.
+                               Results go to data/videos/<run time>.jsonl and are merged into the run file
+        :param video_workers: Threads resolving videos
+        :param known_ids: Already archived tweet ids for sync mode, loaded from data/ when not given
+        :param engagement_file: EngagementStore that records the counts of every saved tweet, None to skip
+        """
+        run_time = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+        cur_filename = f"data/tweets_{run_time}"
+        # Outside data/tweets_*, so globs over the run files never pick the side file up
+        video_resolver = VideoResolver(f"data/videos/{run_time}.jsonl", workers=video_workers) if resolve_videos else None
+        # Shared across recycles, so a fresh browser continues where the old one stopped
+        processed_urls = set()
+        if self.watchdog is not None:
+            self.watchdog.recycles = 0
+        # Opened per run, other writers may have extended the log while a warm browser sat idle
+        self.engagement = EngagementStore(engagement_file) if engagement_file else None
+        if method == 'capture':
+            self.snapshot = open_text(f"{cur_filename}.snapshot.jsonl.gz", "at")
+        try:
+            while True:
+                try:
+                    self._fetch_timeline(page_url, cur_filename, start_date, end_date, method, sync,
+                                         stop_after_known, canonical_file, video_resolver, known_ids,
+                                         processed_urls)
+                    break
+                except Exception as e:
+                    if self.watchdog is None:
+                        raise
+                    reason = str(e) if isinstance(e, BrowserRecycle) else None
+                    if reason is None and not self.watchdog.browser_failed():
+                        raise
+                    if self.watchdog.recycles >= self.watchdog.max_recycles:
+                        logger.error(f"Browser recycled {self.watchdog.recycles} times, giving up")
+                        raise
+                    self.watchdog.recycles += 1
+                    logger.warning(
+                        f"Recycling browser ({reason or f'browser failed: {type(e).__name__}: {e}'}), "
+                        f"{len(processed_urls)} tweets processed so far"
+                    )
+                    self.recycle()
+        finally:
+            if self.snapshot is not None:
+                self.snapshot.close()
+                self.snapshot = None
+            if self.engagement is not None:
+                self.engagement.close()
+                self.engagement = None
+            if video_resolver is not None:
+                video_resolver.close()
+                merge_videos(f"{cur_filename}.jsonl", video_resolver.side_file)
+                if sync and canonical_file:
+                    # Sync runs also appended their rows to the archive
+                    merge_videos(canonical_file, video_resolver.side_file)
+
+    def _fetch_timeline(self, page_url, cur_filename, start_date, end_date, method, sync,
+                        stop_after_known, canonical_file, video_resolver=None, known_ids=None,
+                        processed_urls=None):
         self.driver.get(page_url)
-        cur_filename = f"data/tweets_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}"
         self.consecutive_invisible_tweets = 0  # Reset counter
-        processed_urls = set()  # For tracking processed URLs
+        if processed_urls is None:
+            processed_urls = set()  # For tracking processed URLs
+        else:
+            self._skip_seen(processed_urls)
         tweet_count = 0  # Track number of tweets processed
 
+        # Likes are newest first, so a run of known likes means everything below is archived
+        if sync and known_ids is None:
+            known_ids = self.load_known_ids()
+        elif not sync:
+            known_ids = None
+        consecutive_known = 0
+        batch_no = 0
+
         # Convert start_date and end_date from "YYYY-MM-DD" to datetime objects
-        start_date = datetime.strptime(start_date, "%Y-%m-%d")
-        end_date = datetime.strptime(end_date, "%Y-%m-%d")
+        start_date = datetime.strptime(start_date, "%Y-%m-%d") if start_date else datetime.min
+        end_date = datetime.strptime(end_date, "%Y-%m-%d") if end_date else datetime.max
 
         while True:
+            if self.watchdog is not None:
+                reason = self.watchdog.should_recycle()
+                if reason:
+                    raise BrowserRecycle(reason)
+
             # Choose method based on tweet count
             if method == 'remove':
                 # Use deletion method
@@ -540,6 +839,17 @@ class TwitterExtractor:
                     if url in processed_urls:
                         self._delete_first_tweet(url)
                         continue
+
+                    if known_ids is not None:
+                        if tweet_id_from_url(url) in known_ids:
+                            consecutive_known += 1
+                            if consecutive_known >= stop_after_known:
+                                logger.info(f"Sync done, {consecutive_known} known likes in a row. {tweet_count} new tweets.")
+                                return
+                            processed_urls.add(url)
+                            self._delete_first_tweet(url)
+                            continue
+                        consecutive_known = 0
                     
                     # Process tweet
                     row = self._process_tweet(tweet)
@@ -560,10 +870,8 @@ class TwitterExtractor:
                             continue
 
                     # Save tweet
-                    self._save_to_json(row, filename=f"{cur_filename}.jsonl")
-                    logger.info(
-                        f"Saving tweets...\n{row['date']},  {row['author_name']} -- {row['text'][:50]}...\n\n"
-                    )
+                    self._save_row(row, cur_filename, canonical_file if known_ids is not None else None,
+                                   video_resolver)
                     
                     # Record processed URL and increment count
                     processed_urls.add(url)
@@ -576,6 +884,105 @@ class TwitterExtractor:
                 # Delete processed tweet
                 self._delete_first_tweet(url)
                 
+            elif method == 'batch_remove':
+                # Harvest all loaded tweets, then prune them in one script call
+                self._get_first_tweet()
+                batch_no += 1
+                tweets = self._mark_loaded_cells(batch_no)
+                if not tweets:
+                    self._prune_batch(batch_no)
+                    logger.info("No tweets found, attempting to scroll down...")
+                    self.scroll_down(20)
+                    continue
+
+                failed = []
+                for tweet in tweets:
+                    try:
+                        url = self._get_tweet_url(tweet)
+                        if url in processed_urls:
+                            continue
+
+                        if known_ids is not None:
+                            if tweet_id_from_url(url) in known_ids:
+                                consecutive_known += 1
+                                if consecutive_known >= stop_after_known:
+                                    logger.info(f"Sync done, {consecutive_known} known likes in a row. {tweet_count} new tweets.")
+                                    return
+                                processed_urls.add(url)
+                                continue
+                            consecutive_known = 0
+
+                        row = self._process_tweet(tweet)
+                        if row["date"]:
+                            try:
+                                date = datetime.strptime(row["date"], "%Y-%m-%d")
+                            except ValueError as e:
+                                logger.info(
+                                    f"Value error on date format, trying another format.{row['date']}",
+                                    e,
+                                )
+                                date = datetime.strptime(row["date"], "%d/%m/%Y")
+
+                            if date < start_date:
+                                return  # End if date is before start date
+                            elif date > end_date:
+                                continue  # Skip if date is after end date
+
+                        self._save_row(row, cur_filename, canonical_file if known_ids is not None else None,
+                                       video_resolver)
+
+                        processed_urls.add(url)
+                        tweet_count += 1
+
+                    except Exception as e:
+                        logger.error(f"Error processing tweet: {e}")
+                        failed.append(tweet)
+                        continue
+
+                # Failed tweets stay on the page for the next batch instead of being pruned unsaved
+                kept = self._keep_cells(failed) if failed else 0
+                self._prune_batch(batch_no)
+                logger.info(f"Batch {batch_no}: pruned {len(tweets) - kept} tweets, kept {kept} to retry, "
+                            f"{tweet_count} saved so far")
+
+            elif method == 'capture':
+                # Dump the raw cells, rows are parsed offline
+                self._get_first_tweet()
+                base, cells = self._capture_cells()
+                if not cells:
+                    logger.info("No tweets found, attempting to scroll down...")
+                    self.scroll_down(20)
+                    continue
+
+                for html, url, timestamp in cells:
+                    if not url or url in processed_urls:
+                        continue
+
+                    if known_ids is not None:
+                        if tweet_id_from_url(url) in known_ids:
+                            consecutive_known += 1
+                            if consecutive_known >= stop_after_known:
+                                logger.info(f"Sync done, {consecutive_known} known likes in a row. {tweet_count} new tweets.")
+                                return
+                            processed_urls.add(url)
+                            continue
+                        consecutive_known = 0
+
+                    if timestamp:
+                        date = datetime.strptime(timestamp[:10], "%Y-%m-%d")
+                        if date < start_date:
+                            return  # End if date is before start date
+                        elif date > end_date:
+                            continue  # Skip if date is after end date
+
+                    self.snapshot.write(dumps({"captured_at": int(time.time()), "base": base, "html": html}) + "\n")
+                    processed_urls.add(url)
+                    tweet_count += 1
+
+                # Make what was captured so far readable even if the run is killed
+                self.snapshot.flush()
+                logger.info(f"Captured {len(cells)} cells, {tweet_count} tweets so far")
+
             else:
                 # Use scrolling method
                 tweets = WebDriverWait(self.driver, 10).until(
@@ -598,6 +1005,16 @@ class TwitterExtractor:
                         # Skip if URL already processed
                         if url in processed_urls:
                             continue
+
+                        if known_ids is not None:
+                            if tweet_id_from_url(url) in known_ids:
+                                consecutive_known += 1
+                                if consecutive_known >= stop_after_known:
+                                    logger.info(f"Sync done, {consecutive_known} known likes in a row. {tweet_count} new tweets.")
+                                    return
+                                processed_urls.add(url)
+                                continue
+                            consecutive_known = 0
                         
                         # Process tweet
                         row = self._process_tweet(tweet)
@@ -617,8 +1034,8 @@ class TwitterExtractor:
                                 continue  # Skip if date is after end date
 
                         # Save tweet
-                        self._save_to_json(row, filename=f"{cur_filename}.jsonl")
-                        logger.info(f"Saving tweets...\n{row['date']},  {row['author_name']} -- {row['text'][:50]}...\n\n")
+                        self._save_row(row, cur_filename, canonical_file if known_ids is not None else None,
+                                       video_resolver)
                         
                         # Record processed URL and increment count
                         processed_urls.add(url)
@@ -635,28 +1052,19 @@ class TwitterExtractor:
         # Save to Excel
         self._save_to_excel(json_filename=f"{cur_filename}.jsonl", output_filename=f"{cur_filename}.xlsx")
 
-def get_author_avatar(jsonl_file="data/x.jsonl", output_file="data/author_avatar.jsonl"):
+def get_author_avatar(jsonl_file="data/x.jsonl", output_file="data/author_avatar.jsonl", extractor=None):
     """
     Read user information from JSONL file, fetch avatars and save them
     :param jsonl_file: Input JSONL file path
     :param output_file: Output JSONL file path
+    :param extractor: Running TwitterExtractor to reuse, a new browser is started by default
+    :return: {"fetched", "failed", "remaining"} counts of this run
     """
     try:
-        # Read all tweet data
-        tweets = []
-        with open(jsonl_file, 'r', encoding='utf-8') as f:
-            for line in f:
-                tweets.append(json.loads(line.strip()))
-        
-        # Count author frequency
-        author_counts = {}
-        for tweet in tweets:
-            if 'author_handle' in tweet and tweet['author_handle']:
-                handle = tweet['author_handle']
-                author_counts[handle] = author_counts.get(handle, 0) + 1
-        
-        # Sort by frequency
-        sorted_authors = sorted(author_counts.items(), key=lambda x: x[1], reverse=True)
+        # Count author frequency on the columnar dataset, sorted by frequency
+        dataset = TweetDataset.from_jsonl(jsonl_file, load_text=False)
+        sorted_authors = [(handle, count) for handle, count in dataset.group_count("author") if handle]
+        author_counts = dict(sorted_authors)
         unique_handles = [handle for handle, _ in sorted_authors]
         
         print(f"Found {len(unique_handles)} unique users")
@@ -681,14 +1089,18 @@ def get_author_avatar(jsonl_file="data/x.jsonl", output_file="data/author_avatar
         print(f"Remaining {len(remaining_handles)} users need avatar fetching")
         
         # Create TwitterExtractor instance
-        extractor = TwitterExtractor()
+        extractor = extractor or TwitterExtractor()
         
+        # Profile page loads carry no rate-limit headers, pace them through the shared governor
+        governor.configure("avatar_page", min_interval=5)
+
         # Fetch avatars for remaining users
         new_avatars = []
+        failed = 0
         for i, handle in enumerate(remaining_handles[:50]):
             try:
+                governor.acquire("avatar_page")
                 avatar_url = extractor.fetch_user_avatar(handle)
-                time.sleep(5)  # Add delay to avoid too frequent requests
                 new_avatars.append({
                     'author_handle': handle,
                     'avatar_url': avatar_url
@@ -696,6 +1108,7 @@ def get_author_avatar(jsonl_file="data/x.jsonl", output_file="data/author_avatar
                 print(f"{i+1}/{len(remaining_handles)}, Successfully fetched avatar for user {handle} (appears {author_counts[handle]} times)")
             except Exception as e:
                 print(f"{i+1}/{len(remaining_handles)}, Failed to fetch avatar for user {handle}: {e}")
+                failed += 1
                 break
         
         # Merge old and new avatar information
@@ -717,9 +1130,11 @@ def get_author_avatar(jsonl_file="data/x.jsonl", output_file="data/author_avatar
         
         print(f"Avatar information saved to {output_file}")
         print(f"Total of {len(all_avatars)} user avatars saved")
+        return {"fetched": len(new_avatars), "failed": failed, "remaining": len(remaining_handles) - len(new_avatars)}
         
     except Exception as e:
         print(f"Error during processing: {e}")
+        raise
 
 
 if __name__ == "__main__":
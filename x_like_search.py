@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+import json
+import re
+import sqlite3
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from loguru import logger
+
+from x_like_io import tweet_id_from_url, date_key, dumps, file_fingerprint, resume_offset
+from x_like_record import iter_rows_from
+
+
+# CJK ideographs, kana and hangul have no word boundaries, everything else is
+# split into lowercase words of any script (café, naïve, привет).
+CJK_RANGES = (
+    '぀-ヿ'   # Hiragana / Katakana
+    '㐀-䶿'   # CJK Extension A
+    '一-鿿'   # CJK Unified Ideographs
+    '가-힯'   # Hangul syllables
+    '豈-﫿'   # CJK Compatibility Ideographs
+)
+TOKEN_PATTERN = re.compile(f'([{CJK_RANGES}]+)|([^\\W{CJK_RANGES}]+)')
+# Bump when tokenize() or the FTS columns change, indexes built with another version are rebuilt on open
+TOKENIZER_VERSION = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tweets (
+    id INTEGER PRIMARY KEY,
+    url TEXT,
+    author_handle TEXT,
+    author_name TEXT,
+    date TEXT,
+    date_key INTEGER,
+    media_type TEXT,
+    lang TEXT,
+    num_like INTEGER,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tweets_author ON tweets(author_handle);
+CREATE INDEX IF NOT EXISTS idx_tweets_date ON tweets(date_key);
+CREATE VIRTUAL TABLE IF NOT EXISTS tweets_fts USING fts5(body, author, tails, tokenize='unicode61 remove_diacritics 2');
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY,
+    offset INTEGER,
+    fingerprint TEXT
+);
+"""
+
+
+def tokenize(text, for_query=False):
+    """
+    Split text into index tokens. Other scripts become lowercase words and CJK runs
+    become overlapping bigrams, so a phrase of bigrams is an exact substring match.
+    Index and query text produce the same stream, so phrases spanning scripts match.
+    :param text: Raw text
+    :param for_query: Query mode, single CJK characters become prefix terms
+    :return: List of tokens
+    """
+    tokens = []
+    for cjk, word in TOKEN_PATTERN.findall((text or '').lower()):
+        if word:
+            tokens.append(word)
+        elif len(cjk) == 1:
+            tokens.append(f'{cjk}*' if for_query else cjk)
+        else:
+            tokens.extend(cjk[i:i + 2] for i in range(len(cjk) - 1))
+    return tokens
+
+
+def run_tails(text):
+    """
+    Last character of every CJK run longer than one, indexed in a column of its own so
+    single-character queries also hit the end of a run without breaking the phrase stream
+    """
+    return [cjk[-1] for cjk, _ in TOKEN_PATTERN.findall((text or '').lower()) if len(cjk) > 1]
+
+
+def build_match_query(query):
+    """
+    Turn a user query into an FTS5 MATCH expression.
+    Quoted segments are phrases, every other term is ANDed.
+    :param query: User query, e.g. 'rag "long context" 透明背景'
+    :return: MATCH expression or '' if the query has no searchable tokens
+    """
+    clauses = []
+    for phrase, term in re.findall(r'"([^"]*)"|(\S+)', query or ''):
+        tokens = tokenize(phrase or term, for_query=True)
+        if not tokens:
+            continue
+        prefix = [t for t in tokens if t.endswith('*')]
+        plain = [t for t in tokens if not t.endswith('*')]
+        if plain:
+            clauses.append('"' + ' '.join(plain) + '"')
+        clauses.extend(f'"{t[:-1]}"*' for t in prefix)
+    return ' AND '.join(clauses)
+
+
+class TweetSearchIndex:
+    def __init__(self, db_path="data/search.db"):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != TOKENIZER_VERSION:
+            # Older versions may have other FTS columns
+            self.conn.execute("DROP TABLE IF EXISTS tweets_fts")
+        self.conn.executescript(SCHEMA)
+        if "fingerprint" not in [c[1] for c in self.conn.execute("PRAGMA table_info(sources)")]:
+            self.conn.execute("ALTER TABLE sources ADD COLUMN fingerprint TEXT")
+        if version != TOKENIZER_VERSION:
+            with self.conn:
+                if self.conn.execute("SELECT 1 FROM sources LIMIT 1").fetchone():
+                    logger.info(f"{db_path} was built with tokenizer v{version}, indexing again")
+                # Forgetting the offsets makes the next update_from_jsonl read every row again
+                self.conn.execute("DELETE FROM tweets")
+                self.conn.execute("DELETE FROM sources")
+                self.conn.execute(f"PRAGMA user_version = {TOKENIZER_VERSION}")
+
+    def close(self):
+        self.conn.close()
+
+    def add_rows(self, rows):
+        """
+        Insert or replace tweets in the index
+        :param rows: Iterable of tweet dicts as written by TwitterExtractor
+        :return: Number of rows indexed
+        """
+        count = 0
+        with self.lock, self.conn:
+            for row in rows:
+                if self._upsert(row):
+                    count += 1
+        return count
+
+    def _upsert(self, row):
+        tweet_id = tweet_id_from_url(row.get('url'))
+        if tweet_id is None:
+            return False
+        self.conn.execute("DELETE FROM tweets_fts WHERE rowid = ?", (tweet_id,))
+        self.conn.execute(
+            "INSERT OR REPLACE INTO tweets VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                tweet_id,
+                row.get('url'),
+                row.get('author_handle') or '',
+                row.get('author_name') or '',
+                row.get('date') or '',
+                date_key(row.get('date')),
+                row.get('media_type') or '',
+                row.get('lang') or '',
+                row.get('num_like') or 0,
+                dumps(row),
+            ),
+        )
+        author = f"{row.get('author_name') or ''} {row.get('author_handle') or ''}"
+        self.conn.execute(
+            "INSERT INTO tweets_fts(rowid, body, author, tails) VALUES (?, ?, ?, ?)",
+            (tweet_id, ' '.join(tokenize(row.get('text'))), ' '.join(tokenize(author)),
+             ' '.join(run_tails(row.get('text')) + run_tails(author))),
+        )
+        return True
+
+    def update_from_jsonl(self, jsonl_file):
+        """
+        Index rows appended to a JSONL file since the last call.
+        The byte offset per file is stored in the index, so this is cheap to call
+        repeatedly while a scrape is still writing to the file. A file rewritten since
+        (merge, annotation passes) is indexed again from the start.
+        :param jsonl_file: JSONL file path
+        :return: Number of new rows indexed
+        """
+        cur = self.conn.execute("SELECT offset, fingerprint FROM sources WHERE path = ?", (jsonl_file,))
+        found = cur.fetchone()
+        offset = resume_offset(jsonl_file, *found) if found else 0
+
+        count = 0
+        with self.lock, self.conn:
+            for row, offset in iter_rows_from(jsonl_file, offset):
+                if self._upsert(row):
+                    count += 1
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sources(path, offset, fingerprint) VALUES (?, ?, ?)",
+                (jsonl_file, offset, file_fingerprint(jsonl_file, offset)),
+            )
+        if count:
+            logger.info(f"Indexed {count} new tweets from {jsonl_file}")
+        return count
+
+    def search(self, query, author=None, start_date=None, end_date=None, media_type=None,
+               limit=50, offset=0):
+        """
+        Ranked full-text search
+        :param query: Search terms, quoted segments are phrase queries
+        :param author: Author handle filter (with @ symbol)
+        :param start_date: Inclusive "YYYY-MM-DD" lower bound
+        :param end_date: Inclusive "YYYY-MM-DD" upper bound
+        :param media_type: "Image", "Video" or "No media"
+        :param limit: Maximum number of results
+        :param offset: Number of results to skip
+        :return: List of tweet dicts ordered by relevance (bm25, body weighted over author)
+        """
+        match = build_match_query(query)
+        where, params = [], []
+        if author:
+            where.append("t.author_handle = ?")
+            params.append(author)
+        if start_date:
+            where.append("t.date_key >= ?")
+            params.append(date_key(start_date))
+        if end_date:
+            where.append("t.date_key <= ?")
+            params.append(date_key(end_date))
+        if media_type:
+            where.append("t.media_type = ?")
+            params.append(media_type)
+
+        if match:
+            sql = (
+                "SELECT t.data FROM tweets_fts JOIN tweets t ON t.id = tweets_fts.rowid "
+                "WHERE tweets_fts MATCH ?"
+            )
+            params.insert(0, match)
+            if where:
+                sql += " AND " + " AND ".join(where)
+            sql += " ORDER BY bm25(tweets_fts, 10.0, 1.0, 10.0)"
+        else:
+            sql = "SELECT t.data FROM tweets t"
+            if where:
+                sql += " WHERE " + " AND ".join(where)
+            sql += " ORDER BY t.date_key DESC"
+        sql += " LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM tweets").fetchone()[0]
+
+
+def serve(index, host="127.0.0.1", port=8765):
+    """
+    Serve the index over HTTP for the frontend search box.
+    GET /api/search?q=...&author=...&start=...&end=...&media_type=...&limit=...
+    :param index: TweetSearchIndex instance
+    """
+    class SearchHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            if parsed.path != '/api/search':
+                self.send_error(404)
+                return
+            params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+            try:
+                results = index.search(
+                    params.get('q', ''),
+                    author=params.get('author'),
+                    start_date=params.get('start'),
+                    end_date=params.get('end'),
+                    media_type=params.get('media_type'),
+                    limit=int(params.get('limit', 50)),
+                    offset=int(params.get('offset', 0)),
+                )
+            except (ValueError, sqlite3.OperationalError) as e:
+                self.send_error(400, str(e))
+                return
+            body = json.dumps({'results': results}, ensure_ascii=False).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    server = ThreadingHTTPServer((host, port), SearchHandler)
+    logger.info(f"Search API listening on http://{host}:{port}/api/search")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+
+    index = TweetSearchIndex("data/search.db")
+    index.update_from_jsonl("data/x.jsonl")
+    logger.info(f"{index.count()} tweets in index")
+    serve(index)
@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import os
+
+import numpy as np
+from loguru import logger
+
+from config import OPENAI_API_KEY, BASE_URL, EMBEDDING_MODEL
+from x_like_io import tweet_id_from_url
+from x_like_record import iter_rows
+from x_like_search import tokenize
+
+
+def _text_hash(text):
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+class HashingEmbedder:
+    """
+    Offline embedder: signed feature hashing of words and CJK bigrams.
+    Only catches lexical overlap, but needs no network and is deterministic for tests.
+    """
+
+    def __init__(self, dim=256):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for token in tokenize(text):
+                h = int.from_bytes(hashlib.md5(token.encode("utf-8")).digest()[:8], "little")
+                vectors[i, h % self.dim] += 1.0 if (h >> 63) & 1 else -1.0
+        return _normalize(vectors)
+
+
+class OpenAIEmbedder:
+    """Embeddings from any OpenAI-compatible endpoint"""
+
+    def __init__(self, model=EMBEDDING_MODEL, api_key=OPENAI_API_KEY, base_url=BASE_URL, client=None):
+        from openai import OpenAI
+
+        self.client = client or OpenAI(api_key=api_key, base_url=base_url)
+        self.model = model
+        self.name = model
+        self.dim = None
+
+    def embed(self, texts):
+        response = self.client.embeddings.create(model=self.model, input=list(texts))
+        vectors = np.array([item.embedding for item in sorted(response.data, key=lambda d: d.index)],
+                           dtype=np.float32)
+        self.dim = vectors.shape[1]
+        return _normalize(vectors)
+
+
+class SemanticIndex:
+    """
+    Memory-mapped embedding matrix with a tweet id map.
+    Layout of index_dir:
+        vectors.bin   float16/float32 matrix, capacity x dim (row i is tweet ids[i])
+        ids.npy       int64 tweet ids
+        hashes.npy    int64 text hashes, rows are re-embedded when the text changes
+        meta.json     dim, dtype, count, capacity, embedder name
+        ivf.npz       optional centroids + list assignments for partitioned search
+    """
+
+    def __init__(self, index_dir="data/semantic", embedder=None, dtype="float16"):
+        self.index_dir = index_dir
+        self.embedder = embedder or HashingEmbedder()
+        os.makedirs(index_dir, exist_ok=True)
+        self.meta_file = os.path.join(index_dir, "meta.json")
+        self.vectors_file = os.path.join(index_dir, "vectors.bin")
+
+        if os.path.exists(self.meta_file):
+            with open(self.meta_file, 'r', encoding='utf-8') as f:
+                self.meta = json.load(f)
+            if self.meta["embedder"] != self.embedder.name:
+                raise ValueError(
+                    f"Index at {index_dir} was built with {self.meta['embedder']}, not {self.embedder.name}"
+                )
+            count = self.meta["count"]
+            self.ids = np.load(os.path.join(index_dir, "ids.npy"))[:count]
+            self.hashes = np.load(os.path.join(index_dir, "hashes.npy"))[:count]
+            self.vectors = self._open_vectors(self.meta["capacity"])
+        else:
+            self.meta = {"dim": None, "dtype": dtype, "count": 0, "capacity": 0, "embedder": self.embedder.name}
+            self.ids = np.zeros(0, dtype=np.int64)
+            self.hashes = np.zeros(0, dtype=np.int64)
+            self.vectors = None
+
+        self.positions = {int(tweet_id): i for i, tweet_id in enumerate(self.ids)}
+        self.ivf = None
+        ivf_file = os.path.join(index_dir, "ivf.npz")
+        if os.path.exists(ivf_file):
+            data = np.load(ivf_file)
+            self.ivf = {"centroids": data["centroids"], "assignments": data["assignments"]}
+
+    def __len__(self):
+        return self.meta["count"]
+
+    def _open_vectors(self, capacity):
+        if capacity == 0:
+            return None
+        return np.memmap(self.vectors_file, dtype=self.meta["dtype"], mode="r+",
+                         shape=(capacity, self.meta["dim"]))
+
+    def _ensure_capacity(self, needed):
+        if needed <= self.meta["capacity"]:
+            return
+        capacity = max(needed, self.meta["capacity"] * 2, 1024)
+        if self.vectors is not None:
+            self.vectors.flush()
+            self.vectors = None
+        itemsize = np.dtype(self.meta["dtype"]).itemsize
+        with open(self.vectors_file, "ab") as f:
+            f.truncate(capacity * self.meta["dim"] * itemsize)
+        self.meta["capacity"] = capacity
+        self.vectors = self._open_vectors(capacity)
+
+    def _write_rows(self, slots, vectors, count):
+        if self.meta["dim"] is None:
+            self.meta["dim"] = vectors.shape[1]
+        self._ensure_capacity(max(slots) + 1)
+        self.vectors[slots] = vectors.astype(self.meta["dtype"])
+        if self.ivf is not None:
+            # Keep the partitions valid for new rows until the next rebuild
+            assignments = np.argmax(vectors @ self.ivf["centroids"].T, axis=1)
+            grown = np.full(count, -1, dtype=np.int32)
+            grown[:len(self.ivf["assignments"])] = self.ivf["assignments"]
+            grown[slots] = assignments
+            self.ivf["assignments"] = grown
+
+    def add_rows(self, rows, batch_size=64):
+        """
+        Embed rows that are new or whose text changed. Rows are only added to the index once
+        their vectors are written, so a failed embedding request leaves it consistent.
+        :param rows: Iterable of tweet dicts
+        :param batch_size: Texts per embedding request
+        :return: Number of rows embedded
+        """
+        pending = {}  # tweet_id -> (text_hash, text), a tweet repeated in a batch is embedded once
+        embedded = 0
+        try:
+            for row in rows:
+                tweet_id = tweet_id_from_url(row.get("url"))
+                text = (row.get("text") or "").strip()
+                if tweet_id is None or not text:
+                    continue
+                text_hash = _text_hash(text)
+                slot = self.positions.get(tweet_id)
+                if slot is not None and self.hashes[slot] == text_hash:
+                    continue
+                pending[tweet_id] = (text_hash, text)
+                if len(pending) == batch_size:
+                    embedded += self._flush(pending)
+                    pending = {}
+            if pending:
+                embedded += self._flush(pending)
+        finally:
+            # Batches written before a failure are kept
+            self.save()
+        if embedded:
+            logger.info(f"Embedded {embedded} tweets, {len(self)} in index")
+        return embedded
+
+    def _flush(self, pending):
+        vectors = self.embedder.embed([text for _, text in pending.values()])
+        count = self.meta["count"]
+        slots = []
+        for tweet_id in pending:
+            slot = self.positions.get(tweet_id)
+            if slot is None:
+                slot, count = count, count + 1
+            slots.append(slot)
+        if len(self.ids) < count:
+            # Grow the id map geometrically, only the first count entries are valid
+            grow = max(count, 2 * len(self.ids)) - len(self.ids)
+            self.ids = np.concatenate([self.ids, np.zeros(grow, dtype=np.int64)])
+            self.hashes = np.concatenate([self.hashes, np.zeros(grow, dtype=np.int64)])
+        self._write_rows(slots, vectors, count)
+        for slot, (tweet_id, (text_hash, _)) in zip(slots, pending.items()):
+            self.ids[slot] = tweet_id
+            self.hashes[slot] = text_hash
+            self.positions[tweet_id] = slot
+        self.meta["count"] = count
+        return len(pending)
+
+    def update_from_jsonl(self, jsonl_file, batch_size=64):
+        return self.add_rows(iter_rows(jsonl_file), batch_size=batch_size)
+
+    def save(self):
+        if self.vectors is not None:
+            self.vectors.flush()
+        count = self.meta["count"]
+        np.save(os.path.join(self.index_dir, "ids.npy"), self.ids[:count])
+        np.save(os.path.join(self.index_dir, "hashes.npy"), self.hashes[:count])
+        if self.ivf is not None:
+            np.savez(os.path.join(self.index_dir, "ivf.npz"), **self.ivf)
+        with open(self.meta_file, 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f)
+
+    def build_ivf(self, n_lists=None, iterations=10, sample_size=20000, seed=0):
+        """
+        Partition vectors with spherical k-means for sublinear search on large archives
+        :param n_lists: Number of partitions, defaults to ~sqrt(count)
+        :param iterations: k-means iterations
+        :param sample_size: Vectors used to train the centroids
+        """
+        count = len(self)
+        if count == 0:
+            return
+        n_lists = n_lists or max(1, int(np.sqrt(count)))
+        rng = np.random.default_rng(seed)
+        sample = np.asarray(self.vectors[rng.choice(count, min(sample_size, count), replace=False)],
+                            dtype=np.float32)
+        centroids = sample[rng.choice(len(sample), min(n_lists, len(sample)), replace=False)]
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(len(centroids)):
+                members = sample[labels == c]
+                if len(members):
+                    centroids[c] = members.sum(axis=0)
+            centroids = _normalize(centroids)
+
+        assignments = np.empty(count, dtype=np.int32)
+        for start in range(0, count, 65536):
+            chunk = np.asarray(self.vectors[start:min(count, start + 65536)], dtype=np.float32)
+            assignments[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+        self.ivf = {"centroids": centroids, "assignments": assignments}
+        self.save()
+        logger.info(f"Built IVF index with {len(centroids)} lists over {count} vectors")
+
+    def search(self, query, k=10, nprobe=8):
+        """
+        Top-k cosine similarity search
+        :param query: Query text
+        :param k: Number of results
+        :param nprobe: Partitions scanned when an IVF index is built
+        :return: List of (tweet_id, score)
+        """
+        count = len(self)
+        if count == 0:
+            return []
+        q = self.embedder.embed([query])[0].astype(np.float32)
+
+        if self.ivf is not None:
+            nearest = np.argsort(self.ivf["centroids"] @ q)[::-1][:nprobe]
+            candidates = np.flatnonzero(np.isin(self.ivf["assignments"][:count], nearest))
+            scores = np.asarray(self.vectors[candidates], dtype=np.float32) @ q
+        else:
+            candidates = None
+            scores = np.empty(count, dtype=np.float32)
+            for start in range(0, count, 65536):
+                chunk = np.asarray(self.vectors[start:min(count, start + 65536)], dtype=np.float32)
+                scores[start:start + len(chunk)] = chunk @ q
+
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        rows = candidates[top] if candidates is not None else top
+        return [(int(self.ids[r]), float(scores[t])) for r, t in zip(rows, top)]
+
+
+if __name__ == "__main__":
+
+    index = SemanticIndex("data/semantic", embedder=OpenAIEmbedder())
+    index.update_from_jsonl("data/x.jsonl")
+    for tweet_id, score in index.search("long-context RAG", k=5):
+        logger.info(f"{score:.3f} https://twitter.com/i/status/{tweet_id}")
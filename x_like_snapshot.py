@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+import glob
+import os
+import re
+import sys
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urljoin
+
+import lxml.html
+from loguru import logger
+
+from x_like_engagement import EngagementStore
+from x_like_io import loads, open_text
+from x_like_record import encode_record
+
+
+DEFAULT_AVATAR = "https://abs.twimg.com/sticky/default_profile_images/default_profile_normal.png"
+NUMBER = re.compile(r"\b\d+\b")
+BACKGROUND_URL = re.compile(r'url\("([^"]+)"\)')
+AVATAR_IMG = ".//img[contains(concat(' ', normalize-space(@class), ' '), ' css-9pa8cd ')]"
+CARD_IMG = ".//div[@data-testid='card.layoutLarge.media']" + AVATAR_IMG[1:]
+
+
+def iter_snapshot(path):
+    """
+    Yield the captured cells of a snapshot file: {"captured_at", "base", "html"}.
+    A file cut off by a crash yields everything before the damaged part.
+    """
+    try:
+        with open_text(path) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield loads(line)
+    except (EOFError, zlib.error) as e:
+        logger.warning(f"{path} is truncated, parsed up to the damaged part: {e}")
+
+
+def _text(element):
+    """Visible text with <br> as newlines and emoji images as their alt text"""
+    parts = [element.text or ""]
+    for child in element:
+        if child.tag == "br":
+            parts.append("\n")
+        elif child.tag == "img":
+            parts.append(child.get("alt", ""))
+        elif isinstance(child.tag, str):
+            parts.append(_text(child))
+        parts.append(child.tail or "")
+    return "".join(parts)
+
+
+def _first(element, xpath, default=None):
+    found = element.xpath(xpath)
+    return found[0] if found else default
+
+
+def _count(tweet, testid):
+    button = _first(tweet, f".//button[@data-testid='{testid}']")
+    if button is None:
+        return 0
+    numbers = NUMBER.findall(button.get("aria-label") or "") or NUMBER.findall(button.text_content())
+    return int(numbers[0]) if numbers else 0
+
+
+def _media_type(tweet):
+    if tweet.xpath(".//div[@data-testid='videoPlayer']"):
+        return "Video"
+    if tweet.xpath(".//div[@data-testid='tweetPhoto']"):
+        return "Image"
+    if tweet.xpath(CARD_IMG):
+        return "Image"
+    return "No media"
+
+
+def _images_urls(tweet):
+    urls = []
+
+    def add(url):
+        if url and url not in urls:
+            urls.append(url)
+
+    for poster in tweet.xpath(".//video/@poster"):
+        add(poster)
+    for photo in tweet.xpath(".//div[@data-testid='tweetPhoto']"):
+        add(_first(photo, ".//img/@src"))
+        style = _first(photo, ".//div[contains(@style, 'background-image')]/@style")
+        match = BACKGROUND_URL.search(style) if style else None
+        if match:
+            add(match.group(1))
+    for src in tweet.xpath(CARD_IMG + "/@src"):
+        add(src)
+    return urls
+
+
+def parse_cell(html, base="https://x.com"):
+    """
+    Parse the outerHTML of one timeline cell into the row TwitterExtractor._process_tweet builds
+    :param html: cellInnerDiv outerHTML
+    :param base: Page origin, relative links are resolved against it
+    :return: Row dict, or None for cells without a tweet
+    """
+    tweet = _first(lxml.html.fragment_fromstring(html, create_parent="div"), ".//article[@data-testid='tweet']")
+    if tweet is None:
+        return None
+
+    names = _first(tweet, ".//div[@data-testid='User-Name']")
+    parts = [t.strip() for t in names.itertext() if t.strip()] if names is not None else []
+    author_name = parts[0] if parts else ""
+    author_handle = next((p for p in parts if p.startswith("@")), parts[1] if len(parts) > 1 else "")
+
+    text_element = _first(tweet, ".//div[@data-testid='tweetText']")
+    text = _text(text_element).strip() if text_element is not None else ""
+    card_title = _first(tweet, ".//div[@data-testid='twitter-article-title']")
+    if card_title is not None and card_title.text_content().strip():
+        text = f"{text}\n{card_title.text_content().strip()}"
+
+    link = _first(tweet, ".//a[contains(@href, '/status/')]/@href")
+    views = NUMBER.findall(_first(tweet, ".//a[contains(@href, '/analytics')]/@aria-label", ""))
+    media_type = _media_type(tweet)
+
+    return {
+        "text": text,
+        "author_name": author_name,
+        "author_handle": author_handle,
+        "author_avatar": _first(tweet, AVATAR_IMG + "/@src", DEFAULT_AVATAR),
+        "date": _first(tweet, ".//time/@datetime", "")[:10],
+        "lang": text_element.get("lang", "") if text_element is not None else "",
+        "url": urljoin(base, link) if link else "",
+        "mentioned_urls": [urljoin(base, href) for href in tweet.xpath(".//a[contains(@href, 'http')]/@href")],
+        "is_retweet": bool(tweet.xpath(".//div[contains(text(), 'Retweeted')]")),
+        "media_type": media_type,
+        "images_urls": _images_urls(tweet) if media_type in ("Image", "Video") else [],
+        "num_views": int(views[0]) if views else 0,
+        "num_reply": _count(tweet, "reply"),
+        "num_retweet": _count(tweet, "retweet"),
+        "num_like": _count(tweet, "unlike"),
+    }
+
+
+def _parse_chunk(cells):
+    """Worker: [(html, base, captured_at)] -> [(row, captured_at)]"""
+    rows = []
+    for html, base, captured_at in cells:
+        try:
+            row = parse_cell(html, base)
+        except Exception as e:
+            logger.warning(f"Could not parse a cell: {e}")
+            continue
+        if row is not None:
+            rows.append((row, captured_at))
+    return rows
+
+
+def _chunks(paths, chunk_size):
+    chunk = []
+    for path in paths:
+        for cell in iter_snapshot(path):
+            chunk.append((cell["html"], cell.get("base", "https://x.com"), cell.get("captured_at")))
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def parse_snapshots(paths, output_file, workers=None, chunk_size=256, canonical_file=None,
+                    engagement_file="data/engagement.ts", overwrite=False):
+    """
+    Parse snapshot files into a JSONL file without a browser, spread over a process pool
+    :param paths: Snapshot files, parsed in order
+    :param output_file: JSONL file the rows are written to
+    :param workers: Parser processes, all CPUs by default
+    :param chunk_size: Cells sent to a worker at once
+    :param canonical_file: Also append the rows here (the archive a sync capture continues)
+    :param engagement_file: EngagementStore that records the counts at capture time, None to skip.
+        Observations already stored at the same capture time are skipped, so re-parsing adds nothing
+    :param overwrite: Replace an existing output_file, otherwise FileExistsError is raised
+    :return: Number of rows written
+    """
+    if not overwrite and os.path.exists(output_file):
+        raise FileExistsError(f"{output_file} already exists, pass overwrite=True to replace it")
+    start = time.time()
+    workers = workers or os.cpu_count()
+    seen, cells, written = set(), 0, 0
+    engagement = EngagementStore(engagement_file) if engagement_file else None
+    canonical = open(canonical_file, "a", encoding="utf-8") if canonical_file else None
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor, \
+                open(output_file, "w", encoding="utf-8") as out:
+            # Bounded and in order: only a few chunks of HTML are in flight at any time
+            futures = deque()
+            chunks = _chunks(paths, chunk_size)
+            while True:
+                for chunk in chunks:
+                    futures.append(executor.submit(_parse_chunk, chunk))
+                    cells += len(chunk)
+                    if len(futures) >= workers * 2:
+                        break
+                if not futures:
+                    break
+                for row, captured_at in futures.popleft().result():
+                    # Cells can be captured twice around a browser recycle
+                    if row["url"] in seen:
+                        continue
+                    seen.add(row["url"])
+                    line = encode_record(row) + "\n"
+                    out.write(line)
+                    if canonical is not None:
+                        canonical.write(line)
+                    if engagement is not None:
+                        engagement.observe_row(row, captured_at)
+                    written += 1
+    finally:
+        if canonical is not None:
+            canonical.close()
+        if engagement is not None:
+            engagement.close()
+    elapsed = time.time() - start
+    logger.info(f"Parsed {cells} cells ({cells / max(elapsed, 1e-9):.0f}/s) into {written} tweets in {output_file} "
+                f"in {elapsed:.1f}s")
+    return written
+
+
+def snapshot_output(path):
+    """data/tweets_<time>.snapshot.jsonl.gz -> data/tweets_<time>.jsonl"""
+    return re.sub(r"\.snapshot\.jsonl(\.gz|\.bz2|\.xz)?$", ".jsonl", path)
+
+
+if __name__ == "__main__":
+
+    # Parse every snapshot next to its original run file name, existing files only with --overwrite
+    overwrite = "--overwrite" in sys.argv[1:]
+    for snapshot in sorted(glob.glob("data/tweets_*.snapshot.jsonl.gz")):
+        output = snapshot_output(snapshot)
+        if os.path.exists(output) and not overwrite:
+            logger.info(f"Skipping {snapshot}, {output} already exists (--overwrite to replace it)")
+            continue
+        parse_snapshots([snapshot], output, workers=os.cpu_count(), overwrite=True)
@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+
+import requests
+from loguru import logger
+
+from x_like_engagement import EngagementStore
+from x_like_io import tweet_id_from_url
+from x_like_record import encode_record, iter_rows
+from x_like_video import load_media_scraper
+
+
+# Timeline text cut off by "Show more", and the usual ways authors announce a thread:
+# 🧵, "1/", "(1/n)" or "1/5" opening or closing the text, a trailing "thread" or arrow
+TRUNCATED = re.compile(r'…\s*$')
+THREAD_MARKER = re.compile(
+    r'🧵'
+    r'|^\W*\(?1\s*/\s*(?:\d+|n)?\)?(?:\s|$)'
+    r'|(?:^|\s)\(?1\s*/\s*(?:\d+|n)?\)?\s*$'
+    r'|\bthread\b\W*$'
+    r'|(?:⬇️|👇)\s*$',
+    re.IGNORECASE,
+)
+TRAILING_TCO = re.compile(r'\s*https://t\.co/\w+\s*$')
+
+
+def tweet_body(row):
+    """Text of a row without the card title the scraper appends on its own line"""
+    text = row.get("text") or ""
+    card_title = row.get("card_title")
+    if card_title and text.endswith(f"\n{card_title}"):
+        return text[:-len(card_title) - 1]
+    return text
+
+
+def is_truncated(row):
+    """Whether the row only has the "Show more" preview of its text"""
+    return bool(TRUNCATED.search(tweet_body(row)))
+
+
+def needs_completion(row):
+    """
+    Truncated or thread-starter rows that were not completed yet. A completed row whose text
+    is truncated again (merged with a newer preview) needs it too, its result is cached.
+    """
+    if "thread" in row:
+        return is_truncated(row)
+    body = tweet_body(row)
+    return bool(TRUNCATED.search(body) or THREAD_MARKER.search(body))
+
+
+def _unwrap(result):
+    # Tweets with visibility limits are wrapped in another object
+    if result and result.get("__typename") == "TweetWithVisibilityResults":
+        return result.get("tweet")
+    return result
+
+
+def _iter_tweet_results(data):
+    """All tweet results of a TweetDetail response, including the ones inside conversation modules"""
+    instructions = data.get("data", {}).get("threaded_conversation_with_injections_v2", {}).get("instructions", [])
+    for instruction in instructions:
+        for entry in instruction.get("entries", []):
+            content = entry.get("content", {})
+            items = [content.get("itemContent")] + [i.get("item", {}).get("itemContent") for i in content.get("items", [])]
+            for item in items:
+                result = _unwrap((item or {}).get("tweet_results", {}).get("result"))
+                if result and result.get("legacy"):
+                    yield result
+
+
+def parse_tweet(result):
+    """
+    Compact dict of a GraphQL tweet result: full text (note tweet text for long posts),
+    author, date, conversation ids and engagement counts
+    """
+    legacy = result["legacy"]
+    user = result.get("core", {}).get("user_results", {}).get("result", {})
+    handle = user.get("core", {}).get("screen_name") or user.get("legacy", {}).get("screen_name", "")
+    note = result.get("note_tweet", {}).get("note_tweet_results", {}).get("result", {})
+    text = note.get("text")
+    if text is None:
+        text = legacy.get("full_text", "")
+        # Attached media is appended to full_text as a t.co link, the timeline never shows it
+        if legacy.get("entities", {}).get("media"):
+            text = TRAILING_TCO.sub("", text)
+    date = ""
+    if legacy.get("created_at"):
+        date = datetime.strptime(legacy["created_at"], "%a %b %d %H:%M:%S %z %Y").strftime("%Y-%m-%d")
+    return {
+        "id": int(result["rest_id"]),
+        "url": f"https://x.com/{handle}/status/{result['rest_id']}",
+        "author_handle": f"@{handle}" if handle else "",
+        "text": text,
+        "date": date,
+        "conversation_id": int(legacy.get("conversation_id_str") or result["rest_id"]),
+        "in_reply_to": int(legacy["in_reply_to_status_id_str"]) if legacy.get("in_reply_to_status_id_str") else None,
+        "counts": {
+            "num_like": legacy.get("favorite_count", 0),
+            "num_retweet": legacy.get("retweet_count", 0),
+            "num_reply": legacy.get("reply_count", 0),
+            "num_views": int(result.get("views", {}).get("count") or 0),
+        },
+    }
+
+
+def parse_conversation(data, tweet_id):
+    """
+    Full text of the focal tweet and the author's own replies that continue it
+    :param data: Decoded TweetDetail response
+    :param tweet_id: Focal tweet id
+    :return: {"text": ..., "thread": [{"url", "text", "date"}, ...], "counts": {...}} or None if the tweet is missing
+    """
+    tweets = {t["id"]: t for t in map(parse_tweet, _iter_tweet_results(data))}
+    focal = tweets.get(tweet_id)
+    if focal is None:
+        return None
+    # Follow the author's reply chain down from the focal tweet
+    chain, current = [], tweet_id
+    replies = {}
+    for t in tweets.values():
+        if t["author_handle"] == focal["author_handle"] and t["in_reply_to"] is not None:
+            replies.setdefault(t["in_reply_to"], t)
+    while current in replies:
+        current = replies[current]["id"]
+        chain.append(tweets[current])
+    return {
+        "text": focal["text"],
+        "thread": [{"url": t["url"], "text": t["text"], "date": t["date"]} for t in chain],
+        "counts": focal["counts"],
+    }
+
+
+class ThreadCompleter:
+    """
+    Completes truncated timeline text and self-threads with one TweetDetail request per tweet.
+    Requests go through the media scraper's EgressPool, each guest token pinned to the egress that
+    activated it, and are paced by the rate-limit governor.
+    Results are cached in SQLite, so an interrupted run resumes where it stopped.
+    """
+
+    def __init__(self, cache_file="data/thread_cache.db", workers=4, engagement_file="data/engagement.ts",
+                 transport=None):
+        """
+        :param cache_file: SQLite cache of completed conversations
+        :param workers: Concurrent TweetDetail requests
+        :param engagement_file: EngagementStore that receives the counts of every fetched tweet, None to skip
+        :param transport: EgressPool to send through instead of the media scraper's default one
+        """
+        self.workers = workers
+        self.scraper = load_media_scraper()
+        if transport is not None:
+            self.scraper.transport = transport
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(cache_file, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS conversations (id INTEGER PRIMARY KEY, result TEXT)")
+        self.stats = {"requests": 0, "failures": 0, "completed": 0}
+        self.engagement = EngagementStore(engagement_file) if engagement_file else None
+
+    def _get(self, tweet_id):
+        with self.lock:
+            found = self.conn.execute("SELECT result FROM conversations WHERE id = ?", (tweet_id,)).fetchone()
+        return json.loads(found[0]) if found else None
+
+    def _put(self, tweet_id, result):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO conversations VALUES (?, ?)",
+                              (tweet_id, json.dumps(result, ensure_ascii=False)))
+
+    def fetch(self, tweet_id):
+        """
+        Fetch and parse the conversation of one tweet
+        :return: parse_conversation result or None
+        """
+        url = self.scraper.get_details_url(str(tweet_id), self.scraper.features, self.scraper.variables)
+        for attempt in range(2):
+            # The pool hands out the token of the best egress and forgets tokens X rejects,
+            # so the retry activates a fresh one
+            bearer_token, token = self.scraper.get_tokens("https://x.com")
+            api_headers = {
+                "authorization": f"Bearer {bearer_token}",
+                "x-guest-token": token,
+                "x-twitter-active-user": "yes",
+                "content-type": "application/json",
+            }
+            self.stats["requests"] += 1
+            response = self.scraper.transport.request("GET", url, token=token, headers=api_headers, timeout=30)
+            if response.status_code in (401, 403) and attempt == 0:
+                # Guest tokens expire after a few hours
+                continue
+            if response.status_code != 200:
+                logger.warning(f"TweetDetail for {tweet_id} failed with status {response.status_code}")
+                return None
+            return parse_conversation(response.json(), tweet_id)
+        return None
+
+    def _complete(self, tweet_id):
+        try:
+            result = self.fetch(tweet_id)
+        except (requests.RequestException, AssertionError, ValueError, KeyError) as e:
+            logger.warning(f"Error completing {tweet_id}: {e}")
+            result = None
+        if result is None:
+            self.stats["failures"] += 1
+            return 0
+        self._put(tweet_id, result)
+        if self.engagement is not None:
+            self.engagement.observe(tweet_id, result["counts"])
+        self.stats["completed"] += 1
+        return 1
+
+    def complete_rows(self, rows):
+        """
+        Fetch conversations of all rows that need completion and are not cached yet
+        :param rows: Iterable of tweet dicts
+        :return: Number of conversations fetched in this run
+        """
+        start = time.time()
+        completed = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = set()
+            for row in rows:
+                tweet_id = tweet_id_from_url(row.get("url"))
+                if tweet_id is None or not needs_completion(row) or self._get(tweet_id) is not None:
+                    continue
+                futures.add(executor.submit(self._complete, tweet_id))
+                if len(futures) >= self.workers * 2:
+                    done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                    completed += sum(f.result() for f in done)
+            completed += sum(f.result() for f in futures)
+        if self.engagement is not None:
+            self.engagement.close()
+        logger.info(
+            f"Completed {completed} conversations in {time.time() - start:.1f}s "
+            f"({self.stats['requests']} requests, {self.stats['failures']} failures)"
+        )
+        return completed
+
+    def complete_file(self, jsonl_file):
+        """
+        Complete a JSONL file in place: truncated text is replaced by the full text and
+        the author's follow-up tweets are stored in a "thread" list
+        :return: Number of rows updated
+        """
+        self.complete_rows(iter_rows(jsonl_file))
+        updated = 0
+        fd, tmp_file = tempfile.mkstemp(suffix=".jsonl", dir=os.path.dirname(os.path.abspath(jsonl_file)))
+        with os.fdopen(fd, "w", encoding="utf-8") as out:
+            for row in iter_rows(jsonl_file):
+                result = self._get(tweet_id_from_url(row.get("url"))) if needs_completion(row) else None
+                if result is not None:
+                    if is_truncated(row) and result["text"]:
+                        row["text"] = result["text"]
+                        if row.get("card_title"):
+                            row["text"] += f"\n{row['card_title']}"
+                    row["thread"] = result["thread"]
+                    updated += 1
+                out.write(encode_record(row) + "\n")
+        os.replace(tmp_file, jsonl_file)
+        logger.info(f"Updated {updated} rows of {jsonl_file}")
+        return updated
+
+
+if __name__ == "__main__":
+
+    completer = ThreadCompleter("data/thread_cache.db", workers=4)
+    completer.complete_file("data/x.jsonl")
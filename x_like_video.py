@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+import importlib.util
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from loguru import logger
+
+from x_like_io import tweet_id_from_url, iter_jsonl
+from x_like_record import encode_record, iter_rows
+
+
+def load_media_scraper():
+    """Import x-media-scraper.py, whose file name is not a valid module name"""
+    path = os.path.join(os.path.dirname(os.path.realpath(__file__)), "x-media-scraper.py")
+    spec = importlib.util.spec_from_file_location("x_media_scraper", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class VideoResolver:
+    """
+    Resolves playable video variants and thumbnails in a thread pool while the browser keeps
+    scrolling. Results are appended to a side file as {"tweet_id", "url", "videos"} lines.
+    """
+
+    def __init__(self, side_file, workers=4):
+        """
+        :param side_file: JSONL file receiving the resolved videos
+        :param workers: Concurrent get_video_info calls
+        """
+        self.side_file = side_file
+        os.makedirs(os.path.dirname(os.path.abspath(side_file)), exist_ok=True)
+        self.get_video_info = load_media_scraper().get_video_info
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="video")
+        self.lock = threading.Lock()
+        self.submitted = set()
+        self.resolved = 0
+        self.failed = 0
+
+    def submit(self, row):
+        """Queue a saved row if it is a video tweet that was not queued yet"""
+        if row.get("media_type") != "Video":
+            return
+        tweet_id = tweet_id_from_url(row.get("url"))
+        if tweet_id is None or tweet_id in self.submitted:
+            return
+        self.submitted.add(tweet_id)
+        self.executor.submit(self._resolve, tweet_id, row["url"])
+
+    def _resolve(self, tweet_id, url):
+        try:
+            videos = self.get_video_info(url)
+        except Exception as e:
+            logger.error(f"Error resolving video of {url}: {e}")
+            videos = []
+        with self.lock:
+            if not videos:
+                self.failed += 1
+                return
+            self.resolved += 1
+            with open(self.side_file, "a", encoding="utf-8") as f:
+                json.dump({"tweet_id": tweet_id, "url": url, "videos": videos}, f, ensure_ascii=False)
+                f.write("\n")
+
+    def pending(self):
+        with self.lock:
+            return len(self.submitted) - self.resolved - self.failed
+
+    def close(self):
+        """Stop accepting work and wait for the queued videos"""
+        self.executor.shutdown(wait=True)
+        logger.info(f"Resolved {self.resolved} of {len(self.submitted)} video tweets into {self.side_file}")
+
+
+def load_videos(side_file):
+    """
+    {tweet_id: videos} from a side file written by VideoResolver
+    """
+    if not os.path.exists(side_file):
+        return {}
+    return {entry["tweet_id"]: entry["videos"] for entry in iter_jsonl(side_file) if entry.get("videos")}
+
+
+def merge_videos(jsonl_file, side_file):
+    """
+    Add a "videos" field to the rows of a JSONL file from a side file, replacing it atomically
+    :return: Number of rows that received videos
+    """
+    videos = load_videos(side_file)
+    if not videos or not os.path.exists(jsonl_file):
+        return 0
+    merged = 0
+    fd, tmp_file = tempfile.mkstemp(suffix=".jsonl", dir=os.path.dirname(os.path.abspath(jsonl_file)))
+    with os.fdopen(fd, "w", encoding="utf-8") as out:
+        for row in iter_rows(jsonl_file):
+            found = videos.get(tweet_id_from_url(row.get("url")))
+            if found:
+                row["videos"] = found
+                merged += 1
+            out.write(encode_record(row) + "\n")
+    os.replace(tmp_file, jsonl_file)
+    logger.info(f"Merged videos into {merged} rows of {jsonl_file}")
+    return merged
+
+
+if __name__ == "__main__":
+
+    resolver = VideoResolver("data/videos.jsonl")
+    for row in iter_rows("data/x.jsonl"):
+        resolver.submit(row)
+    resolver.close()
+    merge_videos("data/x.jsonl", "data/videos.jsonl")
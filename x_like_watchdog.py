@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+import functools
+import threading
+import time
+
+from loguru import logger
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+@functools.cache
+def _warn_missing_psutil():
+    # Once per process, not for every watchdog
+    logger.warning("psutil is not installed: browser memory is not sampled, max_rss_mb has no effect "
+                   "and a hung chromedriver is killed without its Chrome processes (pip install psutil)")
+
+
+# Navigation waits for the page load, it is not a sign of a slow browser
+NAVIGATION_COMMANDS = {"get", "refresh", "goBack", "goForward"}
+
+
+class BrowserRecycle(Exception):
+    """Raised inside the scrape loop when the watchdog wants a fresh browser"""
+
+
+class BrowserWatchdog:
+    """
+    Watches the health of a TwitterExtractor's Chrome.
+    Every WebDriver command passes through a hook that tracks its latency and counts
+    stale element errors. Every check_interval seconds the scrape loop asks should_recycle(),
+    which also samples the browser RSS (psutil) and the JS heap (CDP Performance.getMetrics).
+    A command stuck for longer than hang_timeout kills chromedriver from a monitor thread,
+    so the blocked call fails instead of hanging the loop forever.
+    """
+
+    def __init__(self, max_rss_mb=3000, max_js_heap_mb=1500, max_latency=2.0, max_stale=200,
+                 hang_timeout=180, check_interval=30, max_recycles=20):
+        """
+        :param max_rss_mb: Recycle when chromedriver and its Chrome processes use more memory
+        :param max_js_heap_mb: Recycle when the page's used JS heap grows past this
+        :param max_latency: Recycle when the moving average of command latency (seconds) exceeds this
+        :param max_stale: Recycle after this many stale element errors on one browser
+        :param hang_timeout: Kill the browser when a single command runs longer than this
+        :param check_interval: Seconds between two health samples
+        :param max_recycles: Give up after this many recycles in one fetch_tweets call
+        """
+        self.max_rss_mb = max_rss_mb
+        self.max_js_heap_mb = max_js_heap_mb
+        self.max_latency = max_latency
+        self.max_stale = max_stale
+        self.hang_timeout = hang_timeout
+        self.check_interval = check_interval
+        self.max_recycles = max_recycles
+
+        self.lock = threading.Lock()
+        self.driver = None
+        self.executor = self._original_execute = None
+        self.inflight = {}  # thread id -> (start, command)
+        self.latency = 0.0
+        self.stale = 0
+        self.last_check = time.time()
+        self.killed = None
+        self.recycles = 0
+        self.last_sample = {}
+        self._stop = threading.Event()
+        self._monitor = None
+        if psutil is None:
+            _warn_missing_psutil()
+
+    # Driver hook
+
+    def attach(self, driver):
+        """Start watching a driver, counters start from zero"""
+        self.detach()
+        self.driver = driver
+        self.executor = driver.command_executor
+        self._original_execute = self.executor.execute
+        self.executor.execute = self._execute
+        self.latency, self.stale, self.killed = 0.0, 0, None
+        self.last_check = time.time()
+        self._stop = threading.Event()
+        self._monitor = threading.Thread(target=self._watch_hangs, args=(self._stop,), daemon=True)
+        self._monitor.start()
+        if self._cdp("Performance.enable") is None:
+            logger.debug("CDP performance metrics unavailable, JS heap is not watched")
+
+    def detach(self):
+        if self.executor is not None:
+            self.executor.execute = self._original_execute
+        self._stop.set()
+        self.driver = self.executor = self._original_execute = None
+        with self.lock:
+            self.inflight.clear()
+
+    def _execute(self, command, params=None):
+        thread = threading.get_ident()
+        start = time.perf_counter()
+        with self.lock:
+            self.inflight[thread] = (start, command)
+        try:
+            response = self._original_execute(command, params)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.inflight.pop(thread, None)
+                if command not in NAVIGATION_COMMANDS:
+                    self.latency = elapsed if not self.latency else 0.9 * self.latency + 0.1 * elapsed
+        value = response.get("value") if isinstance(response, dict) else None
+        if isinstance(value, dict) and value.get("error") == "stale element reference":
+            with self.lock:
+                self.stale += 1
+        return response
+
+    def _watch_hangs(self, stop):
+        while not stop.wait(1):
+            with self.lock:
+                started = [(start, command) for start, command in self.inflight.values()]
+            for start, command in started:
+                if time.perf_counter() - start > self.hang_timeout:
+                    self.killed = f"{command} hung for more than {self.hang_timeout}s"
+                    logger.error(f"Browser watchdog: {self.killed}, killing chromedriver")
+                    self.kill()
+                    return
+
+    def kill(self):
+        """Kill chromedriver and its Chrome processes without talking to them"""
+        process = getattr(getattr(self.driver, "service", None), "process", None)
+        if process is None:
+            return
+        if psutil is not None:
+            try:
+                for child in psutil.Process(process.pid).children(recursive=True):
+                    child.kill()
+            except psutil.Error:
+                pass
+        process.kill()
+
+    # Health samples
+
+    def _cdp(self, cmd, args=None):
+        if self.driver is None:
+            return None
+        try:
+            return self.driver.execute_cdp_cmd(cmd, args or {})
+        except Exception:
+            return None
+
+    def rss_mb(self):
+        """Resident memory of chromedriver and all Chrome processes it started, None without psutil"""
+        process = getattr(getattr(self.driver, "service", None), "process", None)
+        if psutil is None or process is None:
+            return None
+        try:
+            root = psutil.Process(process.pid)
+            total = root.memory_info().rss
+            for child in root.children(recursive=True):
+                try:
+                    total += child.memory_info().rss
+                except psutil.Error:
+                    pass
+        except psutil.Error:
+            return None
+        return total / 1024 / 1024
+
+    def js_heap_mb(self):
+        metrics = self._cdp("Performance.getMetrics")
+        if not metrics:
+            return None
+        for metric in metrics.get("metrics", []):
+            if metric["name"] == "JSHeapUsedSize":
+                return metric["value"] / 1024 / 1024
+        return None
+
+    def sample(self):
+        """Current health numbers of the watched browser"""
+        sample = {
+            "rss_mb": self.rss_mb(),
+            "js_heap_mb": self.js_heap_mb(),
+            "latency": round(self.latency, 3),
+            "stale": self.stale,
+        }
+        self.last_sample = sample
+        return sample
+
+    def should_recycle(self):
+        """
+        Reason to recycle the browser now, or None. Samples at most every check_interval seconds
+        """
+        if self.killed:
+            return self.killed
+        if time.time() - self.last_check < self.check_interval:
+            return None
+        self.last_check = time.time()
+        sample = self.sample()
+        logger.debug(f"Browser watchdog sample: {sample}")
+        if sample["rss_mb"] is not None and sample["rss_mb"] > self.max_rss_mb:
+            return f"browser RSS {sample['rss_mb']:.0f}MB > {self.max_rss_mb}MB"
+        if sample["js_heap_mb"] is not None and sample["js_heap_mb"] > self.max_js_heap_mb:
+            return f"JS heap {sample['js_heap_mb']:.0f}MB > {self.max_js_heap_mb}MB"
+        if sample["latency"] > self.max_latency:
+            return f"command latency {sample['latency']:.2f}s > {self.max_latency}s"
+        if sample["stale"] > self.max_stale:
+            return f"{sample['stale']} stale element errors"
+        return None
+
+    def browser_failed(self):
+        """True if the watched browser was killed or no longer answers"""
+        if self.killed:
+            return True
+        try:
+            self.driver.current_url
+            return False
+        except Exception:
+            return True